@@ -1,12 +1,22 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox, font
-import telnetlib
-import os
 import time
-import sys
-import threading
-from functools import partial  # Importar functools.partial
+import queue
+import asyncio
+from motor_sondeo import MotorSondeo
+from barrido_icmp import BarridoAlcanzabilidad
+from planificador import PlanificadorMonitoreo
+from monitoreo import COMANDOS_SHOW, Monitor
+from topologia import cargar_topologia
+from render_topologia import RenderTopologia
+from cola_gui import ColaActualizacionesGUI
+from historial import HistorialEstados
+from metricas import metricas, tabla_metricas
+from consulta_router import ConsultaPorPestanas
+from recolectores import crear_recolector, pool_de_backend
+from control_barrido import COMPLETADO, FALLIDO, ControlBarrido
+from visor_texto import LineasTexto, VisorTexto
 
 # ==================
 #  Variables globales
@@ -15,11 +25,49 @@ from functools import partial  # Importar functools.partial
 ventana = None
 canvas_frame = None
 lienzo = None
+render = None     # RenderTopologia: crea los elementos del canvas una vez y los reescala
 
-routers = []      # Routers para verificación (Telnet)
-devices = []      # Todos los dispositivos (routers, switches, PCs, VM)
+# Fichero con los dispositivos y enlaces de la topología (JSON, o YAML si está PyYAML)
+RUTA_TOPOLOGIA = "topologia.json"
+
+topologia = None  # Topologia indexada (routers, switches, PCs, VM y enlaces)
+monitor = None    # Monitor: fases del monitoreo, compartidas con el modo sin interfaz
+
+# Historial en disco (buffer circular) del estado, RTT y tiempos de comandos de cada monitoreo
+RUTA_HISTORIAL = "historial.dat"
+historial = None
 lineas_dict = {}  # Guarda { "line_R1-R2": line_id, ... }
-line_colors = {}  # Guarda { "line_R1-R2": "green", ... }
+line_colors = {}  # Guarda { "line_R1-R2": "green", ... } (lo mantiene la cola, en el hilo de Tk)
+cola_gui = None   # ColaActualizacionesGUI: los hilos de monitoreo encolan, Tk aplica una vez por frame
+
+# Cómo se recogen los datos de los routers en el monitoreo: "telnet" (los show), "ssh"
+# (los mismos show por SSH, a la vez en una conexión por router; necesita asyncssh, y
+# los pings y la ventana del router también van por SSH) o "snmp" (interfaces y rutas
+# por SNMP con comunidad_snmp; el resto de comandos se piden por Telnet al abrir la
+# ventana del router)
+backend_recoleccion = "telnet"
+comunidad_snmp = "public"
+
+# Pool con que se entra en los routers (Telnet, o SSH con el backend "ssh")
+pool_routers = pool_de_backend(backend_recoleccion)
+
+# Motor asíncrono para sondear los routers (un solo hilo, concurrencia acotada)
+motor = MotorSondeo(pool_routers, limite_concurrencia=100,
+                    recolector=crear_recolector(backend_recoleccion, pool_routers, comunidad_snmp))
+
+# Sondeo concurrente de PCs (ICMP si hay permisos, si no TCP/UDP)
+barrido = BarridoAlcanzabilidad(timeout=1.0)
+
+# Desde dónde se sondean las PCs: "local" (barrido desde este equipo) o "gateway"
+# (ping desde su router, todas las de un router en una sola sesión).
+# Las VM siempre se sondean desde su gateway.
+origen_sondeo_pcs = "local"
+
+# Comandos que se recogen de cada router
+comandos_show = COMANDOS_SHOW
+
+# Segundos que puede durar un monitoreo completo antes de cortarlo
+PLAZO_MONITOREO = 120
 
 # Imágenes
 imagen_router = None
@@ -31,91 +79,10 @@ imagen_vm = None
 barra_progreso = None
 etiqueta_progreso = None
 
-# Bounding box de la topología (usada para escalarla y centrarla)
-min_x = float('inf')
-max_x = float('-inf')
-min_y = float('inf')
-max_y = float('-inf')
-
-# Mapeo de routers a sus dispositivos conectados
-router_to_devices = {
-    "R1": ["Switch1"],
-    "R2": ["PC12", "PC11", "PC10"],
-    "R3": ["PC9", "PC8", "PC7"],
-    "R4": ["PC1", "PC2", "PC3"],
-    "R5": ["PC4", "PC5", "PC6"],
-    "Switch1": ["Ubuntu20.04VM-1"],  # Agregado
-}
-
-# Mapeo de switches a sus routers asociados
-switch_to_router = {
-    "Switch1": "R1",
-}
-
-# Definir todas las conexiones a evaluar (hardcodeadas)
-conexiones = [
-    ("R1", "Switch1", "192.168.100.0/24"),
-    ("Switch1", "Ubuntu20.04VM-1", "192.168.100.0/24"),
-    ("R1", "R2", "172.16.1.19/24"),
-    ("R2", "R3", "180.16.1.0/24"),
-    ("R2", "R4", "180.16.2.0/24"),
-    ("R3", "R5", "180.16.4.0/24"),
-    ("R4", "R5", "180.16.3.0/24"),
-    ("R2", "PC12", ""),
-    ("R2", "PC11", ""),
-    ("R2", "PC10", ""),
-    ("R3", "PC9", ""),
-    ("R3", "PC8", ""),
-    ("R3", "PC7", ""),
-    ("R4", "PC1", ""),
-    ("R4", "PC2", ""),
-    ("R4", "PC3", ""),
-    ("R5", "PC4", ""),
-    ("R5", "PC5", ""),
-    ("R5", "PC6", ""),
-]
-
 # ==================
 #   Funciones Auxiliares
 # ==================
 
-def find_device(nombre):
-    """
-    Encuentra un dispositivo por su nombre.
-    """
-    for device in devices:
-        if device["nombre"] == nombre:
-            return device
-    return None
-
-def find_connected_switch(pc_nombre):
-    """
-    Encuentra el switch al que está conectada una PC o VM.
-    """
-    for switch, pcs in router_to_devices.items():
-        if switch.startswith("Switch") and pc_nombre in pcs:
-            return switch
-    return None
-
-def find_connected_router(pc_nombre, accessible_routers):
-    """
-    Encuentra el router al que está conectada una PC o VM, directamente o vía un switch,
-    y verifica si el router es accesible.
-    """
-    # Verificar conexiones directas a routers
-    for router, pcs in router_to_devices.items():
-        if router.startswith("R") and (pc_nombre in pcs) and (router in accessible_routers):
-            return router
-    
-    # Verificar conexiones a través de switches
-    for switch, pcs in router_to_devices.items():
-        if switch.startswith("Switch") and pc_nombre in pcs:
-            # Retorna el router asociado al switch si es accesible
-            router_associated = switch_to_router.get(switch)
-            if router_associated and router_associated in accessible_routers:
-                return router_associated
-    return None
-
 def CenterWindowToDisplay(screen, width: int, height: int, scale_factor: float = 1.0):
     """Centers the window to the main display/monitor."""
     screen_width = screen.winfo_screenwidth()
@@ -127,379 +94,99 @@ def CenterWindowToDisplay(screen, width: int, height: int, scale_factor: float =
 
     return f"{width}x{height}+{x}+{y}"
 
-# ==================
-#   Funciones Telnet
-# ==================
-
-def conectar_telnet(router_ip, username, password, comandos, resultados_callback):
-    """
-    Conecta al router vía Telnet, ejecuta comandos y devuelve los resultados.
-    En caso de fallo, llama al callback con un diccionario vacío.
-    """
-    try:
-        port = 23
-        tn = telnetlib.Telnet(router_ip, port, timeout=10)
-
-        # Leer y enviar credenciales
-        tn.read_until(b"Username:", timeout=5)
-        tn.write(username.encode("utf-8") + b"\n")
-        tn.read_until(b"Password:", timeout=5)
-        tn.write(password.encode("utf-8") + b"\n")
-
-        # Esperar el prompt (asumimos que es '>' o '#')
-        index, obj, output = tn.expect([b">", b"#"], timeout=5)
-        if index == -1:
-            raise Exception("No se encontró el prompt del router.")
-
-        resultados = {}
-
-        for cmd_key, cmd in comandos.items():
-            tn.write(cmd.encode("utf-8") + b"\n")
-            salida = leer_comando_telnet(tn)
-            resultados[cmd_key] = salida
-
-        tn.write(b"exit\n")
-        tn.close()
-
-        resultados_callback(resultados)
-
-    except Exception as e:
-        # Log del error para depuración
-        print(f"Error al conectar vía Telnet a {router_ip}: {e}")
-        # Llamar al callback con un diccionario vacío para indicar falla
-        resultados_callback({})
-
-def leer_comando_telnet(tn):
-    """
-    Lee la salida de un comando Telnet hasta que no haya más paginación.
-    """
-    salida = ""
-    while True:
-        try:
-            buffer = tn.read_until(b"--More--", timeout=3).decode("utf-8")
-            salida += buffer.replace("--More--", "")
-            if "--More--" in buffer:
-                tn.write(b" ")  # Enviar espacio para continuar
-            else:
-                break
-        except EOFError:
-            break
-        except Exception:
-            break
-    return salida
-
-def verificar_router_telnet(ip, username, password, resultado_callback):
-    """
-    Verifica si el router está accesible vía Telnet.
-    Ejecuta la conexión y llama al callback con el resultado.
-    """
-    try:
-        tn = telnetlib.Telnet(ip, timeout=5)
-        tn.close()
-        resultado_callback(ip, True)
-    except Exception:
-        resultado_callback(ip, False)
-
 # ==================
 #   Funciones GUI
 # ==================
 
 def actualizar_linea_color(line_name, color):
     """
-    Actualiza el color de una línea en la GUI de manera segura.
+    Encola el color de una línea; se aplica en el siguiente frame de Tk y solo si cambia.
     """
-    if line_name in lineas_dict:
-        def _update():
-            lienzo.itemconfig(lineas_dict[line_name], fill=color)
-            print(f"Actualizando línea {line_name} a color {color}.")  # Añadido log para debug
-        ventana.after(0, _update)
+    if topologia.enlace_de_linea(line_name) is not None:
+        cola_gui.poner_color(line_name, color)
     else:
-        print(f"Línea {line_name} no encontrada en lineas_dict.")  # Añadido log para debug
+        print(f"Línea {line_name} no encontrada en la topología.")  # Añadido log para debug
 
 
 def actualizar_progreso(progreso, texto):
     """
-    Actualiza la barra de progreso y la etiqueta de manera segura.
+    Encola el progreso; en cada frame solo se pinta el último valor.
     """
-    def _update():
-        barra_progreso.set(progreso / 100)
-        etiqueta_progreso.configure(text=texto)
-    ventana.after(0, _update)
+    cola_gui.poner_progreso(progreso, texto)
 
 # ==================
 #   Monitoreo
 # ==================
 
-def monitorear_routers(accessible_routers):
+async def run_monitoreo():
     """
-    Verifica el estado de los routers y actualiza la topología.
-    Además, si un router no es accesible, marca sus líneas a dispositivos conectados en rojo.
+    Monitoreo de routers, conexiones entre routers y PCs en el bucle de fondo (lo lanza control_barrido).
     """
-    print("Verificando estado de los routers...")
-    total_routers = len(routers)
-
-    # Conectar a todos los routers en hilos separados
-    threads = []
-    for i, router in enumerate(routers, start=1):
-        ip = router["ip"]
-        username = router["username"]
-        password = router["password"]
-        nombre = router.get("nombre")
-
-        # Usar functools.partial para pasar argumentos actuales al callback
-        resultado_verificacion = partial(
-            manejar_resultado_verificacion,
-            nombre=nombre,
-            accessible_routers=accessible_routers
-        )
+    # Las líneas no se resetean a negro: conservan su último color y la cola
+    # solo repinta las que cambien, así el mapa no parpadea
 
-        comandos = {
-            "running-config": "show running-config",
-            "Interface": "show ip interface brief",
-            "Ip route": "show ip route",
-            "ACL": "show access-lists",
-            "NAT": "show ip nat translations",
-            "DHCP": "show ip dhcp pool",
-        }
-
-        # Utilizar partial para enlazar correctamente los argumentos
-        t = threading.Thread(target=partial(conectar_telnet, ip, username, password, comandos, resultado_verificacion))
-        t.start()
-        threads.append(t)
-
-        progreso = (i / total_routers) * 30  # 30% para routers
-        actualizar_progreso(progreso, f"Verificando routers: {int(progreso)}%")
-    
-    # Esperar a que todas las verificaciones terminen
-    for t in threads:
-        t.join()
-
-    print("Verificación de routers completada.")
-
-def manejar_resultado_verificacion(resultados, nombre, accessible_routers):
-    """
-    Maneja el resultado de la verificación de un router.
-    Actualiza las líneas conectadas según el resultado.
-    """
-    if resultados:
-        accessible_routers.add(nombre)
-        # Marcar líneas conectadas en negro o dejarlas en negro si son conexiones SSH
-        connected_devices = router_to_devices.get(nombre, [])
-        for device_nombre in connected_devices:
-            device = find_device(device_nombre)
-            if device:
-                if device["tipo"] == "switch":
-                    line_color = "green"
-                elif device["tipo"] == "pc" or device["tipo"] == "vm":
-                    # Conexión a PC o VM: dejar en negro, se actualizará con ping
-                    line_color = "red"
-                else:
-                    # Otros tipos de dispositivos, por defecto negro
-                    line_color = "red"
-                line_name = f"line_{nombre}-{device_nombre}"
-                actualizar_linea_color(line_name, line_color)
-                line_colors[line_name] = line_color
-                print(f"Marca la línea {line_name} en {line_color} porque {nombre} está accesible.")
-    else:
-        accessible_routers.discard(nombre)
-        # Marcar líneas conectadas en rojo
-        connected_devices = router_to_devices.get(nombre, [])
-        for device_nombre in connected_devices:
-            line_name = f"line_{nombre}-{device_nombre}"
-            actualizar_linea_color(line_name, "red")
-            line_colors[line_name] = "red"
-            print(f"Marca la línea {line_name} en rojo porque {nombre} está inaccesible.")
-
-def monitorear_conexiones_routers(accessible_routers):
-    """
-    Verifica el estado de las conexiones entre routers y actualiza la topología.
-    Marca las líneas entre routers en verde si ambos routers son accesibles, de lo contrario en rojo.
-    """
-    print("Verificando conexiones entre routers...")
-    # Filtrar solo las conexiones entre routers
-    conexiones_entre_routers = [c for c in conexiones if c[0].startswith("R") and c[1].startswith("R")]
-    total_conexiones = len(conexiones_entre_routers)
-
-    contador = 0
-    for conexion in conexiones_entre_routers:
-        src, dst, ip_red = conexion
-        # Verificar si ambos routers están accesibles
-        if src in accessible_routers and dst in accessible_routers:
-            # Asumimos que si ambos routers son accesibles, la conexión está activa
-            color = "green"
-        else:
-            color = "red"
-        line_name = f"line_{src}-{dst}"
-        actualizar_linea_color(line_name, color)
-        line_colors[line_name] = color
-        print(f"Marca la línea {line_name} en {color} porque {'ambos routers son accesibles' if color == 'green' else 'al menos uno de los routers no es accesible'}.")
-        contador += 1
-        progreso = 30 + ((contador / total_conexiones) * 20)  # 30% routers + 20% conexiones
-        actualizar_progreso(progreso, f"Verificando conexiones entre routers: {int(progreso)}%")
-
-    print("Verificación de conexiones entre routers completada.")
-
-def monitorear_pcs(accessible_routers):
-    """
-    Verifica el estado de las PCs y la VM de Ubuntu, y actualiza la topología.
-    """
-    print("Verificando estado de las PCs y VM de Ubuntu...")
-    pcs = [device for device in devices if device["tipo"] in ["pc", "vm"]]
-    total_pcs = len(pcs)
-
-    for i, pc in enumerate(pcs, start=1):
-        pc_nombre = pc["nombre"]
-        pc_ip = pc["IP"]
-        print(f"Procesando {pc_nombre} ({pc_ip})...")
-        connected_router = find_connected_router(pc_nombre, accessible_routers)
-
-        if connected_router is None:
-            # No hay un router accesible conectado a esta PC o VM
-            switch_connected = find_connected_switch(pc_nombre)
-            line_name = f"line_{switch_connected}-{pc_nombre}" if switch_connected else None
-
-            if line_name and line_name in lineas_dict:
-                actualizar_linea_color(line_name, "red")
-                line_colors[line_name] = "red"
-                print(f"Marca la línea {line_name} en rojo porque no hay router accesible para {pc_nombre}.")
-            progreso = 50 + ((i / total_pcs) * 30)  # 50% para routers + 20% conexiones + 30% PCs y VM
-            actualizar_progreso(progreso, f"Verificando PCs y VM: {int(progreso)}%")
-            continue
-
-        # Caso especial: VM Ubuntu
-        if pc["tipo"] == "vm":
-            print(f"Verificando VM {pc_nombre} vía Telnet desde R1...")
-            estado = verificar_vm_via_telnet("R1", pc_ip)
-
-            # Actualizar líneas de conexión
-            line_name_vm = f"line_Switch1-{pc_nombre}"
-            line_name_switch = f"line_R1-Switch1"
-            color = "green" if estado else "red"
-
-            if line_name_vm in lineas_dict:
-                actualizar_linea_color(line_name_vm, color)
-                line_colors[line_name_vm] = color
-                print(f"Marca la línea {line_name_vm} en {color} porque {pc_nombre} está {'alcanzable' if estado else 'inaccesible'}.")
-            else:
-                print(f"Línea {line_name_vm} no encontrada en lineas_dict.")
-
-            if line_name_switch in lineas_dict:
-                actualizar_linea_color(line_name_switch, color)
-                line_colors[line_name_switch] = color
-                print(f"Marca la línea {line_name_switch} en {color} porque el ping hacia {pc_nombre} {'fue exitoso' if estado else 'falló'}.")
-            else:
-                print(f"Línea {line_name_switch} no encontrada en lineas_dict.")
-        else:
-            print(f"Verificando PC {pc_nombre} localmente...")
-            estado = verificar_pc_local(pc_ip)
-            line_name = f"line_{connected_router}-{pc_nombre}"
-            color = "green" if estado else "red"
-
-            if line_name in lineas_dict:
-                actualizar_linea_color(line_name, color)
-                line_colors[line_name] = color
-                print(f"Marca la línea {line_name} en {color} porque {pc_nombre} está {'alcanzable' if estado else 'inaccesible'}.")
-            else:
-                print(f"Línea {line_name} no encontrada en lineas_dict.")
-
-        progreso = 50 + ((i / total_pcs) * 30)
-        actualizar_progreso(progreso, f"Verificando PCs y VM: {int(progreso)}%")
+    # Resetear barras de progreso
+    actualizar_progreso(0, "Verificando: 0%")
+    await monitor.ejecutar_asincrono()
 
-def verificar_pc_local(pc_ip):
+def fin_monitoreo(resultado):
     """
-    Verifica si la PC está activa haciendo ping a su IP con un timeout.
+    Se llama en el bucle de fondo cuando termina el monitoreo, de cualquier forma.
     """
-    try:
-        # Comando de ping según el sistema operativo
-        if sys.platform.startswith('win'):
-            ping_cmd = f'ping -n 1 {pc_ip}'
-        else:
-            ping_cmd = f'ping -c 1 {pc_ip}'
-
-        # Ejecutar el comando de ping
-        resultado = os.system(ping_cmd + " > /dev/null 2>&1")
-        return resultado == 0
-    except Exception as e:
-        print(f"Error al verificar PC {pc_ip}: {e}")
-        return False
+    if resultado.estado == FALLIDO:
+        ventana.after(0, lambda: messagebox.showerror("Error", f"Error durante el monitoreo: {resultado.error}"))
+    elif resultado.estado != COMPLETADO:
+        actualizar_progreso(None, f"Monitoreo {resultado.estado} a los {resultado.segundos:.0f} s")
 
-def verificar_vm_via_telnet(router_nombre, vm_ip):
+# Un solo monitoreo completo a la vez, con plazo total; al cancelarlo también se cortan
+# las recolecciones de comandos que lanzó
+control_barrido = ControlBarrido(run_monitoreo, plazo=PLAZO_MONITOREO, al_cancelar=motor.cancelar_recolecciones)
+
+def monitorear_routers_asincrono():
     """
-    Verifica si la VM está activa haciendo ping desde el router especificado vía Telnet.
-    Retorna True si el ping es exitoso, False de lo contrario.
+    Inicia el monitoreo de routers, conexiones entre routers y PCs en el bucle de fondo para mantener
+    la GUI responsiva. Si ya hay uno en curso, la petición se une a él en lugar de lanzar otro.
     """
-    router = next((r for r in routers if r["nombre"] == router_nombre), None)
-    if not router:
-        print(f"Router {router_nombre} no encontrado.")
-        return False
+    if not control_barrido.solicitar(fin_monitoreo):
+        print("Ya hay un monitoreo en curso; no se lanza otro.")
 
-    ip = router["ip"]
-    username = router["username"]
-    password = router["password"]
+def cancelar_monitoreo():
+    if control_barrido.cancelar():
+        actualizar_progreso(None, "Cancelando...")
 
-    try:
-        print(f"Iniciando Telnet en {router_nombre} ({ip}) para hacer ping a {vm_ip}...")
-        tn = telnetlib.Telnet(ip, 23, timeout=10)
-        tn.read_until(b"Username:", timeout=5)
-        tn.write(username.encode("utf-8") + b"\n")
-        tn.read_until(b"Password:", timeout=5)
-        tn.write(password.encode("utf-8") + b"\n")
-
-        tn.expect([b">", b"#"], timeout=5)
-        tn.write(f"ping {vm_ip}".encode("utf-8") + b"\n")
-        salida = leer_comando_telnet(tn)
-        tn.write(b"exit\n")
-        tn.close()
-
-        # Log detallado de salida del ping
-        print(f"Salida del ping desde {router_nombre} hacia {vm_ip}:\n{salida}")
-
-        # Determinar el estado basado en la salida del ping
-        if "Success rate is 100 percent" in salida:
-            print(f"Resultado del ping desde {router_nombre} hacia {vm_ip}: éxito.")
-            return True
-        else:
-            print(f"Resultado del ping desde {router_nombre} hacia {vm_ip}: fracaso.")
-            return False
-
-    except Exception as e:
-        print(f"Error al verificar VM vía Telnet desde {router_nombre}: {e}")
-        return False
+# ==================
+#   Monitoreo continuo
+# ==================
 
-def run_monitoreo():
+async def sondear_lote_continuo(claves):
     """
-    Ejecuta las tareas de monitoreo de routers, conexiones entre routers y PCs de manera sincrónica en un hilo separado.
+    Sondea un lote de dispositivos del planificador y devuelve { nombre: True/False }.
     """
-    try:
-        accessible_routers = set()
-        monitorear_routers(accessible_routers)
-        monitorear_conexiones_routers(accessible_routers)
-        monitorear_pcs(accessible_routers)
-        # Finalizar la barra de progreso
-        actualizar_progreso(100, "Completado: 100%")
-        print("Monitoreo completo.")
-    except Exception as e:
-        messagebox.showerror("Error", f"Error durante el monitoreo: {e}")
+    return await monitor.sondear_lote(claves)
 
-def monitorear_routers_asincrono():
+def resultado_continuo(nombre, estado, anterior):
     """
-    Inicia el monitoreo de routers, conexiones entre routers y PCs en un hilo separado para mantener la GUI responsiva.
+    Aplica a la topología el resultado de un sondeo del planificador.
+    Solo se repinta cuando el estado cambia.
     """
-    inicio = time.time()
+    adelantar = monitor.aplicar_resultado(nombre, estado, anterior)
+    if adelantar:
+        # Lo que cuelga del router se vuelve a comprobar ya
+        planificador.adelantar(adelantar)
 
-    # Resetear líneas a negro
-    for line_name in lineas_dict:
-        actualizar_linea_color(line_name, "black")
+planificador = PlanificadorMonitoreo(sondear_lote_continuo, resultado_continuo)
 
-    # Resetear barras de progreso
-    actualizar_progreso(0, "Verificando: 0%")
-
-    # Iniciar monitoreo en un hilo separado
-    hilo = threading.Thread(target=run_monitoreo)
-    hilo.start()
-
-    fin = time.time()
-    print(f"Tiempo de monitoreo inicial: {fin - inicio:.2f} segundos")
+def alternar_monitoreo_continuo(activar):
+    """
+    Activa o detiene el monitoreo continuo en segundo plano.
+    """
+    if activar:
+        planificador.agregar(monitor.claves_continuo())
+        planificador.iniciar()
+        print("Monitoreo continuo activado.")
+    else:
+        planificador.detener()
+        print("Monitoreo continuo detenido.")
 
 # ======================
 #  Manejo de clic e UI
@@ -507,50 +194,26 @@ def monitorear_routers_asincrono():
 
 def clic_en_imagen(event):
     """
-    Se llama cuando se hace clic en el canvas.
+    Se llama cuando se hace clic (sin arrastrar) en el canvas.
     Identifica si se clickeó un router/PC/VM y abre la ventana emergente.
     """
-    x = event.x
-    y = event.y
-
-    for device in devices:
-        # Coordenadas reales en pantalla
-        ax, ay = device["actual_x"], device["actual_y"]
-
-        if device["tipo"] in ["pc", "vm"]:
-            ancho = imagen_pc.width()
-            alto = imagen_pc.height()
-        elif device["tipo"] == "switch":
-            ancho = imagen_switch.width()
-            alto = imagen_switch.height()
-        else:
-            ancho = imagen_router.width()
-            alto = imagen_router.height()
+    # Solo se examinan los dispositivos cercanos al clic (índice espacial del render)
+    device = render.dispositivo_en(event.x, event.y)
+    if device is not None:
+        # Abrir ventana con toda la info del dispositivo
+        abrir_ventana_device(device)
 
-        # Si clic dentro del bounding box de la imagen
-        if (ax - ancho//2 <= x <= ax + ancho//2) and (ay - alto//2 <= y <= ay + alto//2):
-            # Abrir ventana con toda la info del dispositivo
-            abrir_ventana_device(device)
-            break
-
-def abrir_ventana_device(device_dict):
+def abrir_ventana_device(device):
     """
     Ventana hija con detalles del dispositivo seleccionado.
     """
-    device_ip = device_dict["IP"]
-    username = "cisco"  # Valores por defecto
-    password = "cisco"
-
-    # Si es un router, obtener credenciales
-    if device_dict["tipo"] == "router":
-        for router in routers:
-            if router["ip"] == device_ip:
-                username = router["username"]
-                password = router["password"]
-                break
+    device_ip = device.ip
+    # Credenciales del router según la topología, "cisco" por defecto
+    username = device.username or "cisco"
+    password = device.password or "cisco"
 
     ventana_hija = ctk.CTkToplevel(ventana)
-    ventana_hija.title(f"Detalles - {device_dict['nombre']}")
+    ventana_hija.title(f"Detalles - {device.nombre}")
 
     # Tamaño deseado
     w_ventana2 = 750
@@ -567,169 +230,313 @@ def abrir_ventana_device(device_dict):
     frame_main.pack(fill="both", expand=True, padx=10, pady=10)
 
     # Información del dispositivo
-    tipo_display = device_dict["tipo"].capitalize()
+    tipo_display = device.tipo.capitalize()
     lbl_info = ctk.CTkLabel(
         frame_main,
-        text=f"Nombre: {device_dict['nombre']}\nIP: {device_ip}\nTipo: {tipo_display}",
+        text=f"Nombre: {device.nombre}\nIP: {device_ip}\nTipo: {tipo_display}",
         font=('Arial', 16)  # Define la fuente como una tupla
     )
     lbl_info.pack(pady=10)
 
+    # Disponibilidad y latencia de las últimas 24 horas
+    if historial is not None:
+        dibujar_sparklines(frame_main, device.nombre)
+
     # Botón de Conectar si es un router
-    if device_dict["tipo"] == "router":
+    if device.tipo == "router":
         btn_connect = ctk.CTkButton(
             master=frame_main,
-            text="Conectar vía Telnet",
-            command=lambda: conectar_telnet_popup(device_dict, username, password)
+            text=f"Conectar vía {pool_routers.nombre}",
+            command=lambda: conectar_telnet_popup(device, username, password)
         )
         btn_connect.pack(pady=10)
 
-def conectar_telnet_popup(device_dict, username, password):
-    """
-    Abre una ventana para mostrar la información del router conectado vía Telnet.
-    """
-    def conexion_telnet():
-        router_ip = device_dict["IP"]
-        comandos = {
-            "running-config": "show running-config",
-            "Interface": "show ip interface brief",
-            "Ip route": "show ip route",
-            "ACL": "show access-lists",
-            "NAT": "show ip nat translations",
-            "DHCP": "show ip dhcp pool",
-        }
-
-        def resultado_callback(resultados):
-            if resultados:
-                def crear_ventana_resultados():
-                    # Crear ventana hija para mostrar resultados
-                    ventana_resultados = ctk.CTkToplevel(ventana)
-                    ventana_resultados.title(f"Telnet - {device_dict['nombre']}")
-
-                    # Tamaño deseado
-                    w_resultados = 800
-                    h_resultados = 600
-
-                    # Centrar en la pantalla
-                    geometry_string = CenterWindowToDisplay(ventana_resultados, w_resultados, h_resultados)
-                    ventana_resultados.geometry(geometry_string)
-
-                    ventana_resultados.transient(ventana)
-                    ventana_resultados.lift()
-
-                    frame_result = ctk.CTkFrame(ventana_resultados)
-                    frame_result.pack(fill="both", expand=True, padx=10, pady=10)
-
-                    # Crear Tabview para los resultados
-                    notebook_result = ctk.CTkTabview(frame_result, width=760, height=550)
-                    notebook_result.pack(fill="both", expand=True)
-
-                    cuadros_texto = {}  # Definir cuadros_texto aquí
-                    for pestaña, contenido in resultados.items():
-                        notebook_result.add(pestaña)
-                        tab = notebook_result.tab(pestaña)
-                        text_box = tk.Text(tab, wrap="word")
-                        text_box.pack(fill="both", expand=True, padx=5, pady=5)
-                        text_box.insert("1.0", contenido)
-                        cuadros_texto[pestaña] = text_box  # Guardar referencia
-
-                ventana.after(0, crear_ventana_resultados)
+def abrir_panel_estadisticas():
+    """
+    Ventana con los histogramas de latencia (percentiles) de conexiones, logins,
+    comandos, pings y fases, y los routers y comandos más lentos.
+    """
+    ventana_stats = ctk.CTkToplevel(ventana)
+    ventana_stats.title("Estadísticas de latencia")
+    ventana_stats.geometry(CenterWindowToDisplay(ventana_stats, 900, 600))
+    ventana_stats.transient(ventana)
+    ventana_stats.lift()
+
+    frame_stats = ctk.CTkFrame(ventana_stats)
+    frame_stats.pack(fill="both", expand=True, padx=10, pady=10)
+
+    text_box = tk.Text(frame_stats, wrap="none", font=("Courier", 10))
+
+    def actualizar():
+        nombres = {router["ip"]: router["nombre"] for router in monitor.routers} if monitor else {}
+        text_box.configure(state="normal")
+        text_box.delete("1.0", "end")
+        text_box.insert("1.0", tabla_metricas(metricas, nombres))
+        text_box.configure(state="disabled")
+
+    def reiniciar():
+        metricas.reiniciar()
+        actualizar()
+
+    frame_botones = ctk.CTkFrame(frame_stats)
+    frame_botones.pack(fill="x")
+    ctk.CTkButton(frame_botones, text="Actualizar", command=actualizar).pack(side="left", padx=5, pady=5)
+    ctk.CTkButton(frame_botones, text="Reiniciar", command=reiniciar).pack(side="left", padx=5, pady=5)
+    text_box.pack(fill="both", expand=True, padx=5, pady=5)
+    actualizar()
+
+def dibujar_sparklines(master, clave, horas=24, cubetas=60):
+    """
+    Dibuja dos sparklines con el historial de un dispositivo: disponibilidad
+    (barras verdes/rojas por intervalo) y RTT medio (polilínea).
+    La consulta al historial se hace fuera del hilo de Tk (en un hilo del bucle de
+    fondo) y el resultado se pinta cuando llega a través de cola_gui.
+    """
+    etiqueta = ctk.CTkLabel(master, text=f"Últimas {horas} h - cargando historial...", font=('Arial', 12))
+    etiqueta.pack(pady=(5, 0))
+
+    ancho, alto = 600, 40
+    paso = ancho / cubetas
+
+    lienzo_uptime = tk.Canvas(master, width=ancho, height=alto, bg="white", highlightthickness=0)
+    lienzo_uptime.pack(pady=2)
+    lienzo_rtt = tk.Canvas(master, width=ancho, height=alto, bg="white", highlightthickness=0)
+    lienzo_rtt.pack(pady=2)
+
+    def pintar(resumen, uptime):
+        if not etiqueta.winfo_exists():
+            return  # Se cerró la ventana antes de que llegara el resultado
+        rtts = [c.valor_medio for c in resumen if c.valor_medio is not None]
+        texto_uptime = f"{uptime * 100:.1f}%" if uptime is not None else "sin datos"
+        texto_rtt = f"{sum(rtts) / len(rtts):.1f} ms (máx {max(rtts):.1f} ms)" if rtts else "sin datos"
+        etiqueta.configure(text=f"Últimas {horas} h - disponibilidad: {texto_uptime}, RTT medio: {texto_rtt}")
+
+        for i, cubeta in enumerate(resumen):
+            if cubeta.disponibilidad is None:
+                continue
+            color = "green" if cubeta.disponibilidad >= 0.999 else ("orange" if cubeta.disponibilidad > 0 else "red")
+            altura = max(2, cubeta.disponibilidad * alto) if cubeta.disponibilidad > 0 else alto
+            lienzo_uptime.create_rectangle(i * paso, alto - altura, (i + 1) * paso - 1, alto, fill=color, width=0)
+
+        if rtts:
+            maximo = max(rtts) or 1
+            puntos = []
+            for i, cubeta in enumerate(resumen):
+                if cubeta.valor_medio is not None:
+                    puntos.extend(((i + 0.5) * paso, alto - 2 - (cubeta.valor_medio / maximo) * (alto - 4)))
+            if len(puntos) >= 4:
+                lienzo_rtt.create_line(*puntos, fill="blue", width=1.5)
             else:
-                def mostrar_error():
-                    messagebox.showerror("Error", f"No se pudo obtener resultados vía Telnet para {router_ip}.")
-                ventana.after(0, mostrar_error)
+                lienzo_rtt.create_oval(puntos[0] - 2, puntos[1] - 2, puntos[0] + 2, puntos[1] + 2, fill="blue")
 
-        conectar_telnet(router_ip, username, password, comandos, resultado_callback)
+    def sin_historial():
+        if etiqueta.winfo_exists():
+            etiqueta.configure(text=f"Últimas {horas} h - historial no disponible")
 
-    # Iniciar la conexión Telnet en un hilo separado para no bloquear la GUI
-    hilo = threading.Thread(target=conexion_telnet)
-    hilo.start()
+    def al_terminar(futuro):
+        try:
+            cola_gui.llamar(pintar, *futuro.result())
+        except Exception as e:
+            print(f"No se pudo consultar el historial de {clave}: {e}")
+            cola_gui.llamar(sin_historial)
+
+    ahora = time.time()
+    futuro = asyncio.run_coroutine_threadsafe(
+        asyncio.to_thread(historial.resumir, clave, ahora - horas * 3600, ahora, cubetas),
+        pool_routers.bucle.loop(),
+    )
+    futuro.add_done_callback(al_terminar)
 
-# ==================
-#   DIBUJADO + ESCALA
-# ==================
+def conectar_telnet_popup(device, username, password):
+    """
+    Abre al instante la ventana con la información del router. Si el monitoreo ya
+    recolectó sus comandos (y no caducaron en la caché) se muestran indicando su
+    antigüedad; si no, cada comando se pide al router (por Telnet o SSH, según pool_routers)
+    al abrir su pestaña. Lo mismo con los que falten en la caché (con el backend SNMP,
+    todos salvo interfaces y rutas).
+    """
+    entrada = motor.colecciones.obtener(device.ip)
+    if entrada is not None:
+        crear_ventana_resultados(device, username, password, entrada.valor, entrada.instante)
+    else:
+        crear_ventana_resultados(device, username, password)
 
-def draw_topologia_escalada(canvas_w, canvas_h):
+def texto_antiguedad(segundos):
+    if segundos < 60:
+        return f"Datos de hace {int(segundos)} s"
+    if segundos < 3600:
+        return f"Datos de hace {int(segundos // 60)} min"
+    return f"Datos de hace {segundos / 3600:.1f} h"
+
+def crear_ventana_resultados(device, username, password, resultados=None, instante=None):
     """
-    Dibuja la topología completa con conexiones entre routers, switches, PCs y VM Ubuntu en la disposición solicitada.
+    Ventana con una pestaña por comando. Cada pestaña usa un VisorTexto, que solo dibuja
+    las líneas visibles (con búsqueda y filtro), y se crea al abrir la pestaña.
+    Sin resultados (o al pulsar "Actualizar") los comandos se ejecutan de uno en uno:
+    primero el de la pestaña visible y los demás en segundo plano, y la salida se va
+    añadiendo a su pestaña a medida que llega.
     """
-    lienzo.delete("all")
+    # Crear ventana hija para mostrar resultados
+    ventana_resultados = ctk.CTkToplevel(ventana)
+    ventana_resultados.title(f"{pool_routers.nombre} - {device.nombre}")
 
-    # Escalado y centrado
-    topo_width = max_x - min_x
-    topo_height = max_y - min_y
-    if topo_width <= 0 or topo_height <= 0:
-        return
+    # Tamaño deseado
+    w_resultados = 800
+    h_resultados = 600
+
+    # Centrar en la pantalla
+    geometry_string = CenterWindowToDisplay(ventana_resultados, w_resultados, h_resultados)
+    ventana_resultados.geometry(geometry_string)
+
+    ventana_resultados.transient(ventana)
+    ventana_resultados.lift()
+
+    frame_result = ctk.CTkFrame(ventana_resultados)
+    frame_result.pack(fill="both", expand=True, padx=10, pady=10)
+
+    # Antigüedad de los datos y botón para actualizarlos
+    frame_estado = ctk.CTkFrame(frame_result)
+    frame_estado.pack(fill="x")
+    lbl_antiguedad = ctk.CTkLabel(frame_estado, text="")
+    lbl_antiguedad.pack(side="left", padx=5)
+    btn_actualizar = ctk.CTkButton(frame_estado, text="Actualizar")
+    btn_actualizar.pack(side="right", padx=5, pady=5)
 
-    scale_w = (canvas_w * 0.8) / topo_width
-    scale_h = (canvas_h * 0.8) / topo_height
-    scale_factor = min(scale_w, scale_h)
-
-    cx_canvas = canvas_w // 2
-    cy_canvas = canvas_h // 2
-    cx_topo = (min_x + max_x) / 2
-    cy_topo = (min_y + max_y) / 2
-
-    text_font = font.Font(size=14, weight="bold")
-
-    def dibujar_texto_con_fondo(x, y, texto, fuente, color_texto="black", color_fondo="white"):
-        text_id = lienzo.create_text(x, y, text=texto, font=fuente, fill=color_texto, tags=f"text_{texto}")
-        x1, y1, x2, y2 = lienzo.bbox(text_id)
-        pad = 3
-        rect_id = lienzo.create_rectangle(x1 - pad, y1 - pad, x2 + pad, y2 + pad, fill=color_fondo, outline="")
-        lienzo.tag_lower(rect_id, text_id)
-
-    # Disposición de dispositivos
-    for device in devices:
-        ox, oy = device["orig_x"], device["orig_y"]
-        dx = ox - cx_topo
-        dy = oy - cy_topo
-        sx = dx * scale_factor
-        sy = dy * scale_factor
-        ax = cx_canvas + sx
-        ay = cy_canvas + sy
-        device["actual_x"] = ax
-        device["actual_y"] = ay
-
-    # Dibujar conexiones (líneas)
-    def dibujar_linea(r1, r2, ip_red, line_name):
+    contenidos = {pestaña: LineasTexto() for pestaña in comandos_show}  # Salida recibida, por pestaña
+    visores = {}  # Los VisorTexto que ya se crearon
+    pendientes = queue.Queue()  # Fragmentos que llegan del bucle de fondo
+    estado = {"instante": instante, "consulta": None, "terminados": 0, "total": 0}
+
+    def mostrar_pestaña(pestaña):
+        """
+        Crea el visor de la pestaña la primera vez que se muestra.
+        """
+        if pestaña not in visores:
+            visor = VisorTexto(notebook_result.tab(pestaña), contenidos[pestaña])
+            visor.pack(fill="both", expand=True, padx=5, pady=5)
+            visores[pestaña] = visor
+        if estado["consulta"] is not None:
+            estado["consulta"].pedir(pestaña)
+
+    # Crear Tabview para los resultados
+    notebook_result = ctk.CTkTabview(frame_result, width=760, height=550,
+                                     command=lambda: mostrar_pestaña(notebook_result.get()))
+    notebook_result.pack(fill="both", expand=True)
+    for pestaña in comandos_show:
+        notebook_result.add(pestaña)
+
+    def mostrar_estado():
+        if estado["consulta"] is not None:
+            lbl_antiguedad.configure(text=f"Consultando el router: {estado['terminados']}/{estado['total']} comandos")
+        elif estado["instante"] is not None:
+            lbl_antiguedad.configure(text=texto_antiguedad(time.monotonic() - estado["instante"]))
+
+    def vaciar_pendientes():
+        """
+        Aplica en el hilo de Tk lo que llegó del bucle de fondo y actualiza el estado cada segundo.
         """
-        Dibuja una línea en el canvas entre dos dispositivos y registra la línea en el diccionario.
+        if not ventana_resultados.winfo_exists():
+            return
+        try:
+            while True:
+                evento, pestaña, valor = pendientes.get_nowait()
+                if evento == "texto":
+                    contenidos[pestaña].agregar(valor)
+                    if pestaña in visores:
+                        visores[pestaña].actualizar()
+                elif evento == "fin":
+                    estado["terminados"] += 1
+                    if valor is not None:
+                        mensaje = f"\n[No se pudo obtener la salida: {valor}]"
+                        contenidos[pestaña].agregar(mensaje)
+                        if pestaña in visores:
+                            visores[pestaña].actualizar()
+                    if estado["terminados"] == estado["total"]:
+                        estado["consulta"] = None
+                        btn_actualizar.configure(state="normal")
+                elif evento == "completo":
+                    estado["instante"] = valor
+        except queue.Empty:
+            pass
+        mostrar_estado()
+        ventana_resultados.after(100 if estado["consulta"] is not None else 1000, vaciar_pendientes)
+
+    def al_completar(nuevos, base):
+        motor.guardar_coleccion(device.ip, {**base, **nuevos})
+        pendientes.put(("completo", None, time.monotonic()))
+
+    def consultar(comandos=comandos_show, base=None):
+        """
+        Vacía las pestañas de los comandos y vuelve a pedirlos al router. base son los
+        resultados de los demás comandos, que se guardan en la caché junto a los nuevos.
         """
-        x1, y1 = r1["actual_x"], r1["actual_y"]
-        x2, y2 = r2["actual_x"], r2["actual_y"]
-        color = line_colors.get(line_name, "black")
-        lid = lienzo.create_line(x1, y1, x2, y2, fill=color, width=5)
-        lineas_dict[line_name] = lid
-        mx = (x1 + x2) / 2
-        my = (y1 + y2) / 2
-        if ip_red:
-            dibujar_texto_con_fondo(mx, my, ip_red, text_font)
-        print(f"Línea dibujada: {line_name}, Color inicial: {color}")
-
-    # Dibujar conexiones
-    for conexion in conexiones:
-        src, dst, ip_red = conexion
-        r1 = find_device(src)
-        r2 = find_device(dst)
-        if r1 and r2:
-            dibujar_linea(r1, r2, ip_red, f"line_{src}-{dst}")
-            print(f"Línea inicializada: line_{src}-{dst}")
-
-    # Dibujar dispositivos
-    for device in devices:
-        ax, ay = device["actual_x"], device["actual_y"]
-        img = imagen_router if device["tipo"] == "router" else (
-            imagen_switch if device["tipo"] == "switch" else (
-                imagen_pc if device["tipo"] == "pc" else imagen_vm
-            )
+        base = base or {}
+        for pestaña in comandos:
+            contenidos[pestaña].vaciar()
+            if pestaña in visores:
+                visores[pestaña].actualizar()
+        estado["terminados"] = 0
+        estado["total"] = len(comandos)
+        btn_actualizar.configure(state="disabled")
+        router = {"ip": device.ip, "puerto": device.puerto, "puerto_ssh": device.puerto_ssh,
+                  "username": username, "password": password, "nombre": device.nombre}
+        consulta = ConsultaPorPestanas(
+            router, comandos, pool=pool_routers,
+            al_texto=lambda pestaña, texto: pendientes.put(("texto", pestaña, texto)),
+            al_terminar=lambda pestaña, completo, error: pendientes.put(
+                ("fin", pestaña, None if completo else (error or "tiempo de espera agotado"))
+            ),
+            al_completar=lambda nuevos: al_completar(nuevos, base),
         )
-        imagen = img  # Evitar garbage collector
-        tags = device["nombre"]
-        lienzo.create_image(ax, ay, image=imagen, anchor="center", tags=tags)
-        dibujar_texto_con_fondo(ax, ay + 30, device["nombre"], text_font)
+        estado["consulta"] = consulta
+        consulta.pedir(notebook_result.get())
+        consulta.iniciar()
+        mostrar_estado()
+
+    def cerrar():
+        if estado["consulta"] is not None:
+            estado["consulta"].cancelar()
+        ventana_resultados.destroy()
+
+    ventana_resultados.protocol("WM_DELETE_WINDOW", cerrar)
+    btn_actualizar.configure(command=consultar)
+
+    if resultados is not None:
+        for pestaña, contenido in resultados.items():
+            contenidos[pestaña] = LineasTexto(contenido)
+        faltan = {pestaña: comando for pestaña, comando in comandos_show.items() if pestaña not in resultados}
+        if faltan:
+            consultar(faltan, resultados)
+    else:
+        consultar()
+    mostrar_pestaña(notebook_result.get())
+    vaciar_pendientes()
 
-    lienzo.bind("<Button-1>", clic_en_imagen)
+# ==================
+#   DIBUJADO + ESCALA
+# ==================
+
+def draw_topologia_escalada(canvas_w, canvas_h):
+    """
+    Dibuja la topología completa la primera vez; después solo la reescala al tamaño del canvas.
+    """
+    global render
+    if render is None:
+        imagenes = {"router": imagen_router, "switch": imagen_switch, "pc": imagen_pc, "vm": imagen_vm}
+        text_font = font.Font(size=14, weight="bold")
+        render = RenderTopologia(lienzo, topologia, imagenes, lineas_dict, line_colors, text_font)
+        render.construir(canvas_w, canvas_h)
+        # Rueda: zoom; arrastrar: desplazar; clic: detalles; pasar por encima: tooltip
+        render.enlazar_eventos(clic_en_imagen)
+    else:
+        render.reescalar(canvas_w, canvas_h)
+
+def al_redimensionar(event):
+    """
+    <Configure> del canvas: el reescalado se agrupa para no repetirlo en cada evento al arrastrar el borde.
+    """
+    if render is not None:
+        render.programar_reescalado(event.width, event.height)
 
 # ==================
 #      Main
@@ -753,7 +560,7 @@ def main():
     # Canvas
     lienzo = tk.Canvas(canvas_frame, bg="white")
     lienzo.pack(fill="both", expand=True)
-    lienzo.bind("<Configure>", lambda event: draw_topologia_escalada(event.width, event.height))
+    lienzo.bind("<Configure>", al_redimensionar)
 
     # Frame inferior para botón y barra de progreso
     bottom_frame = ctk.CTkFrame(ventana)
@@ -766,6 +573,34 @@ def main():
     )
     btn_monitorear.pack(side="left", padx=5, pady=5)
 
+    btn_cancelar = ctk.CTkButton(
+        bottom_frame,
+        text="Cancelar",
+        command=cancelar_monitoreo
+    )
+    btn_cancelar.pack(side="left", padx=5, pady=5)
+
+    switch_continuo = ctk.CTkSwitch(
+        bottom_frame,
+        text="Monitoreo continuo",
+        command=lambda: alternar_monitoreo_continuo(switch_continuo.get() == 1)
+    )
+    switch_continuo.pack(side="left", padx=5, pady=5)
+
+    btn_ajustar = ctk.CTkButton(
+        bottom_frame,
+        text="Ajustar vista",
+        command=lambda: render.restablecer_vista() if render is not None else None
+    )
+    btn_ajustar.pack(side="left", padx=5, pady=5)
+
+    btn_estadisticas = ctk.CTkButton(
+        bottom_frame,
+        text="Estadísticas",
+        command=abrir_panel_estadisticas
+    )
+    btn_estadisticas.pack(side="left", padx=5, pady=5)
+
     global barra_progreso, etiqueta_progreso
     barra_progreso = ctk.CTkProgressBar(
         bottom_frame,
@@ -803,46 +638,20 @@ def main():
     )
     no_label.pack(side="left", padx=10, pady=5)
 
-    # Definir routers para verificación (Telnet)
-    global routers
-    routers = [
-        {"ip": "192.169.1.2", "username": "cisco", "password": "cisco", "nombre": "R2"},
-        {"ip": "192.169.1.3", "username": "cisco", "password": "cisco", "nombre": "R3"},
-        {"ip": "192.169.1.4", "username": "cisco", "password": "cisco", "nombre": "R4"},
-        {"ip": "192.169.1.5", "username": "cisco", "password": "cisco", "nombre": "R5"},
-        {"ip": "192.168.1.1", "username": "cisco", "password": "cisco", "nombre": "R1"},
-    ]
-
-    # Definir todos los dispositivos
-    global devices
-    devices = [
-        # Routers
-        {"nombre": "R1", "orig_x": 100, "orig_y": 200, "IP": "192.168.1.1", "tipo": "router"},
-        {"nombre": "R2", "orig_x": 400, "orig_y": 200, "IP": "192.169.1.2", "tipo": "router"},
-        {"nombre": "R3", "orig_x": 700, "orig_y": 200, "IP": "192.169.1.3", "tipo": "router"},
-        {"nombre": "R4", "orig_x": 400, "orig_y": 400, "IP": "192.169.1.4", "tipo": "router"},
-        {"nombre": "R5", "orig_x": 700, "orig_y": 400, "IP": "192.169.1.5", "tipo": "router"},
-        
-        # Switches
-        {"nombre": "Switch1", "orig_x": 100, "orig_y": 300, "IP": "192.168.100.1", "tipo": "switch"},
-        
-        # PCs
-        {"nombre": "PC12", "orig_x": 300, "orig_y": 100, "IP": "192.168.105.11", "tipo": "pc"},
-        {"nombre": "PC11", "orig_x": 400, "orig_y": 100, "IP": "192.168.106.11", "tipo": "pc"},
-        {"nombre": "PC10", "orig_x": 500, "orig_y": 100, "IP": "192.168.107.11", "tipo": "pc"},
-        {"nombre": "PC9", "orig_x": 600, "orig_y": 100, "IP": "192.168.108.11", "tipo": "pc"},
-        {"nombre": "PC8", "orig_x": 700, "orig_y": 100, "IP": "192.168.109.11", "tipo": "pc"},
-        {"nombre": "PC7", "orig_x": 800, "orig_y": 100, "IP": "192.168.110.11", "tipo": "pc"},
-        {"nombre": "PC1", "orig_x": 300, "orig_y": 500, "IP": "192.168.116.11", "tipo": "pc"},
-        {"nombre": "PC2", "orig_x": 400, "orig_y": 500, "IP": "192.168.115.11", "tipo": "pc"},
-        {"nombre": "PC3", "orig_x": 500, "orig_y": 500, "IP": "192.168.114.11", "tipo": "pc"},
-        {"nombre": "PC4", "orig_x": 600, "orig_y": 500, "IP": "192.168.113.11", "tipo": "pc"},
-        {"nombre": "PC5", "orig_x": 700, "orig_y": 500, "IP": "192.168.112.11", "tipo": "pc"},
-        {"nombre": "PC6", "orig_x": 800, "orig_y": 500, "IP": "192.168.111.11", "tipo": "pc"},
-        
-        # VM Ubuntu
-        {"nombre": "Ubuntu20.04VM-1", "orig_x": 100, "orig_y": 400, "IP": "192.168.100.11", "tipo": "vm"},
-    ]
+    # Cargar la topología y derivar de ella los routers para verificación (Telnet)
+    global topologia, monitor
+    try:
+        topologia = cargar_topologia(RUTA_TOPOLOGIA)
+    except Exception as e:
+        messagebox.showerror("Error de carga de la topología", f"No se pudo cargar {RUTA_TOPOLOGIA}: {e}")
+        return
+    global historial
+    try:
+        historial = HistorialEstados(RUTA_HISTORIAL)
+    except (OSError, ValueError) as e:
+        print(f"No se pudo abrir el historial {RUTA_HISTORIAL}: {e}")
+    monitor = Monitor(topologia, motor, barrido, comandos_show, origen_sondeo_pcs,
+                      al_color=actualizar_linea_color, al_progreso=actualizar_progreso, historial=historial)
 
     # Cargar imágenes
     global imagen_router, imagen_switch, imagen_pc, imagen_vm
@@ -856,48 +665,27 @@ def main():
         messagebox.showerror("Error de carga de imágenes", f"No se pudieron cargar las imágenes: {e}")
         return
 
-    # Definir la topología y calcular bounding box
-    global min_x, max_x, min_y, max_y
-
-    min_x = float('inf')
-    max_x = float('-inf')
-    min_y = float('inf')
-    max_y = float('-inf')
-
-    for device in devices:
-        if device["tipo"] in ["pc", "vm"]:
-            w_img = imagen_pc.width()
-            h_img = imagen_pc.height()
-        elif device["tipo"] == "switch":
-            w_img = imagen_switch.width()
-            h_img = imagen_switch.height()
-        else:
-            w_img = imagen_router.width()
-            h_img = imagen_router.height()
-
-        left = device["orig_x"] - w_img // 2
-        right = device["orig_x"] + w_img // 2
-        top = device["orig_y"] - h_img // 2
-        bottom = device["orig_y"] + h_img // 2
-
-        if left < min_x:
-            min_x = left
-        if right > max_x:
-            max_x = right
-        if top < min_y:
-            min_y = top
-        if bottom > max_y:
-            max_y = bottom
-
     # Dibujar la topología inicialmente (usando after para asegurar que la ventana esté lista)
     def iniciar_dibujo():
         draw_topologia_escalada(lienzo.winfo_width(), lienzo.winfo_height())
 
     ventana.after(100, iniciar_dibujo)
 
+    # Cola de actualizaciones de líneas y progreso, vaciada desde el bucle de Tk
+    global cola_gui
+    cola_gui = ColaActualizacionesGUI(ventana, lienzo, lineas_dict, line_colors, barra_progreso, etiqueta_progreso)
+    cola_gui.iniciar()
+
     # Iniciar loop
     ventana.mainloop()
 
+    # Detener los monitoreos y cerrar las sesiones Telnet (o SSH) que quedaron abiertas
+    control_barrido.cancelar()
+    planificador.detener()
+    pool_routers.cerrar_todo()
+    if historial is not None:
+        historial.cerrar()
+
 # ==================
 #   Ejecutar la Aplicación
 # ==================
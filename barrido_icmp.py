@@ -0,0 +1,295 @@
+import asyncio
+import random
+import socket
+import struct
+import time
+from collections import namedtuple
+
+from sesiones_telnet import bucle_telnet
+
+# ==================
+#   Barrido de alcanzabilidad
+# ==================
+
+# Resultado del sondeo de un host: rtt en segundos (None si no respondió),
+# metodo es "icmp", "tcp" o "udp"
+ResultadoSondeo = namedtuple("ResultadoSondeo", "ip alcanzable rtt metodo")
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# Puertos que suelen responder (aceptando o con RST) en PCs Windows/Linux
+PUERTOS_TCP = (445, 3389, 22, 135, 139, 80, 443)
+PUERTO_UDP = 33434  # Puerto alto sin servicio: el host responde con ICMP port unreachable
+
+# Lo que ocupa en el buffer de recepción del kernel cada Echo Reply (84 bytes más la
+# sobrecarga de cada paquete): con él se calcula cuántos sondeos caben en vuelo
+BYTES_POR_RESPUESTA = 2048
+
+
+def checksum_icmp(datos):
+    """
+    Suma de verificación de Internet (RFC 1071).
+    """
+    if len(datos) % 2:
+        datos += b"\x00"
+    total = sum(struct.unpack(f"!{len(datos) // 2}H", datos))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def paquete_echo(identificador, secuencia):
+    """
+    Construye un ICMP Echo Request de 64 bytes.
+    """
+    carga = b"nullbytes-monitor".ljust(56, b"\x00")
+    cabecera = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, identificador, secuencia)
+    suma = checksum_icmp(cabecera + carga)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, suma, identificador, secuencia) + carga
+
+
+def abrir_socket_icmp(buffer_recepcion=8 * 1024 * 1024):
+    """
+    Abre un socket ICMP si el proceso tiene permiso: raw (root/CAP_NET_RAW) o,
+    en Linux/macOS, el socket de ping sin privilegios, con buffer_recepcion bytes de
+    buffer de recepción (o lo que conceda el sistema). Devuelve (socket, es_raw) o (None, False).
+    """
+    for tipo, es_raw in ((socket.SOCK_RAW, True), (socket.SOCK_DGRAM, False)):
+        try:
+            sock = socket.socket(socket.AF_INET, tipo, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_recepcion)
+        except OSError:
+            pass  # Se queda con el tamaño por defecto
+        return sock, es_raw
+    return None, False
+
+
+class BarridoAlcanzabilidad:
+    """
+    Comprueba en paralelo si muchos hosts responden.
+    - timeout: segundos de espera por host.
+    - ventana: sondeos ICMP en vuelo como máximo; se reduce a las respuestas que caben
+      en el buffer de recepción que conceda el sistema (las que no caben se pierden y
+      el host parecería caído).
+    - buffer_recepcion: bytes de buffer de recepción que se piden para el socket ICMP.
+    - ventana_sin_icmp: hosts sondeados a la vez por TCP/UDP (cada uno abre varios
+      sockets, así que se limita más para no agotar los descriptores).
+    Usa ICMP Echo cuando el proceso puede abrir un socket ICMP y, si no,
+    sondeos TCP (connect) y UDP (port unreachable).
+    Un barrido completo tarda del orden de un timeout, no uno por host.
+    """
+
+    def __init__(self, timeout=1.0, ventana=2048, ventana_sin_icmp=100, puertos_tcp=PUERTOS_TCP,
+                 buffer_recepcion=8 * 1024 * 1024, bucle=bucle_telnet):
+        self.timeout = timeout
+        self.ventana = ventana
+        self.buffer_recepcion = buffer_recepcion
+        self.ventana_sin_icmp = ventana_sin_icmp
+        self.puertos_tcp = puertos_tcp
+        self.bucle = bucle
+
+    async def barrer(self, ips):
+        """
+        Sondea todas las IPs y devuelve { ip: ResultadoSondeo }.
+        """
+        ips = list(dict.fromkeys(ips))
+        if not ips:
+            return {}
+        sock, es_raw = abrir_socket_icmp(self.buffer_recepcion)
+        if sock is None:
+            semaforo = asyncio.Semaphore(self.ventana_sin_icmp)
+            resultados = await asyncio.gather(*(self._sondear_sin_icmp(ip, semaforo) for ip in ips))
+            return {r.ip: r for r in resultados}
+
+        concedido = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        semaforo = asyncio.Semaphore(max(1, min(self.ventana, concedido // BYTES_POR_RESPUESTA)))
+        loop = asyncio.get_running_loop()
+        identificador = random.randint(0, 0xFFFF)
+        esperando = {}  # { (ip, secuencia): (futuro, instante_envio) }
+
+        def al_recibir():
+            while True:
+                try:
+                    datos, (origen, _) = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    return
+                if datos and datos[0] >> 4 == 4:
+                    datos = datos[(datos[0] & 0x0F) * 4:]  # Quitar la cabecera IP
+                if len(datos) < 8:
+                    continue
+                tipo, codigo, suma, ident, secuencia = struct.unpack("!BBHHH", datos[:8])
+                # El socket sin privilegios reescribe el identificador; el kernel ya filtra
+                if tipo != ICMP_ECHO_REPLY or (es_raw and ident != identificador):
+                    continue
+                pendiente = esperando.pop((origen, secuencia), None)
+                if pendiente and not pendiente[0].done():
+                    pendiente[0].set_result(time.perf_counter() - pendiente[1])
+
+        async def sondear(ip, secuencia):
+            async with semaforo:
+                futuro = loop.create_future()
+                esperando[(ip, secuencia)] = (futuro, time.perf_counter())
+                try:
+                    sock.sendto(paquete_echo(identificador, secuencia), (ip, 0))
+                    rtt = await asyncio.wait_for(futuro, self.timeout)
+                    return ResultadoSondeo(ip, True, rtt, "icmp")
+                except (asyncio.TimeoutError, OSError):
+                    return ResultadoSondeo(ip, False, None, "icmp")
+                finally:
+                    esperando.pop((ip, secuencia), None)
+
+        loop.add_reader(sock.fileno(), al_recibir)
+        try:
+            resultados = await asyncio.gather(*(
+                sondear(ip, i & 0xFFFF) for i, ip in enumerate(ips)
+            ))
+        finally:
+            loop.remove_reader(sock.fileno())
+            sock.close()
+        return {r.ip: r for r in resultados}
+
+    async def _sondear_sin_icmp(self, ip, semaforo):
+        """
+        Sondeo sin privilegios: TCP a varios puertos y UDP a la vez; gana la primera respuesta.
+        """
+        async with semaforo:
+            inicio = time.perf_counter()
+            tareas = [asyncio.ensure_future(self._sondeo_tcp(ip, puerto)) for puerto in self.puertos_tcp]
+            tareas.append(asyncio.ensure_future(self._sondeo_udp(ip)))
+            try:
+                for siguiente in asyncio.as_completed(tareas, timeout=self.timeout):
+                    try:
+                        metodo = await siguiente
+                    except asyncio.TimeoutError:
+                        break
+                    if metodo:
+                        return ResultadoSondeo(ip, True, time.perf_counter() - inicio, metodo)
+            finally:
+                for tarea in tareas:
+                    tarea.cancel()
+            return ResultadoSondeo(ip, False, None, "tcp/udp")
+
+    async def _sondeo_tcp(self, ip, puerto):
+        """
+        El host está vivo si acepta la conexión o la rechaza con RST.
+        """
+        try:
+            reader, writer = await asyncio.open_connection(ip, puerto)
+        except ConnectionRefusedError:
+            return "tcp"
+        except OSError:
+            return None
+        writer.close()
+        return "tcp"
+
+    async def _sondeo_udp(self, ip):
+        """
+        El host está vivo si contesta o devuelve ICMP port unreachable
+        (que el socket UDP conectado recibe como ConnectionRefusedError).
+        """
+        loop = asyncio.get_running_loop()
+        respuesta = loop.create_future()
+
+        class _Protocolo(asyncio.DatagramProtocol):
+            def datagram_received(self, datos, origen):
+                if not respuesta.done():
+                    respuesta.set_result("udp")
+
+            def error_received(self, exc):
+                if not respuesta.done():
+                    respuesta.set_result("udp" if isinstance(exc, ConnectionRefusedError) else None)
+
+        try:
+            transporte, protocolo = await loop.create_datagram_endpoint(
+                _Protocolo, remote_addr=(ip, PUERTO_UDP)
+            )
+        except OSError:
+            return None
+        try:
+            transporte.sendto(b"\x00")
+            return await respuesta
+        finally:
+            transporte.close()
+
+    def barrer_bloqueante(self, ips):
+        """
+        Lanza el barrido en el bucle de fondo y espera a que termine.
+        """
+        return self.bucle.ejecutar(self.barrer(ips))
+
+# ==================
+#   Barridos agrupados
+# ==================
+
+class BarridoPorLotes:
+    """
+    Junta en un solo barrido las IPs que piden casi a la vez distintas tareas (por ejemplo
+    las PCs de cada router a medida que sus routers responden): en vez de un socket ICMP
+    y un timeout por petición, se lanza un barrido por cada ventana de espera segundos.
+    Se usa dentro del bucle de fondo.
+    """
+
+    def __init__(self, barrido, espera=0.05):
+        self.barrido = barrido
+        self.espera = espera
+        self._lote = {}        # { ip: asyncio.Future } pendientes de lanzar
+        self._programado = None
+        self._en_curso = set()  # Tareas de los barridos lanzados
+
+    async def sondear(self, ips):
+        """
+        Sondea las IPs en el próximo lote y devuelve { ip: ResultadoSondeo }.
+        """
+        ips = list(dict.fromkeys(ips))
+        if not ips:
+            return {}
+        loop = asyncio.get_running_loop()
+        futuros = []
+        for ip in ips:
+            futuro = self._lote.get(ip)
+            if futuro is None:
+                futuro = self._lote[ip] = loop.create_future()
+            futuros.append(futuro)
+        if self._programado is None:
+            self._programado = loop.call_later(self.espera, self._lanzar)
+        resultados = await asyncio.gather(*futuros)
+        return {r.ip: r for r in resultados}
+
+    def _lanzar(self):
+        lote, self._lote, self._programado = self._lote, {}, None
+        # Las IPs cuyas tareas ya se cancelaron no se sondean
+        lote = {ip: futuro for ip, futuro in lote.items() if not futuro.done()}
+        if lote:
+            tarea = asyncio.ensure_future(self._barrer(lote))
+            self._en_curso.add(tarea)
+            tarea.add_done_callback(self._en_curso.discard)
+
+    def cancelar(self):
+        """
+        Descarta el lote pendiente y detiene los barridos en curso.
+        """
+        if self._programado is not None:
+            self._programado.cancel()
+            self._programado = None
+        for futuro in self._lote.values():
+            futuro.cancel()
+        self._lote = {}
+        for tarea in list(self._en_curso):
+            tarea.cancel()
+
+    async def _barrer(self, lote):
+        try:
+            resultados = await self.barrido.barrer(list(lote))
+        except Exception as e:
+            print(f"Error en el barrido de {len(lote)} hosts: {e}")
+            resultados = {}
+        for ip, futuro in lote.items():
+            if not futuro.done():
+                futuro.set_result(resultados.get(ip) or ResultadoSondeo(ip, False, None, None))
@@ -0,0 +1,227 @@
+"""
+Benchmark de extremo a extremo del monitoreo contra routers IOS simulados (simulador_ios.py).
+
+Para cada tamaño (10, 100 y 1000 routers por defecto) levanta el simulador en un
+proceso aparte, ejecuta un monitoreo completo y otro en caliente (sesiones ya en el
+pool, sin recolección) y mide el tiempo total, el de cada fase, lo que tardan las
+recolecciones en segundo plano, la CPU que gasta por router y el pico de memoria
+del proceso que monitorea.
+Cada tamaño corre en su propio proceso para que el pico de memoria no se acumule.
+
+    python benchmark_monitoreo.py
+    python benchmark_monitoreo.py --routers 10 100 --salida actual.json
+    python benchmark_monitoreo.py --referencia base.json --tolerancia 1.5
+    python benchmark_monitoreo.py --backend snmp    # recolección por SNMP en lugar de Telnet
+    python benchmark_monitoreo.py --backend ssh     # routers por SSH (necesita asyncssh)
+
+Con --referencia termina con código 1 si algún tiempo empeora más que la tolerancia.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from simulador_ios import perfiles_simulados, topologia_simulada
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Métricas de tiempo que se comparan con la referencia
+METRICAS_TIEMPO = ("total", "routers", "conexiones", "pcs", "recoleccion", "total_caliente")
+
+
+def argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del monitoreo con routers simulados.")
+    parser.add_argument("--routers", type=int, nargs="+", default=[10, 100, 1000], help="Tamaños a medir.")
+    parser.add_argument("--puerto", type=int, default=2323, help="Puerto de los routers simulados.")
+    parser.add_argument("--latencia", type=float, default=0.005, help="Latencia simulada por comando (s).")
+    parser.add_argument("--lineas", type=int, default=40, help="Tamaño de las salidas simuladas.")
+    parser.add_argument("--lentos", type=float, default=0.05, help="Fracción de routers lentos.")
+    parser.add_argument("--caidos", type=float, default=0.05, help="Fracción de routers caídos.")
+    parser.add_argument("--colgados", type=float, default=0.0, help="Fracción de routers que no responden.")
+    parser.add_argument("--origen-pcs", choices=("local", "gateway"), default="gateway",
+                        help="Sondear las PCs desde este equipo o con ping desde su router.")
+    parser.add_argument("--backend", choices=("telnet", "ssh", "snmp"), default="telnet",
+                        help="Backend de la recolección completa de los routers.")
+    parser.add_argument("--puerto-snmp", type=int, default=1161, help="Puerto SNMP de los routers simulados.")
+    parser.add_argument("--puerto-ssh", type=int, default=2222, help="Puerto SSH de los routers simulados.")
+    parser.add_argument("--limite-recoleccion", type=float, default=120.0,
+                        help="Segundos máximos de espera a las recolecciones en segundo plano.")
+    parser.add_argument("--salida", help="Guardar los resultados en este fichero JSON.")
+    parser.add_argument("--referencia", help="Resultados anteriores (JSON) con los que comparar.")
+    parser.add_argument("--tolerancia", type=float, default=1.5,
+                        help="Cuántas veces más lento que la referencia se considera regresión.")
+    parser.add_argument("--hijo", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def _opciones_simulador(args, cantidad):
+    return ["--routers", str(cantidad), "--puerto", str(args.puerto), "--latencia", str(args.latencia),
+            "--lineas", str(args.lineas), "--lentos", str(args.lentos), "--caidos", str(args.caidos),
+            "--colgados", str(args.colgados)]
+
+
+def _subir_limite_descriptores():
+    # Cada router usa un socket (más la sesión del pool que queda abierta)
+    blando, duro = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if duro == resource.RLIM_INFINITY or duro > blando:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (duro if duro != resource.RLIM_INFINITY else 65536, duro))
+
+
+def _cpu_segundos():
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    return uso.ru_utime + uso.ru_stime
+
+
+def _memoria_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+# ==================
+#   Medición de un tamaño (proceso hijo)
+# ==================
+
+def medir(args, cantidad):
+    """
+    Monitoreo completo y en caliente de cantidad routers simulados. Devuelve un diccionario de métricas.
+    """
+    from monitoreo import Monitor
+    from motor_sondeo import MotorSondeo
+    from recolectores import crear_recolector, pool_de_backend
+    from topologia import topologia_desde_dict
+
+    perfiles = perfiles_simulados(cantidad, latencia=args.latencia, lineas=args.lineas,
+                                  lentos=args.lentos, caidos=args.caidos, colgados=args.colgados)
+    puerto_snmp = args.puerto_snmp if args.backend == "snmp" else None
+    puerto_ssh = args.puerto_ssh if args.backend == "ssh" else None
+    topologia = topologia_desde_dict(topologia_simulada(perfiles, args.puerto, puerto_snmp=puerto_snmp,
+                                                        puerto_ssh=puerto_ssh))
+    memoria_inicial = _memoria_pico_mb()
+
+    pool = pool_de_backend(args.backend)
+    motor = MotorSondeo(pool, limite_concurrencia=100, recolector=crear_recolector(args.backend, pool))
+    monitor = Monitor(topologia, motor, origen_sondeo_pcs=args.origen_pcs)
+
+    inicio = time.perf_counter()
+    cpu_inicial = _cpu_segundos()
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        accesibles = monitor.ejecutar()
+        tiempos = dict(monitor.tiempos_fases)
+        # Las recolecciones de comandos siguen en segundo plano tras el nivel rápido
+        pendientes = motor.esperar_recolecciones_bloqueante(args.limite_recoleccion)
+        tiempos["recoleccion"] = time.perf_counter() - inicio
+        cpu = _cpu_segundos() - cpu_inicial
+
+        monitor.ejecutar()
+        tiempos["total_caliente"] = monitor.tiempos_fases["total"]
+        pool.cerrar_todo()
+
+    return {
+        "routers": cantidad,
+        "accesibles": len(accesibles),
+        "recolectados": len(motor.colecciones),
+        "recolecciones_pendientes": pendientes,
+        # CPU del monitoreo completo (con sus recolecciones) por router, en ms
+        "cpu_ms_router": round(cpu * 1000 / cantidad, 3),
+        "tiempos": {clave: round(valor, 4) for clave, valor in tiempos.items()},
+        "memoria_pico_mb": round(_memoria_pico_mb(), 1),
+        "memoria_inicial_mb": round(memoria_inicial, 1),
+    }
+
+
+def ejecutar_hijo(args):
+    _subir_limite_descriptores()
+    simulador = subprocess.Popen(
+        [sys.executable, os.path.join(DIRECTORIO, "simulador_ios.py")] + _opciones_simulador(args, args.hijo)
+        + (["--snmp", str(args.puerto_snmp)] if args.backend == "snmp" else [])
+        + (["--ssh", str(args.puerto_ssh)] if args.backend == "ssh" else []),
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        if not simulador.stdout.readline():  # Espera al mensaje de que ya escucha
+            raise RuntimeError(f"El simulador no pudo arrancar (¿puerto {args.puerto} ocupado?).")
+        resultado = medir(args, args.hijo)
+    finally:
+        simulador.terminate()
+        simulador.wait(10)
+    print(json.dumps(resultado))
+    return 0
+
+# ==================
+#   Informe y comparación
+# ==================
+
+def medir_en_proceso(args, cantidad):
+    argv = [sys.executable, os.path.abspath(__file__), "--hijo", str(cantidad),
+            "--origen-pcs", args.origen_pcs, "--limite-recoleccion", str(args.limite_recoleccion),
+            "--backend", args.backend, "--puerto-snmp", str(args.puerto_snmp), "--puerto-ssh", str(args.puerto_ssh)]
+    argv += _opciones_simulador(args, cantidad)[2:]
+    salida = subprocess.run(argv, stdout=subprocess.PIPE, text=True, check=True, cwd=DIRECTORIO).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def imprimir_tabla(resultados):
+    columnas = ("routers", "accesibles", "total", "routers_s", "conexiones", "pcs", "recoleccion",
+                "caliente", "cpu_ms_rtr", "memoria_mb")
+    print(" ".join(f"{c:>11}" for c in columnas))
+    for r in resultados:
+        t = r["tiempos"]
+        fila = (r["routers"], r["accesibles"], f"{t['total']:.3f}", f"{t['routers']:.3f}", f"{t['conexiones']:.3f}",
+                f"{t['pcs']:.3f}", f"{t['recoleccion']:.3f}", f"{t['total_caliente']:.3f}", r.get("cpu_ms_router", "-"),
+                r["memoria_pico_mb"])
+        print(" ".join(f"{v:>11}" for v in fila))
+
+
+def regresiones(resultados, referencia, tolerancia):
+    """
+    Compara con los resultados de referencia; devuelve una lista de textos con cada regresión.
+    Los tiempos muy pequeños (< 50 ms) no se comparan porque dominan el ruido.
+    """
+    anteriores = {r["routers"]: r for r in referencia}
+    encontradas = []
+    for r in resultados:
+        anterior = anteriores.get(r["routers"])
+        if anterior is None:
+            continue
+        for metrica in METRICAS_TIEMPO:
+            actual, base = r["tiempos"].get(metrica), anterior["tiempos"].get(metrica)
+            if actual is None or base is None or max(actual, base) < 0.05:
+                continue
+            if actual > base * tolerancia:
+                encontradas.append(f"{r['routers']} routers, {metrica}: {actual:.3f} s (referencia {base:.3f} s)")
+        if r["memoria_pico_mb"] > anterior["memoria_pico_mb"] * tolerancia:
+            encontradas.append(f"{r['routers']} routers, memoria: {r['memoria_pico_mb']} MB "
+                               f"(referencia {anterior['memoria_pico_mb']} MB)")
+    return encontradas
+
+
+def main(argv=None):
+    args = argumentos(argv)
+    if args.hijo is not None:
+        return ejecutar_hijo(args)
+
+    resultados = []
+    for cantidad in args.routers:
+        print(f"Midiendo {cantidad} routers...", file=sys.stderr)
+        resultados.append(medir_en_proceso(args, cantidad))
+    imprimir_tabla(resultados)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+    if args.referencia:
+        with open(args.referencia, encoding="utf-8") as f:
+            encontradas = regresiones(resultados, json.load(f), args.tolerancia)
+        for texto in encontradas:
+            print(f"Regresión: {texto}", file=sys.stderr)
+        if encontradas:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Valor guardado y el instante (time.monotonic) en que se guardó
+EntradaCache = namedtuple("EntradaCache", "valor instante")
+
+
+class CacheTTL:
+    """
+    Caché acotada con caducidad: cada entrada vale ttl segundos desde que se guarda y,
+    si se supera max_entradas, se descarta la usada hace más tiempo (LRU).
+    Las entradas caducadas se eliminan al consultarlas o con purgar().
+    Se puede usar desde cualquier hilo (el motor escribe en el bucle de fondo y la GUI lee).
+    """
+
+    def __init__(self, ttl=900, max_entradas=2000):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # { clave: EntradaCache }, de la menos a la más usada
+        self._lock = threading.Lock()
+
+    def poner(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = EntradaCache(valor, time.monotonic())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def obtener(self, clave):
+        """
+        EntradaCache vigente de la clave, o None si no hay o ya caducó.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if time.monotonic() - entrada.instante > self.ttl:
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada
+
+    def get(self, clave, defecto=None):
+        """
+        Como dict.get: el valor vigente o defecto.
+        """
+        entrada = self.obtener(clave)
+        return entrada.valor if entrada is not None else defecto
+
+    def edad(self, clave):
+        """
+        Segundos desde que se guardó la entrada vigente (None si no hay).
+        """
+        entrada = self.obtener(clave)
+        return time.monotonic() - entrada.instante if entrada is not None else None
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._entradas.pop(clave, None)
+
+    def purgar(self):
+        """
+        Elimina las entradas caducadas y devuelve cuántas quitó.
+        """
+        limite = time.monotonic() - self.ttl
+        with self._lock:
+            caducadas = [clave for clave, entrada in self._entradas.items() if entrada.instante < limite]
+            for clave in caducadas:
+                del self._entradas[clave]
+        return len(caducadas)
+
+    def __contains__(self, clave):
+        return self.obtener(clave) is not None
+
+    def __len__(self):
+        return len(self._entradas)
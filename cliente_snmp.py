@@ -0,0 +1,365 @@
+import asyncio
+import itertools
+import random
+import socket
+from collections import namedtuple
+
+# ==================
+#   Codificación BER (el subconjunto que usa SNMP v2c)
+# ==================
+
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+COUNTER64 = 0x46
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+# PDUs
+GET_REQUEST = 0xA0
+GET_NEXT_REQUEST = 0xA1
+RESPONSE = 0xA2
+GET_BULK_REQUEST = 0xA5
+
+VERSION_2C = 1
+
+# Valor con un tipo de aplicación (IpAddress, TimeTicks, Gauge32...) para codificarlo;
+# los int, bytes/str, tuplas (OID) y None se codifican como INTEGER, OCTET STRING, OID y NULL
+Tipado = namedtuple("Tipado", "etiqueta valor")
+
+# Valores de excepción de una respuesta (la variable no existe o se acabó la MIB)
+SIN_VALOR = (NO_SUCH_OBJECT, NO_SUCH_INSTANCE, END_OF_MIB_VIEW)
+
+# Mensaje SNMP decodificado; varbinds es una lista de (oid, valor)
+MensajeSNMP = namedtuple("MensajeSNMP", "version comunidad pdu request_id error_status error_index varbinds")
+
+
+def oid(texto):
+    """
+    "1.3.6.1.2.1.1.3.0" -> (1, 3, 6, 1, 2, 1, 1, 3, 0)
+    """
+    return tuple(int(parte) for parte in texto.strip(".").split("."))
+
+
+def _longitud(n):
+    if n < 0x80:
+        return bytes((n,))
+    octetos = n.to_bytes((n.bit_length() + 7) // 8, "big")
+    return bytes((0x80 | len(octetos),)) + octetos
+
+
+def _tlv(etiqueta, contenido):
+    return bytes((etiqueta,)) + _longitud(len(contenido)) + contenido
+
+
+def _entero(n):
+    return n.to_bytes(max(1, (n.bit_length() + 8) // 8), "big", signed=True)
+
+
+def _sin_signo(n):
+    # Counter/Gauge/TimeTicks son sin signo: un 0 delante si el bit alto está a 1
+    return n.to_bytes(max(1, (n.bit_length() + 8) // 8), "big")
+
+
+def _subidentificador(n):
+    partes = [n & 0x7F]
+    n >>= 7
+    while n:
+        partes.append(0x80 | (n & 0x7F))
+        n >>= 7
+    return bytes(reversed(partes))
+
+
+def codificar_oid(valor):
+    contenido = _subidentificador(valor[0] * 40 + valor[1])
+    return _tlv(OBJECT_IDENTIFIER, contenido + b"".join(_subidentificador(n) for n in valor[2:]))
+
+
+def codificar_valor(valor):
+    if valor is None:
+        return _tlv(NULL, b"")
+    if isinstance(valor, Tipado):
+        if valor.etiqueta == IP_ADDRESS:
+            return _tlv(IP_ADDRESS, bytes(int(o) for o in valor.valor.split(".")))
+        if valor.etiqueta in SIN_VALOR:
+            return _tlv(valor.etiqueta, b"")
+        return _tlv(valor.etiqueta, _sin_signo(valor.valor))
+    if isinstance(valor, int):
+        return _tlv(INTEGER, _entero(int(valor)))
+    if isinstance(valor, str):
+        valor = valor.encode("utf-8")
+    if isinstance(valor, bytes):
+        return _tlv(OCTET_STRING, valor)
+    if isinstance(valor, tuple):
+        return codificar_oid(valor)
+    raise TypeError(f"Tipo SNMP no soportado: {type(valor).__name__}")
+
+
+def codificar_varbind(o, valor):
+    return _tlv(SEQUENCE, codificar_oid(o) + codificar_valor(valor))
+
+
+def codificar_mensaje(comunidad, pdu, request_id, varbinds, error_status=0, error_index=0):
+    """
+    Mensaje SNMP v2c. En GETBULK error_status/error_index son non-repeaters/max-repetitions.
+    Cada varbind es (oid, valor) o ya codificado con codificar_varbind (bytes).
+    """
+    lista = b"".join(vb if isinstance(vb, bytes) else codificar_varbind(*vb) for vb in varbinds)
+    cuerpo = (_tlv(INTEGER, _entero(request_id)) + _tlv(INTEGER, _entero(error_status))
+              + _tlv(INTEGER, _entero(error_index)) + _tlv(SEQUENCE, lista))
+    if isinstance(comunidad, str):
+        comunidad = comunidad.encode("utf-8")
+    return _tlv(SEQUENCE, _tlv(INTEGER, _entero(VERSION_2C)) + _tlv(OCTET_STRING, comunidad) + _tlv(pdu, cuerpo))
+
+
+def _leer(datos, pos):
+    """
+    Lee un TLV en pos. Devuelve (etiqueta, inicio del contenido, fin del contenido).
+    """
+    etiqueta = datos[pos]
+    n = datos[pos + 1]
+    pos += 2
+    if n & 0x80:
+        octetos = n & 0x7F
+        n = int.from_bytes(datos[pos:pos + octetos], "big")
+        pos += octetos
+    if pos + n > len(datos):
+        raise ValueError("Mensaje SNMP truncado.")
+    return etiqueta, pos, pos + n
+
+
+def _decodificar_oid(contenido):
+    if max(contenido) < 0x80:
+        # Todos los subidentificadores caben en un byte (lo habitual)
+        partes = contenido
+    else:
+        partes = []
+        n = 0
+        for byte in contenido:
+            n = (n << 7) | (byte & 0x7F)
+            if not byte & 0x80:
+                partes.append(n)
+                n = 0
+    primero = min(partes[0] // 40, 2)
+    return (primero, partes[0] - 40 * primero) + tuple(partes[1:])
+
+
+def decodificar_valor(etiqueta, contenido):
+    """
+    Valor Python de un TLV: int, bytes, tupla (OID), str (IpAddress), None (NULL)
+    o Tipado(etiqueta, None) para noSuchObject/noSuchInstance/endOfMibView.
+    """
+    if etiqueta == INTEGER:
+        return int.from_bytes(contenido, "big", signed=True)
+    if etiqueta in (COUNTER32, GAUGE32, TIMETICKS, COUNTER64):
+        return int.from_bytes(contenido, "big")
+    if etiqueta == OCTET_STRING:
+        return bytes(contenido)
+    if etiqueta == OBJECT_IDENTIFIER:
+        return _decodificar_oid(contenido)
+    if etiqueta == IP_ADDRESS:
+        return ".".join(str(b) for b in contenido)
+    if etiqueta in SIN_VALOR:
+        return Tipado(etiqueta, None)
+    return None
+
+
+def decodificar_mensaje(datos):
+    """
+    bytes -> MensajeSNMP. Lanza ValueError si el mensaje no es válido.
+    """
+    try:
+        etiqueta, inicio, fin = _leer(datos, 0)
+        if etiqueta != SEQUENCE:
+            raise ValueError("El mensaje SNMP no empieza por SEQUENCE.")
+        _, i, f = _leer(datos, inicio)
+        version = decodificar_valor(INTEGER, datos[i:f])
+        _, i, f = _leer(datos, f)
+        comunidad = bytes(datos[i:f])
+        pdu, inicio, fin = _leer(datos, f)
+        campos = []
+        pos = inicio
+        for _ in range(3):
+            _, i, pos = _leer(datos, pos)
+            campos.append(decodificar_valor(INTEGER, datos[i:pos]))
+        _, pos, fin_lista = _leer(datos, pos)
+        varbinds = []
+        while pos < fin_lista:
+            # Los varbinds son la mayor parte de una respuesta GETBULK: las longitudes
+            # cortas (< 128) se leen sin pasar por _leer
+            n = datos[pos + 1]
+            i, pos = (pos + 2, pos + 2 + n) if n < 0x80 else _leer(datos, pos)[1:]
+            n = datos[i + 1]
+            a, b = (i + 2, i + 2 + n) if n < 0x80 else _leer(datos, i)[1:]
+            etiqueta_valor, n = datos[b], datos[b + 1]
+            c, d = (b + 2, b + 2 + n) if n < 0x80 else _leer(datos, b)[1:]
+            if d > len(datos):
+                raise ValueError("Mensaje SNMP truncado.")
+            varbinds.append((_decodificar_oid(datos[a:b]), decodificar_valor(etiqueta_valor, datos[c:d])))
+    except IndexError:
+        raise ValueError("Mensaje SNMP truncado.")
+    return MensajeSNMP(version, comunidad, pdu, *campos, varbinds)
+
+# ==================
+#   Cliente asíncrono
+# ==================
+
+class _ProtocoloCliente(asyncio.DatagramProtocol):
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def datagram_received(self, datos, origen):
+        self.cliente._recibir(datos, origen)
+
+    def error_received(self, exc):
+        pass  # ICMP port unreachable de un router sin SNMP: la petición vencerá por timeout
+
+
+class ClienteSNMP:
+    """
+    Cliente SNMP v2c asíncrono mínimo (GET y GETBULK). Todas las peticiones, a todos los
+    routers, salen por un mismo socket UDP y se emparejan con su respuesta por request-id,
+    así puede haber cientos en vuelo sin un socket ni una tarea de lectura por router.
+
+    - timeout / reintentos: por petición; al agotarse se lanza asyncio.TimeoutError.
+    - max_en_vuelo: peticiones sin respuesta a la vez, como mucho. Todas sus respuestas
+      tienen que caber en el buffer de recepción del socket (buffer_recepcion, que el
+      sistema puede recortar a net.core.rmem_max): lo que no cabe se descarta y la
+      petición solo se recupera al vencer su timeout.
+    Se usa desde un único bucle asyncio (el bucle de fondo).
+    """
+
+    def __init__(self, comunidad="public", timeout=1.0, reintentos=1, max_en_vuelo=256,
+                 buffer_recepcion=4 * 1024 * 1024):
+        self.comunidad = comunidad
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.max_en_vuelo = max_en_vuelo
+        self.buffer_recepcion = buffer_recepcion
+        self._transporte = None
+        self._abriendo = None  # Tarea que crea el socket (la primera petición lo abre)
+        self._pendientes = {}  # { request_id: (ip, asyncio.Future) }
+        self._ids = itertools.count(random.randint(1, 1 << 30))
+        self._semaforo = None
+
+    async def _abrir(self):
+        if self._transporte is None:
+            if self._abriendo is None:
+                self._abriendo = asyncio.ensure_future(self._crear_socket())
+            await asyncio.shield(self._abriendo)
+
+    async def _crear_socket(self):
+        try:
+            transporte, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _ProtocoloCliente(self), local_addr=("0.0.0.0", 0)
+            )
+            try:
+                transporte.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                                               self.buffer_recepcion)
+            except OSError:
+                pass  # Se queda con el tamaño por defecto
+            self._semaforo = asyncio.Semaphore(self.max_en_vuelo)
+            self._transporte = transporte
+        finally:
+            self._abriendo = None
+
+    def _recibir(self, datos, origen):
+        try:
+            mensaje = decodificar_mensaje(datos)
+        except ValueError:
+            return
+        pendiente = self._pendientes.get(mensaje.request_id)
+        if pendiente is None or pendiente[0] != origen[0]:
+            return  # Respuesta tardía (ya venció) o de otra IP
+        futuro = pendiente[1]
+        if not futuro.done():
+            futuro.set_result(mensaje)
+
+    async def peticion(self, ip, pdu, varbinds, puerto=161, comunidad=None, error_status=0, error_index=0):
+        """
+        Envía una petición y devuelve el MensajeSNMP de respuesta (reintenta si vence el timeout).
+        """
+        await self._abrir()
+        comunidad = comunidad if comunidad is not None else self.comunidad
+        async with self._semaforo:
+            for intento in range(self.reintentos + 1):
+                request_id = next(self._ids) & 0x7FFFFFFF
+                futuro = asyncio.get_running_loop().create_future()
+                self._pendientes[request_id] = (ip, futuro)
+                try:
+                    self._transporte.sendto(
+                        codificar_mensaje(comunidad, pdu, request_id, varbinds, error_status, error_index),
+                        (ip, puerto),
+                    )
+                    mensaje = await asyncio.wait_for(futuro, self.timeout)
+                except asyncio.TimeoutError:
+                    if intento == self.reintentos:
+                        raise
+                    continue
+                finally:
+                    self._pendientes.pop(request_id, None)
+                if mensaje.error_status:
+                    raise Exception(f"El agente SNMP de {ip} respondió con error {mensaje.error_status} "
+                                    f"(variable {mensaje.error_index}).")
+                return mensaje
+
+    async def get(self, ip, oids, puerto=161, comunidad=None):
+        """
+        GET de varias variables en una sola petición. Devuelve { oid: valor } (sin las que no existen).
+        """
+        mensaje = await self.peticion(ip, GET_REQUEST, [(o, None) for o in oids], puerto, comunidad)
+        return {o: v for o, v in mensaje.varbinds if not isinstance(v, Tipado)}
+
+    async def recorrer_columnas(self, ip, columnas, puerto=161, comunidad=None, max_repeticiones=25,
+                                max_filas=None):
+        """
+        Recorre a la vez varias columnas de tablas con GETBULK: cada petición pide
+        max_repeticiones filas de todas las columnas que aún no terminaron.
+        Con max_filas (las filas que se sabe que tiene la tabla) no se piden más de
+        las que faltan y la columna termina al recibirlas, sin otra petición para ver
+        que se acabó.
+        Devuelve { columna: [(índice, valor)] }, con el índice como tupla (la parte
+        del OID detrás de la columna).
+        """
+        filas = {columna: [] for columna in columnas}
+        siguiente = {columna: columna for columna in columnas}  # Último OID recibido de cada columna
+        if max_filas is not None and max_filas <= 0:
+            return filas
+        while siguiente:
+            activas = list(siguiente)
+            repeticiones = max_repeticiones
+            if max_filas is not None:
+                repeticiones = max(1, min(max_repeticiones, max(max_filas - len(filas[c]) for c in activas)))
+            mensaje = await self.peticion(ip, GET_BULK_REQUEST, [(siguiente[c], None) for c in activas],
+                                          puerto, comunidad, 0, repeticiones)
+            if not mensaje.varbinds:
+                break
+            # Las respuestas llegan intercaladas: fila 1 de cada columna, fila 2 de cada columna...
+            for i, (o, valor) in enumerate(mensaje.varbinds):
+                columna = activas[i % len(activas)]
+                if columna not in siguiente:
+                    continue
+                if isinstance(valor, Tipado) or o[:len(columna)] != columna or o <= siguiente[columna]:
+                    del siguiente[columna]  # Se salió de la columna o se acabó la MIB
+                    continue
+                filas[columna].append((o[len(columna):], valor))
+                siguiente[columna] = o
+                if max_filas is not None and len(filas[columna]) >= max_filas:
+                    del siguiente[columna]
+        return filas
+
+    def cerrar(self):
+        if self._transporte is not None:
+            self._transporte.close()
+            self._transporte = None
+        for _, futuro in self._pendientes.values():
+            if not futuro.done():
+                futuro.cancel()
+        self._pendientes.clear()
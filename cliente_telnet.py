@@ -0,0 +1,174 @@
+import asyncio
+import re
+
+# ==================
+#   Protocolo Telnet (RFC 854)
+# ==================
+
+IAC = 255   # Interpret As Command
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250    # Inicio de subnegociación
+SE = 240    # Fin de subnegociación
+
+# Bytes del final del buffer que se vuelven a examinar al llegar datos nuevos
+# (mayor que cualquier prompt o marcador que se busque)
+VENTANA_BUSQUEDA = 256
+
+# Estados del analizador de comandos IAC
+_DATOS = 0
+_IAC = 1
+_OPCION = 2
+_SUB = 3
+_SUB_IAC = 4
+
+
+class ClienteTelnet:
+    """
+    Cliente Telnet asíncrono mínimo (sustituye a telnetlib, eliminado en Python 3.13).
+    Rechaza todas las opciones que negocia el servidor, igual que telnetlib por defecto,
+    y expone lecturas con timeout al estilo read_until/expect sin bloquear el hilo.
+    """
+
+    def __init__(self):
+        self._reader = None
+        self._writer = None
+        self._buffer = bytearray()
+        self._estado = _DATOS
+        self._comando = 0
+        self.eof = False
+
+    async def conectar(self, host, puerto=23, timeout=10):
+        """
+        Abre la conexión TCP con el servidor.
+        """
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(host, puerto), timeout
+        )
+
+    def _procesar(self, datos):
+        """
+        Separa los datos de usuario de los comandos IAC y responde a las negociaciones.
+        El estado se conserva entre llamadas porque un comando puede llegar partido.
+        """
+        if self._estado == _DATOS and IAC not in datos:
+            return datos  # Caso habitual: solo texto, sin comandos que procesar
+        salida = bytearray()
+        respuesta = bytearray()
+        for byte in datos:
+            if self._estado == _DATOS:
+                if byte == IAC:
+                    self._estado = _IAC
+                else:
+                    salida.append(byte)
+            elif self._estado == _IAC:
+                if byte == IAC:
+                    salida.append(IAC)  # IAC IAC es un 0xFF literal
+                    self._estado = _DATOS
+                elif byte in (DO, DONT, WILL, WONT):
+                    self._comando = byte
+                    self._estado = _OPCION
+                elif byte == SB:
+                    self._estado = _SUB
+                else:
+                    self._estado = _DATOS
+            elif self._estado == _OPCION:
+                if self._comando == DO:
+                    respuesta += bytes((IAC, WONT, byte))
+                elif self._comando == WILL:
+                    respuesta += bytes((IAC, DONT, byte))
+                self._estado = _DATOS
+            elif self._estado == _SUB:
+                if byte == IAC:
+                    self._estado = _SUB_IAC
+            elif self._estado == _SUB_IAC:
+                self._estado = _DATOS if byte == SE else _SUB
+        if respuesta and self._writer is not None:
+            self._writer.write(bytes(respuesta))
+        return salida
+
+    async def _recibir(self, timeout):
+        """
+        Espera más datos del servidor. Devuelve False si venció el timeout.
+        """
+        if self.eof:
+            raise EOFError("Conexión Telnet cerrada por el servidor.")
+        try:
+            datos = await asyncio.wait_for(self._reader.read(65536), timeout)
+        except asyncio.TimeoutError:
+            return False
+        if not datos:
+            self.eof = True
+            raise EOFError("Conexión Telnet cerrada por el servidor.")
+        self._buffer += self._procesar(datos)
+        return True
+
+    async def esperar(self, patrones, timeout):
+        """
+        Equivalente a telnetlib.Telnet.expect: espera hasta que alguno de los patrones
+        (bytes o regex compiladas) aparezca en la salida.
+        Devuelve (indice, match, datos); indice es -1 si venció el timeout.
+        """
+        regex = [p if isinstance(p, re.Pattern) else re.compile(re.escape(p)) for p in patrones]
+        limite = asyncio.get_running_loop().time() + timeout
+        pos = 0
+        while True:
+            for i, patron in enumerate(regex):
+                m = patron.search(self._buffer, pos)
+                if m:
+                    # El match se rehace sobre una copia porque el buffer va a cambiar
+                    m = patron.search(bytes(self._buffer), m.start())
+                    datos = m.string[:m.end()]
+                    del self._buffer[:m.end()]
+                    return i, m, datos
+            # Solo se vuelve a buscar en la cola del buffer para no reescanear salidas grandes
+            pos = max(0, len(self._buffer) - VENTANA_BUSQUEDA)
+            restante = limite - asyncio.get_running_loop().time()
+            if restante <= 0 or not await self._recibir(restante):
+                datos = bytes(self._buffer)
+                self._buffer.clear()
+                return -1, None, datos
+
+    async def leer_hasta(self, patron, timeout):
+        """
+        Equivalente a telnetlib.Telnet.read_until: devuelve la salida hasta el patrón
+        incluido, o lo recibido hasta vencer el timeout.
+        """
+        index, m, datos = await self.esperar([patron], timeout)
+        return datos
+
+    def leer_disponible(self):
+        """
+        Devuelve y descarta lo que ya esté en el buffer sin esperar (como read_very_eager).
+        """
+        datos = bytes(self._buffer)
+        self._buffer.clear()
+        return datos
+
+    def devolver(self, datos):
+        """
+        Vuelve a poner datos ya leídos al principio del buffer (para la próxima espera).
+        """
+        self._buffer[:0] = datos
+
+    def escribir(self, datos):
+        """
+        Envía datos al servidor duplicando los bytes IAC.
+        """
+        self._writer.write(datos.replace(b"\xff", b"\xff\xff"))
+
+    async def cerrar(self):
+        """
+        Cierra la conexión ignorando errores.
+        """
+        if self._writer is None:
+            return
+        try:
+            self._writer.close()
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+        self._writer = None
+        self.eof = True
@@ -0,0 +1,101 @@
+import threading
+
+# ==================
+#   Cola de actualizaciones de la GUI
+# ==================
+
+class ColaActualizacionesGUI:
+    """
+    Recoge desde cualquier hilo los cambios de color de las líneas y del progreso,
+    y el bucle de Tk los aplica de una vez cada intervalo_ms (un "frame").
+
+    - Varias actualizaciones de la misma línea dentro de un frame se quedan en la última.
+    - Solo se llama a itemconfig si el color difiere del que ya tiene la línea en
+      line_colors, que se mantiene aquí, en el hilo de Tk.
+    - Del progreso solo se aplica el último valor del frame; con progreso None solo
+      cambia el texto y la barra se queda donde estaba.
+    - Las llamadas encoladas con llamar() se ejecutan en el hilo de Tk, en orden, tras
+      los colores y el progreso (para entregar resultados calculados en otros hilos).
+    """
+
+    def __init__(self, ventana, lienzo, lineas_dict, line_colors, barra_progreso, etiqueta_progreso,
+                 intervalo_ms=33, color_inicial="black"):
+        self.ventana = ventana
+        self.lienzo = lienzo
+        self.lineas_dict = lineas_dict
+        self.line_colors = line_colors
+        self.barra_progreso = barra_progreso
+        self.etiqueta_progreso = etiqueta_progreso
+        self.intervalo_ms = intervalo_ms
+        self.color_inicial = color_inicial
+        self._lock = threading.Lock()
+        self._colores = {}     # { línea: color } pendientes
+        self._progreso = None  # (progreso, texto) pendiente
+        self._llamadas = []    # [(función, argumentos)] pendientes
+        self._activa = False
+
+    # --- Desde cualquier hilo ---
+
+    def poner_color(self, linea, color):
+        with self._lock:
+            self._colores[linea] = color
+
+    def poner_progreso(self, progreso, texto):
+        with self._lock:
+            self._progreso = (progreso, texto)
+
+    def llamar(self, funcion, *args):
+        with self._lock:
+            self._llamadas.append((funcion, args))
+
+    # --- En el hilo de Tk ---
+
+    def iniciar(self):
+        """
+        Empieza a vaciar la cola periódicamente desde el bucle de Tk.
+        """
+        if not self._activa:
+            self._activa = True
+            self.ventana.after(self.intervalo_ms, self._tick)
+
+    def detener(self):
+        self._activa = False
+
+    def _tick(self):
+        if not self._activa:
+            return
+        try:
+            self.vaciar()
+        finally:
+            self.ventana.after(self.intervalo_ms, self._tick)
+
+    def vaciar(self):
+        """
+        Aplica lo pendiente. Devuelve cuántas líneas cambiaron realmente de color.
+        """
+        with self._lock:
+            colores, self._colores = self._colores, {}
+            progreso, self._progreso = self._progreso, None
+            llamadas, self._llamadas = self._llamadas, []
+
+        cambios = 0
+        for linea, color in colores.items():
+            if self.line_colors.get(linea, self.color_inicial) == color:
+                continue
+            self.line_colors[linea] = color
+            line_id = self.lineas_dict.get(linea)
+            if line_id is not None:
+                self.lienzo.itemconfig(line_id, fill=color)
+                cambios += 1
+
+        if progreso is not None:
+            if progreso[0] is not None:
+                self.barra_progreso.set(progreso[0] / 100)
+            self.etiqueta_progreso.configure(text=progreso[1])
+
+        for funcion, args in llamadas:
+            try:
+                funcion(*args)
+            except Exception as e:
+                print(f"Error al aplicar una actualización de la GUI: {e}")
+        return cambios
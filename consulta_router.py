@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+from sesiones_telnet import pool_telnet
+
+# Orden en que se piden los comandos cuando nadie elige pestaña: primero los cortos
+# y más consultados, la configuración completa al final
+PRIORIDAD_COMANDOS = ("Interface", "Ip route", "ACL", "NAT", "DHCP", "running-config")
+
+
+class ConsultaPorPestanas:
+    """
+    Ejecuta los comandos de la ventana de un router de uno en uno, sin esperar a tenerlos
+    todos: el de la pestaña que se abre pasa delante (pedir) y, con en_segundo_plano,
+    los demás se van pidiendo en orden de prioridad. La salida se entrega a medida que llega.
+
+    - al_texto(clave, texto) recibe cada fragmento de salida.
+    - al_terminar(clave, completo, error) se llama al acabar cada comando.
+    - al_completar(resultados) se llama cuando todos los comandos terminaron bien.
+
+    Los callbacks se llaman en el bucle de fondo del pool; pedir y cancelar se pueden
+    llamar desde cualquier hilo.
+    """
+
+    def __init__(self, router, comandos, al_texto, al_terminar, al_completar=None,
+                 pool=pool_telnet, prioridad=PRIORIDAD_COMANDOS, en_segundo_plano=True):
+        self.router = router
+        self.comandos = comandos
+        self.al_texto = al_texto
+        self.al_terminar = al_terminar
+        self.al_completar = al_completar
+        self.pool = pool
+        self.resultados = {}   # { clave: salida } de los comandos ya terminados
+        self._fallidos = set()
+        self._lock = threading.Lock()
+        self._cancelada = False
+        self._en_curso = None
+        self._tarea = None
+        orden = [clave for clave in prioridad if clave in comandos]
+        orden += [clave for clave in comandos if clave not in orden]
+        self._pendientes = orden if en_segundo_plano else []
+
+    def iniciar(self):
+        self.pool.bucle.loop().call_soon_threadsafe(self._asegurar_tarea)
+
+    def pedir(self, clave):
+        """
+        Adelanta el comando de una pestaña (si aún no se ejecutó ni se está ejecutando).
+        """
+        with self._lock:
+            if clave not in self.comandos or clave in self.resultados or clave == self._en_curso:
+                return
+            if clave in self._pendientes:
+                self._pendientes.remove(clave)
+            self._pendientes.insert(0, clave)
+        self.pool.bucle.loop().call_soon_threadsafe(self._asegurar_tarea)
+
+    def cancelar(self):
+        """
+        No lanza más comandos; el que está en curso termina pero su salida ya no se entrega.
+        """
+        with self._lock:
+            self._cancelada = True
+            self._pendientes.clear()
+
+    def _asegurar_tarea(self):
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.ensure_future(self._trabajar())
+
+    def _siguiente(self):
+        with self._lock:
+            if self._cancelada or not self._pendientes:
+                self._en_curso = None
+                return None
+            self._en_curso = self._pendientes.pop(0)
+            return self._en_curso
+
+    async def _trabajar(self):
+        router = self.router
+        while True:
+            clave = self._siguiente()
+            if clave is None:
+                break
+            partes = []
+
+            def _al_texto(texto, clave=clave):
+                partes.append(texto)
+                if not self._cancelada:
+                    self.al_texto(clave, texto)
+
+            error = None
+            try:
+                completo, segundos = await self.pool.ejecutar_en_fragmentos_asincrono(
+                    router["ip"], router["username"], router["password"], self.comandos[clave], _al_texto,
+                    puerto=self.pool.puerto_de(router),
+                )
+            except Exception as e:
+                completo, error = False, e
+                print(f"Error al ejecutar '{self.comandos[clave]}' en {router.get('nombre', router['ip'])}: {e}")
+            with self._lock:
+                self.resultados[clave] = "".join(partes)
+                if not completo:
+                    self._fallidos.add(clave)
+            if self._cancelada:
+                return
+            self.al_terminar(clave, completo, error)
+
+        if (not self._cancelada and self.al_completar is not None and not self._fallidos
+                and len(self.resultados) == len(self.comandos)):
+            self.al_completar(dict(self.resultados))
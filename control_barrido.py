@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+from sesiones_telnet import bucle_telnet
+
+# Cómo terminó un barrido
+COMPLETADO = "completado"
+CANCELADO = "cancelado"
+PLAZO_AGOTADO = "plazo agotado"
+FALLIDO = "fallido"
+
+# solicitudes es cuántas peticiones atendió el barrido (la que lo lanzó y las que se unieron);
+# error es la excepción si falló
+ResultadoBarrido = namedtuple("ResultadoBarrido", "estado segundos solicitudes error")
+
+# ==================
+#   Control de barridos completos
+# ==================
+
+class ControlBarrido:
+    """
+    Garantiza que haya como mucho un barrido completo en curso.
+
+    - solicitar(al_terminar): lanza el barrido o, si ya hay uno en curso, une la
+      petición a él (al_terminar se llama igualmente cuando acabe).
+    - cancelar(): corta el barrido en curso. La cancelación llega a todas sus tareas:
+      las sesiones Telnet que estaban en uso se cierran y los barridos de ping se detienen.
+    - plazo: segundos que puede durar un barrido; al agotarse se corta igual que al
+      cancelarlo, así unos pocos hosts que no responden no lo alargan indefinidamente.
+
+    barrido es una función sin argumentos que devuelve la corrutina de un barrido.
+    al_terminar(ResultadoBarrido) y al_cancelar() se llaman en el bucle de fondo.
+    """
+
+    def __init__(self, barrido, plazo=120, al_cancelar=None, bucle=bucle_telnet):
+        self.barrido = barrido
+        self.plazo = plazo
+        self.al_cancelar = al_cancelar
+        self.bucle = bucle
+        self._lock = threading.Lock()
+        self._futuro = None      # concurrent.futures.Future del barrido en curso
+        self._oyentes = []       # al_terminar de las peticiones atendidas por el barrido en curso
+        self._solicitudes = 0
+        self._cancelado = False
+        self._tarea = None       # Tarea del barrido en curso (en el bucle de fondo)
+
+    def en_curso(self):
+        with self._lock:
+            return self._futuro is not None
+
+    def solicitar(self, al_terminar=None):
+        """
+        Pide un barrido. Devuelve True si se lanzó uno nuevo y False si la petición
+        se unió al que ya estaba en curso.
+        """
+        with self._lock:
+            if al_terminar is not None:
+                self._oyentes.append(al_terminar)
+            self._solicitudes += 1
+            if self._futuro is not None:
+                return False
+            self._cancelado = False
+            self._futuro = asyncio.run_coroutine_threadsafe(self._ejecutar(), self.bucle.loop())
+            return True
+
+    def cancelar(self):
+        """
+        Cancela el barrido en curso. Devuelve False si no había ninguno.
+        """
+        with self._lock:
+            futuro = self._futuro
+            if futuro is None:
+                return False
+            self._cancelado = True
+        self.bucle.loop().call_soon_threadsafe(self._cancelar_tarea)
+        return True
+
+    def _cancelar_tarea(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+
+    def esperar(self, timeout=None):
+        """
+        Espera (desde otro hilo) a que termine el barrido en curso y devuelve su
+        ResultadoBarrido (None si no había ninguno).
+        """
+        with self._lock:
+            futuro = self._futuro
+        return futuro.result(timeout) if futuro is not None else None
+
+    async def _ejecutar(self):
+        inicio = time.perf_counter()
+        estado, error = COMPLETADO, None
+        # Si se canceló antes de empezar, la tarea se cancela nada más crearla
+        self._tarea = asyncio.ensure_future(asyncio.wait_for(self.barrido(), self.plazo))
+        if self._cancelado:
+            self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.TimeoutError:
+            estado = PLAZO_AGOTADO
+            print(f"Barrido cortado: se agotó el plazo de {self.plazo} s.")
+        except asyncio.CancelledError:
+            estado = CANCELADO
+            print("Barrido cancelado.")
+        except Exception as e:
+            estado, error = FALLIDO, e
+            print(f"Error durante el barrido: {e}")
+        if estado == CANCELADO and self.al_cancelar is not None:
+            try:
+                self.al_cancelar()
+            except Exception as e:
+                print(f"Error al cancelar el trabajo pendiente: {e}")
+        with self._lock:
+            oyentes, self._oyentes = self._oyentes, []
+            solicitudes, self._solicitudes = self._solicitudes, 0
+            self._futuro = None
+            self._tarea = None
+        resultado = ResultadoBarrido(estado, time.perf_counter() - inicio, solicitudes, error)
+        for oyente in oyentes:
+            try:
+                oyente(resultado)
+            except Exception as e:
+                print(f"Error al notificar el fin del barrido: {e}")
+        return resultado
@@ -0,0 +1,278 @@
+import bisect
+import math
+from array import array
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+# ==================
+#   Formato en disco
+# ==================
+
+# Cabecera: firma, versión, tamaño de registro, capacidad (registros) y registros escritos en total
+CABECERA = struct.Struct("<4sIIQQ")
+TAMANO_CABECERA = 32
+FIRMA = b"HIST"
+VERSION = 1
+
+# Registro de ancho fijo: instante, id de la clave, clase, estado (0/1, 255 = sin estado)
+# y valor (RTT o latencia en ms, NaN si no hay)
+REGISTRO = struct.Struct("<dIBBf")
+
+CLASE_DISPOSITIVO = 0
+CLASE_ENLACE = 1
+CLASE_COMANDO = 2
+SIN_ESTADO = 255
+
+# Muestra leída del historial: estado es True/False/None y valor None si no se midió
+Muestra = namedtuple("Muestra", "ts clave clase estado valor")
+
+# Resumen de un intervalo: disponibilidad es la fracción de muestras con estado activo
+Resumen = namedtuple("Resumen", "inicio fin muestras disponibilidad valor_medio valor_max")
+
+# ==================
+#   Historial
+# ==================
+
+class HistorialEstados:
+    """
+    Serie temporal compacta del estado de dispositivos, líneas y latencias de comandos.
+
+    Los registros son de ancho fijo y se escriben en un fichero mapeado en memoria
+    que funciona como buffer circular: al llegar a capacidad, cada registro nuevo
+    sustituye al más antiguo. Los nombres (claves) se guardan una vez en un fichero
+    aparte (<ruta>.claves) y los registros solo llevan su número.
+
+    Además se mantiene en memoria un índice por clave con las posiciones (índices
+    lógicos) de sus registros, que se reconstruye al abrir y se actualiza al escribir.
+    Como los registros se añaden en orden de tiempo, las consultas de una clave
+    localizan el rango con una búsqueda binaria sobre sus posiciones y solo leen los
+    registros de esa clave.
+    """
+
+    def __init__(self, ruta, capacidad=1_000_000):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        existe = os.path.exists(ruta) and os.path.getsize(ruta) >= TAMANO_CABECERA
+        if existe:
+            with open(ruta, "rb") as f:
+                firma, version, tamano, capacidad_fichero, escritos = CABECERA.unpack(f.read(CABECERA.size))
+            if firma != FIRMA or version != VERSION or tamano != REGISTRO.size:
+                raise ValueError(f"{ruta} no es un historial compatible.")
+            capacidad = capacidad_fichero
+        else:
+            escritos = 0
+        self.capacidad = capacidad
+        self._escritos = escritos
+
+        self._fichero = open(ruta, "r+b" if existe else "w+b")
+        tamano_total = TAMANO_CABECERA + capacidad * REGISTRO.size
+        if os.path.getsize(ruta) < tamano_total:
+            self._fichero.truncate(tamano_total)
+        self._mapa = mmap.mmap(self._fichero.fileno(), tamano_total)
+        if not existe:
+            self._guardar_cabecera()
+
+        # Claves: { nombre: id } y su lista en orden de id
+        self._ruta_claves = ruta + ".claves"
+        self._claves = []
+        self._ids = {}
+        if os.path.exists(self._ruta_claves):
+            with open(self._ruta_claves, encoding="utf-8") as f:
+                for linea in f:
+                    clave = linea.rstrip("\n")
+                    self._ids[clave] = len(self._claves)
+                    self._claves.append(clave)
+        self._fichero_claves = open(self._ruta_claves, "a", encoding="utf-8")
+
+        # Índice: { id: array de índices lógicos } en orden; los primeros
+        # _descartados[id] ya fueron sobrescritos en el buffer
+        self._posiciones = {}
+        self._descartados = {}
+        for n, (_, ident, _, _, _) in enumerate(self._tramo(self._primero(), self._escritos), self._primero()):
+            self._indexar(ident, n)
+
+    def _guardar_cabecera(self):
+        CABECERA.pack_into(self._mapa, 0, FIRMA, VERSION, REGISTRO.size, self.capacidad, self._escritos)
+
+    def _indexar(self, ident, n):
+        posiciones = self._posiciones.get(ident)
+        if posiciones is None:
+            posiciones = self._posiciones[ident] = array("q")
+            self._descartados[ident] = 0
+        posiciones.append(n)
+
+    def _descartar(self, ident):
+        """
+        Olvida la posición más antigua de una clave (su registro se va a sobrescribir).
+        Se compacta cuando lo descartado supera la mitad, así cada descarte cuesta O(1) amortizado.
+        """
+        descartados = self._descartados[ident] + 1
+        posiciones = self._posiciones[ident]
+        if descartados * 2 > len(posiciones):
+            del posiciones[:descartados]
+            descartados = 0
+        self._descartados[ident] = descartados
+
+    def _id(self, clave):
+        ident = self._ids.get(clave)
+        if ident is None:
+            ident = len(self._claves)
+            self._ids[clave] = ident
+            self._claves.append(clave)
+            self._fichero_claves.write(clave + "\n")
+            self._fichero_claves.flush()
+        return ident
+
+    # --- Escritura ---
+
+    def registrar(self, clave, estado=None, valor=None, clase=CLASE_DISPOSITIVO, ts=None):
+        """
+        Añade una muestra. estado True/False/None; valor en ms o None.
+        """
+        self.registrar_lote([(clave, clase, estado, valor)], ts)
+
+    def registrar_lote(self, muestras, ts=None):
+        """
+        Añade varias muestras (clave, clase, estado, valor) con el mismo instante.
+        """
+        with self._lock:
+            ts = time.time() if ts is None else ts
+            for clave, clase, estado, valor in muestras:
+                posicion = TAMANO_CABECERA + (self._escritos % self.capacidad) * REGISTRO.size
+                if self._escritos >= self.capacidad:
+                    self._descartar(REGISTRO.unpack_from(self._mapa, posicion)[1])
+                ident = self._id(clave)
+                REGISTRO.pack_into(
+                    self._mapa, posicion, ts, ident, clase,
+                    SIN_ESTADO if estado is None else int(bool(estado)),
+                    math.nan if valor is None else valor,
+                )
+                self._indexar(ident, self._escritos)
+                self._escritos += 1
+            self._guardar_cabecera()
+
+    # --- Lectura ---
+
+    def __len__(self):
+        return min(self._escritos, self.capacidad)
+
+    def _primero(self):
+        return max(0, self._escritos - self.capacidad)
+
+    def _ts(self, n):
+        """
+        Instante del registro n (índice lógico, contando desde el primero escrito nunca).
+        """
+        return struct.unpack_from("<d", self._mapa, TAMANO_CABECERA + (n % self.capacidad) * REGISTRO.size)[0]
+
+    def _tramo(self, desde, hasta):
+        """
+        Registros crudos entre los índices lógicos [desde, hasta), en uno o dos tramos contiguos.
+        """
+        inicio = desde % self.capacidad
+        cantidad = hasta - desde
+        fin = inicio + cantidad
+        if fin <= self.capacidad:
+            tramos = [(inicio, fin)]
+        else:
+            tramos = [(inicio, self.capacidad), (0, fin - self.capacidad)]
+        for a, b in tramos:
+            vista = memoryview(self._mapa)[TAMANO_CABECERA + a * REGISTRO.size:TAMANO_CABECERA + b * REGISTRO.size]
+            try:
+                yield from REGISTRO.iter_unpack(vista)
+            finally:
+                vista.release()
+
+    def _registro(self, n):
+        return REGISTRO.unpack_from(self._mapa, TAMANO_CABECERA + (n % self.capacidad) * REGISTRO.size)
+
+    def _registros(self, ident, desde, hasta):
+        """
+        Registros crudos de una clave entre los instantes desde y hasta (incluidos),
+        leyendo solo los suyos gracias al índice. Se llama con el lock tomado.
+        """
+        posiciones = self._posiciones.get(ident)
+        if posiciones is None:
+            return
+        inicio, fin = self._descartados[ident], len(posiciones)
+        if desde is not None:
+            inicio = bisect.bisect_left(posiciones, desde, inicio, fin, key=self._ts)
+        if hasta is not None:
+            fin = bisect.bisect_right(posiciones, hasta, inicio, fin, key=self._ts)
+        for k in range(inicio, fin):
+            yield self._registro(posiciones[k])
+
+    def consultar(self, clave, desde=None, hasta=None):
+        """
+        Muestras de una clave entre los instantes desde y hasta (incluidos).
+        """
+        ident = self._ids.get(clave)
+        if ident is None:
+            return []
+        with self._lock:
+            return [
+                Muestra(ts, clave, clase, None if estado == SIN_ESTADO else bool(estado),
+                        None if math.isnan(valor) else valor)
+                for ts, _, clase, estado, valor in self._registros(ident, desde, hasta)
+            ]
+
+    def resumir(self, clave, desde, hasta, cubetas=60):
+        """
+        Reduce las muestras de [desde, hasta] a cubetas intervalos iguales (para sparklines)
+        y calcula a la vez la disponibilidad de todo el intervalo, en una sola pasada.
+        Devuelve (lista de Resumen, disponibilidad o None si no hay estados).
+        Las cubetas sin muestras tienen disponibilidad y valores None.
+        """
+        ancho = (hasta - desde) / cubetas
+        acumulado = [[0, 0, 0, 0.0, None] for _ in range(cubetas)]  # muestras, con estado, activas, suma, máximo
+        valores = [0] * cubetas
+        ident = self._ids.get(clave)
+        if ident is not None:
+            with self._lock:
+                for ts, _, _, estado, valor in self._registros(ident, desde, hasta):
+                    i = min(int((ts - desde) / ancho), cubetas - 1) if ancho > 0 else 0
+                    cubeta = acumulado[i]
+                    cubeta[0] += 1
+                    if estado != SIN_ESTADO:
+                        cubeta[1] += 1
+                        cubeta[2] += estado
+                    if not math.isnan(valor):
+                        valores[i] += 1
+                        cubeta[3] += valor
+                        cubeta[4] = valor if cubeta[4] is None else max(cubeta[4], valor)
+        resumen = [
+            Resumen(
+                desde + i * ancho, desde + (i + 1) * ancho, n,
+                activas / con_estado if con_estado else None,
+                suma / valores[i] if valores[i] else None,
+                maximo,
+            )
+            for i, (n, con_estado, activas, suma, maximo) in enumerate(acumulado)
+        ]
+        con_estado = sum(c[1] for c in acumulado)
+        disponibilidad = sum(c[2] for c in acumulado) / con_estado if con_estado else None
+        return resumen, disponibilidad
+
+    def reducir(self, clave, desde, hasta, cubetas=60):
+        """
+        Solo las cubetas de resumir.
+        """
+        return self.resumir(clave, desde, hasta, cubetas)[0]
+
+    def disponibilidad(self, clave, desde=None, hasta=None):
+        """
+        Fracción de muestras con estado activo en el intervalo, o None si no hay ninguna.
+        """
+        estados = [m.estado for m in self.consultar(clave, desde, hasta) if m.estado is not None]
+        return sum(estados) / len(estados) if estados else None
+
+    def cerrar(self):
+        with self._lock:
+            self._mapa.flush()
+            self._mapa.close()
+            self._fichero.close()
+            self._fichero_claves.close()
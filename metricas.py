@@ -0,0 +1,195 @@
+import math
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# ==================
+#   Histograma de latencias
+# ==================
+
+# Las cubetas crecen un 10% cada una desde 10 µs: los percentiles tienen como mucho ~5% de error
+BASE_CUBETAS = 1e-5
+FACTOR_CUBETAS = 1.1
+_LOG_FACTOR = math.log(FACTOR_CUBETAS)
+
+
+class Histograma:
+    """
+    Histograma de latencias (segundos) con cubetas logarítmicas dispersas: ocupa lo mismo
+    con diez muestras que con un millón y los percentiles salen de recorrer las cubetas.
+    """
+    __slots__ = ("cubetas", "n", "suma", "minimo", "maximo")
+
+    def __init__(self):
+        self.cubetas = {}  # { índice: muestras }
+        self.n = 0
+        self.suma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    def observar(self, segundos):
+        indice = int(math.log(segundos / BASE_CUBETAS) / _LOG_FACTOR) if segundos > BASE_CUBETAS else 0
+        self.cubetas[indice] = self.cubetas.get(indice, 0) + 1
+        self.n += 1
+        self.suma += segundos
+        self.minimo = min(self.minimo, segundos)
+        self.maximo = max(self.maximo, segundos)
+
+    def media(self):
+        return self.suma / self.n if self.n else None
+
+    def percentil(self, p):
+        """
+        Valor por debajo del cual queda el p% de las muestras (centro geométrico de su cubeta).
+        """
+        if not self.n:
+            return None
+        objetivo = max(1, math.ceil(self.n * p / 100))
+        acumulado = 0
+        for indice in sorted(self.cubetas):
+            acumulado += self.cubetas[indice]
+            if acumulado >= objetivo:
+                valor = BASE_CUBETAS * FACTOR_CUBETAS ** (indice + 0.5)
+                return min(max(valor, self.minimo), self.maximo)
+        return self.maximo
+
+# ==================
+#   Registro de métricas
+# ==================
+
+# Una fila del resumen; los tiempos en milisegundos. router/detalle son None en los totales
+FilaMetrica = namedtuple("FilaMetrica", "categoria router detalle n media p50 p90 p99 maximo errores")
+
+# Categorías que instrumenta el monitoreo
+CONEXION = "conexion"     # connect TCP (sondeo rápido o apertura de sesión Telnet)
+LOGIN = "login"           # Username/Password hasta el prompt y 'terminal length 0'
+COMANDO = "comando"       # cada comando Telnet, por router y por comando
+PING = "ping"             # sondeo de cada PC/VM (local o desde su gateway)
+FASE = "fase"             # fases del monitoreo completo
+
+
+def nombre_comando(cmd):
+    """
+    Detalle con que se agrupa un comando: los ping van todos juntos, sea cual sea el destino.
+    """
+    return "ping" if cmd.startswith("ping ") else cmd
+
+
+class RegistroMetricas:
+    """
+    Histogramas de latencia por categoría, agregados de tres formas: total de la categoría,
+    por router y por detalle (comando, fase, dispositivo). Así se ve a la vez cuánto tarda
+    en general un login y qué router o qué comando es el que retrasa el monitoreo.
+    Se puede usar desde cualquier hilo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}  # { (categoria, router, detalle): Histograma }
+        self._errores = {}      # { (categoria, router, detalle): fallos }
+
+    def _claves(self, categoria, router, detalle):
+        claves = [(categoria, None, None)]
+        if router is not None:
+            claves.append((categoria, router, None))
+        if detalle is not None:
+            claves.append((categoria, None, detalle))
+        return claves
+
+    def observar(self, categoria, segundos, router=None, detalle=None):
+        with self._lock:
+            for clave in self._claves(categoria, router, detalle):
+                histograma = self._histogramas.get(clave)
+                if histograma is None:
+                    histograma = self._histogramas[clave] = Histograma()
+                histograma.observar(segundos)
+
+    def error(self, categoria, router=None, detalle=None):
+        """
+        Cuenta un intento fallido (timeout, conexión rechazada...), que no entra en el histograma.
+        """
+        with self._lock:
+            for clave in self._claves(categoria, router, detalle):
+                self._errores[clave] = self._errores.get(clave, 0) + 1
+
+    @contextmanager
+    def medir(self, categoria, router=None, detalle=None):
+        """
+        Mide el bloque; si lanza una excepción se cuenta como error.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.error(categoria, router, detalle)
+            raise
+        self.observar(categoria, time.perf_counter() - inicio, router, detalle)
+
+    def _fila(self, clave):
+        histograma = self._histogramas.get(clave) or Histograma()
+        ms = lambda v: round(v * 1000, 3) if v is not None else None
+        return FilaMetrica(*clave, histograma.n, ms(histograma.media()), ms(histograma.percentil(50)),
+                           ms(histograma.percentil(90)), ms(histograma.percentil(99)),
+                           ms(histograma.maximo if histograma.n else None), self._errores.get(clave, 0))
+
+    def resumen(self, categoria=None, por=None):
+        """
+        Filas del resumen. por=None: totales de cada categoría; "router" o "detalle":
+        desglose por router o por detalle, ordenado de más lento a más rápido (p90).
+        """
+        with self._lock:
+            claves = set(self._histogramas) | set(self._errores)
+            elegidas = [
+                c for c in claves
+                if (categoria is None or c[0] == categoria)
+                and (c[1] is not None) == (por == "router") and (c[2] is not None) == (por == "detalle")
+            ]
+            filas = [self._fila(c) for c in elegidas]
+        if por is None:
+            return sorted(filas, key=lambda f: f.categoria)
+        return sorted(filas, key=lambda f: (f.p90 is None, -(f.p90 or 0)))
+
+    def mas_lentos(self, categoria, por="router", cantidad=10):
+        return self.resumen(categoria, por)[:cantidad]
+
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._errores.clear()
+
+
+# Registro compartido por el pool Telnet, el motor de sondeo, el monitoreo y la GUI
+metricas = RegistroMetricas()
+
+# ==================
+#   Informe en texto
+# ==================
+
+def tabla_metricas(registro=metricas, nombres=None, cantidad=10):
+    """
+    Informe en texto plano (para el panel de estadísticas o la consola): totales por
+    categoría, las fases y los routers y comandos más lentos.
+    nombres traduce la IP de cada router a su nombre.
+    """
+    nombres = nombres or {}
+    encabezado = f"{'':<28}{'n':>7}{'media':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'máx':>10}{'errores':>9}"
+
+    def linea(etiqueta, fila):
+        valores = "".join(f"{v:>10.2f}" if v is not None else f"{'-':>10}"
+                          for v in (fila.media, fila.p50, fila.p90, fila.p99, fila.maximo))
+        return f"{etiqueta[:27]:<28}{fila.n:>7}{valores}{fila.errores:>9}"
+
+    partes = ["Latencias en ms", "", "Totales por categoría", encabezado]
+    partes += [linea(f.categoria, f) for f in registro.resumen()]
+    partes += ["", "Fases del monitoreo", encabezado]
+    partes += [linea(f.detalle, f) for f in registro.resumen(FASE, por="detalle")]
+    for categoria, titulo in ((CONEXION, "Routers con conexión más lenta"), (LOGIN, "Routers con login más lento"),
+                              (COMANDO, "Routers con comandos más lentos")):
+        partes += ["", f"{titulo} (p90)", encabezado]
+        partes += [linea(nombres.get(f.router, f.router), f) for f in registro.mas_lentos(categoria, "router", cantidad)]
+    partes += ["", "Comandos más lentos (p90)", encabezado]
+    partes += [linea(f.detalle, f) for f in registro.mas_lentos(COMANDO, "detalle", cantidad)]
+    partes += ["", "Dispositivos con ping más lento (p90)", encabezado]
+    partes += [linea(f.detalle, f) for f in registro.mas_lentos(PING, "detalle", cantidad)]
+    return "\n".join(partes)
@@ -0,0 +1,194 @@
+"""
+Monitoreo sin interfaz gráfica: ejecuta las mismas comprobaciones que el botón
+"Monitorear" (routers, conexiones entre routers, PCs/VM) y escribe el resultado
+como JSON lines, un registro por dispositivo y por línea.
+
+No importa customtkinter ni tkinter, así que sirve para cron o como servicio:
+
+    python monitor_cli.py --topologia topologia.json --salida estado.jsonl
+    python monitor_cli.py --continuo --salida -     # demonio: un registro por cambio
+    python monitor_cli.py --backend snmp --comunidad lectura   # recolección por SNMP
+    python monitor_cli.py --backend ssh     # routers por SSH (necesita asyncssh)
+
+Los mensajes de progreso van a stderr para no mezclarse con los registros.
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from control_barrido import COMPLETADO, FALLIDO, ControlBarrido
+from monitoreo import Monitor
+from motor_sondeo import MotorSondeo
+from recolectores import crear_recolector, pool_de_backend
+from topologia import cargar_topologia
+
+
+class SalidaJSONL:
+    """
+    Escribe registros JSON, uno por línea, desde cualquier hilo.
+    """
+
+    def __init__(self, fichero):
+        self.fichero = fichero
+        self._lock = threading.Lock()
+
+    def escribir(self, registro):
+        linea = json.dumps(registro, ensure_ascii=False)
+        with self._lock:
+            self.fichero.write(linea + "\n")
+            self.fichero.flush()
+
+
+def argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Monitoreo de la topología sin interfaz gráfica.")
+    parser.add_argument("--topologia", default="topologia.json", help="Fichero JSON/YAML de la topología.")
+    parser.add_argument("--salida", default="-", help="Fichero JSON lines de salida ('-' para stdout).")
+    parser.add_argument("--origen-pcs", choices=("local", "gateway"), default="local",
+                        help="Sondear las PCs desde este equipo o con ping desde su router.")
+    parser.add_argument("--continuo", action="store_true",
+                        help="Seguir monitoreando y escribir un registro por cada cambio de estado.")
+    parser.add_argument("--intervalo-min", type=float, default=5.0, help="Intervalo mínimo del modo continuo (s).")
+    parser.add_argument("--intervalo-max", type=float, default=300.0, help="Intervalo máximo del modo continuo (s).")
+    parser.add_argument("--plazo", type=float,
+                        help="Segundos máximos de cada monitoreo completo; al agotarse se corta (por defecto sin límite).")
+    parser.add_argument("--timeout-comando", type=float, default=30.0,
+                        help="Segundos de espera por cada comando en el router (s).")
+    parser.add_argument("--backend", choices=("telnet", "ssh", "snmp"), default="telnet",
+                        help="Cómo se recogen las interfaces y rutas de los routers (con ssh, también "
+                             "los pings desde los routers van por SSH).")
+    parser.add_argument("--comunidad", default="public",
+                        help="Comunidad SNMP de los routers que no la indican en la topología.")
+    parser.add_argument("--puerto-snmp", type=int, default=161,
+                        help="Puerto SNMP de los routers que no lo indican en la topología.")
+    parser.add_argument("--historial", help="Guardar también cada monitoreo en este historial en disco.")
+    parser.add_argument("--metricas", action="store_true",
+                        help="Al terminar, mostrar en stderr los percentiles de latencia de cada fase, router y comando.")
+    parser.add_argument("--silencioso", action="store_true", help="No mostrar los mensajes de progreso.")
+    return parser.parse_args(argv)
+
+
+def ejecutar_una_vez(monitor, salida, plazo=None):
+    """
+    Un monitoreo completo (cortado a los plazo segundos, si se indica); escribe el estado
+    final de cada dispositivo y cada línea. Espera también a las recolecciones de comandos
+    lanzadas en segundo plano, para que sus tiempos lleguen al historial y a las métricas
+    antes de salir; con plazo, solo lo que quede de él, y las que no terminen se cancelan.
+    Devuelve los routers accesibles.
+    """
+    control = ControlBarrido(monitor.ejecutar_asincrono, plazo=plazo)
+    control.solicitar()
+    resultado = control.esperar()
+    if resultado.estado == FALLIDO:
+        raise resultado.error
+    if resultado.estado != COMPLETADO:
+        print(f"Monitoreo {resultado.estado} a los {resultado.segundos:.1f} s: "
+              f"los dispositivos sin sondear quedan sin registro.")
+    accesibles = {r.nombre for r in monitor.dispositivos.values() if r.tipo == "router" and r.alcanzable}
+    espera = 60 if plazo is None else max(0.0, plazo - resultado.segundos)
+    if monitor.motor.esperar_recolecciones_bloqueante(timeout=espera):
+        # Pueden haber terminado entre la espera y la cancelación
+        canceladas = monitor.motor.cancelar_recolecciones_bloqueante()
+        if canceladas:
+            print(f"Se cancelan {canceladas} recolecciones sin terminar.")
+    for registro in monitor.instantanea():
+        salida.escribir(registro)
+    return accesibles
+
+
+def ejecutar_continuo(monitor, salida, intervalo_min, intervalo_max, plazo=None):
+    """
+    Monitoreo continuo hasta SIGINT/SIGTERM: un monitoreo completo inicial y
+    después el planificador adaptativo, escribiendo solo los cambios.
+    """
+    from planificador import PlanificadorMonitoreo
+
+    monitor.accesibles_continuo.update(ejecutar_una_vez(monitor, salida, plazo))
+    # Último estado escrito de cada dispositivo, para escribir solo los cambios
+    ultimos = {nombre: r.alcanzable for nombre, r in monitor.dispositivos.items()}
+
+    def al_resultado(nombre, estado, anterior):
+        adelantar = monitor.aplicar_resultado(nombre, estado, anterior)
+        if ultimos.get(nombre) != estado and nombre in monitor.dispositivos:
+            salida.escribir({"ts": time.time(), "clase": "dispositivo", **monitor.dispositivos[nombre]._asdict(),
+                             "anterior": ultimos.get(nombre)})
+            ultimos[nombre] = estado
+        if adelantar:
+            planificador.adelantar(adelantar)
+
+    planificador = PlanificadorMonitoreo(monitor.sondear_lote, al_resultado,
+                                         intervalo_min=intervalo_min, intervalo_max=intervalo_max)
+    # A partir de aquí cada color que cambie sale como registro de enlace
+    colores = dict(monitor.colores)
+
+    def al_color(linea, color):
+        if colores.get(linea) != color:
+            colores[linea] = color
+            salida.escribir({"ts": time.time(), "clase": "enlace", "linea": linea,
+                             "estado": "up" if color == "green" else "down", "color": color})
+
+    monitor.al_color = al_color
+
+    terminar = threading.Event()
+    signal.signal(signal.SIGINT, lambda *args: terminar.set())
+    signal.signal(signal.SIGTERM, lambda *args: terminar.set())
+    planificador.agregar(monitor.claves_continuo())
+    planificador.iniciar()
+    print("Monitoreo continuo activado (Ctrl+C para terminar).")
+    terminar.wait()
+    planificador.detener()
+    print("Monitoreo continuo detenido.")
+
+
+def main(argv=None):
+    args = argumentos(argv)
+    try:
+        topologia = cargar_topologia(args.topologia)
+    except Exception as e:
+        print(f"No se pudo cargar {args.topologia}: {e}", file=sys.stderr)
+        return 1
+
+    fichero = sys.stdout if args.salida == "-" else open(args.salida, "a", encoding="utf-8")
+    salida = SalidaJSONL(fichero)
+    # Los print() del monitoreo van a stderr (o se descartan) para no mezclarse con los registros
+    registro = open(os.devnull, "w") if args.silencioso else sys.stderr
+    historial = None
+    if args.historial:
+        from historial import HistorialEstados
+        try:
+            historial = HistorialEstados(args.historial)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo abrir el historial {args.historial}: {e}", file=sys.stderr)
+            return 1
+    pool = pool_de_backend(args.backend)
+    pool.timeout_comando = args.timeout_comando
+    recolector = crear_recolector(args.backend, pool, args.comunidad, args.puerto_snmp)
+    motor = MotorSondeo(pool, limite_concurrencia=100, recolector=recolector)
+    monitor = Monitor(topologia, motor, origen_sondeo_pcs=args.origen_pcs, historial=historial)
+    try:
+        with contextlib.redirect_stdout(registro):
+            if args.continuo:
+                ejecutar_continuo(monitor, salida, args.intervalo_min, args.intervalo_max, args.plazo)
+            else:
+                ejecutar_una_vez(monitor, salida, args.plazo)
+    finally:
+        pool.cerrar_todo()
+        if args.metricas:
+            from metricas import tabla_metricas
+            print(tabla_metricas(nombres={router["ip"]: router["nombre"] for router in monitor.routers}),
+                  file=sys.stderr)
+        if historial is not None:
+            historial.cerrar()
+        if fichero is not sys.stdout:
+            fichero.close()
+        if registro is not sys.stderr:
+            registro.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+import asyncio
+import time
+from collections import namedtuple
+
+from sesiones_telnet import pool_telnet
+from motor_sondeo import MotorSondeo
+from barrido_icmp import BarridoAlcanzabilidad, BarridoPorLotes
+from historial import CLASE_COMANDO, CLASE_DISPOSITIVO, CLASE_ENLACE
+from metricas import FASE, PING, metricas
+
+# Comandos que se recogen de cada router
+COMANDOS_SHOW = {
+    "running-config": "show running-config",
+    "Interface": "show ip interface brief",
+    "Ip route": "show ip route",
+    "ACL": "show access-lists",
+    "NAT": "show ip nat translations",
+    "DHCP": "show ip dhcp pool",
+}
+
+# Estado de un dispositivo tras un monitoreo: rtt en ms (None si no se midió),
+# metodo indica cómo se comprobó ("tcp/23" con el puerto sondeado, "icmp", "ping desde R1", ...)
+ResultadoDispositivo = namedtuple("ResultadoDispositivo", "nombre tipo ip alcanzable rtt metodo")
+
+# ==================
+#   Monitoreo de la topología
+# ==================
+
+class Monitor:
+    """
+    Fases del monitoreo (routers, conexiones entre routers, PCs/VM) sin ninguna
+    dependencia de la GUI: la GUI y el modo sin interfaz (monitor_cli.py) usan las mismas.
+
+    - al_color(linea, color) recibe cada color que se decide para una línea.
+    - al_progreso(progreso, texto) recibe el avance en %.
+    - origen_sondeo_pcs: "local" (barrido desde este equipo) o "gateway" (ping desde
+      su router, todas las de un router en una sola sesión). Las VM siempre se
+      sondean desde su gateway.
+
+    colores guarda el último color de cada línea y dispositivos el último
+    ResultadoDispositivo de cada dispositivo. Si se pasa un HistorialEstados,
+    cada monitoreo guarda en él el estado y el RTT de dispositivos y líneas
+    y el tiempo de cada comando show.
+    """
+
+    def __init__(self, topologia, motor=None, barrido=None, comandos=COMANDOS_SHOW,
+                 origen_sondeo_pcs="local", al_color=None, al_progreso=None, historial=None):
+        self.topologia = topologia
+        self.motor = motor if motor is not None else MotorSondeo(pool_telnet, limite_concurrencia=100)
+        self.barrido = barrido if barrido is not None else BarridoAlcanzabilidad(timeout=1.0)
+        self.comandos = comandos
+        self.origen_sondeo_pcs = origen_sondeo_pcs
+        self.al_color = al_color
+        self.al_progreso = al_progreso
+        self.historial = historial
+        self.routers = topologia.routers_sondeo()   # Routers para verificación (Telnet)
+        self.routers_por_nombre = {router["nombre"]: router for router in self.routers}
+        self.colores = {}
+        self.dispositivos = {}
+        self.accesibles_continuo = set()  # Routers accesibles según el monitoreo continuo
+        self.tiempos_fases = {}           # { fase: segundos } del último monitoreo completo
+
+    # --- Salidas ---
+
+    def _color(self, linea, color):
+        self.colores[linea] = color
+        if self.al_color is not None:
+            self.al_color(linea, color)
+
+    def _progreso(self, progreso, texto):
+        if self.al_progreso is not None:
+            self.al_progreso(progreso, texto)
+
+    def _registrar(self, device, alcanzable, rtt=None, metodo=None):
+        self.dispositivos[device.nombre] = ResultadoDispositivo(
+            device.nombre, device.tipo, device.ip, alcanzable, rtt, metodo
+        )
+
+    def guardar_historial(self, nombres=None):
+        """
+        Guarda en el historial el estado actual de los dispositivos indicados (todos si
+        es None) y de sus líneas.
+        """
+        if self.historial is None:
+            return
+        if nombres is None:
+            resultados = list(self.dispositivos.values())
+            lineas = list(self.colores)
+        else:
+            resultados = [self.dispositivos[n] for n in nombres if n in self.dispositivos]
+            lineas = {e.linea for n in nombres for e in self.topologia.enlaces_de(n) if e.linea in self.colores}
+        muestras = [(r.nombre, CLASE_DISPOSITIVO, r.alcanzable, r.rtt) for r in resultados]
+        muestras.extend((linea, CLASE_ENLACE, self.colores[linea] == "green", None) for linea in lineas)
+        self.historial.registrar_lote(muestras)
+
+    # --- Consultas sobre la topología ---
+
+    def find_connected_router(self, pc_nombre, accessible_routers):
+        """
+        Encuentra el router al que está conectada una PC o VM, directamente o vía un switch,
+        y verifica si el router es accesible.
+        """
+        device = self.topologia.dispositivo(pc_nombre)
+        if device and device.gateway in accessible_routers:
+            return device.gateway
+        return None
+
+    # --- Monitoreo completo ---
+
+    def ejecutar(self):
+        """
+        Ejecuta el monitoreo completo de manera sincrónica y devuelve los routers accesibles.
+        """
+        return self.motor.pool.bucle.ejecutar(self.ejecutar_asincrono())
+
+    async def ejecutar_asincrono(self):
+        """
+        Monitoreo completo en el bucle de fondo (lo que lanza ControlBarrido).
+        Las fases se solapan (ver monitorear_por_dependencias); tiempos_fases guarda cuánto
+        tardó cada una en terminar desde el inicio, sin las recolecciones en segundo plano.
+        Si se cancela, los dispositivos que no llegaron a sondearse conservan su estado anterior.
+        """
+        accessible_routers = set()
+        await self.monitorear_por_dependencias(accessible_routers)
+        tiempos = self.tiempos_fases
+        for fase, segundos in tiempos.items():
+            metricas.observar(FASE, segundos, detalle=fase)
+        # Finalizar la barra de progreso
+        self._progreso(100, "Completado: 100%")
+        self.guardar_historial()
+        print(f"Monitoreo completo en {tiempos['total']:.2f} s "
+              f"(routers {tiempos['routers']:.2f} s, conexiones {tiempos['conexiones']:.2f} s, PCs {tiempos['pcs']:.2f} s).")
+        return accessible_routers
+
+    async def monitorear_por_dependencias(self, accessible_routers):
+        """
+        Las tres fases en una sola pasada guiada por las dependencias de la topología
+        (router -> switch -> PC/VM):
+        - todos los routers se sondean a la vez (connect TCP);
+        - en cuanto un router responde se sondean las PCs/VM que dependen de él, sin
+          esperar al resto de routers, y cada línea entre routers se colorea en cuanto
+          se conocen sus dos extremos;
+        - si un router no responde, lo que depende de él se marca inaccesible en ese
+          momento, sin lanzar ni esperar ningún sondeo.
+        Los sondeos locales de las ramas que terminan casi a la vez van en un mismo barrido.
+        """
+        inicio = time.perf_counter()
+        tiempos = {"conexiones": 0.0}
+        hosts_por_router = {}
+        sin_gateway = []
+        for pc in self.topologia.hosts():
+            if pc.gateway in self.routers_por_nombre:
+                hosts_por_router.setdefault(pc.gateway, []).append(pc)
+            else:
+                sin_gateway.append(pc)
+        total = len(self.routers) + len(self.topologia.hosts())
+        terminados = 0
+        resueltos = set()
+        barrido = BarridoPorLotes(self.barrido)
+        semaforo = asyncio.Semaphore(self.motor.limite_concurrencia)
+        ramas = []
+
+        def avanzar(n):
+            nonlocal terminados
+            terminados += n
+            progreso = terminados / total * 100 if total else 100
+            self._progreso(progreso, f"Verificando dispositivos: {int(progreso)}%")
+
+        async def sondear_rama(router, hosts):
+            await self.sondear_dependientes(router, hosts, barrido, semaforo)
+            avanzar(len(hosts))
+
+        def router_terminado(router, vivo):
+            nombre = router["nombre"]
+            self.marcar_router(nombre, vivo, accessible_routers)
+            resueltos.add(nombre)
+            for enlace in self.topologia.enlaces_de(nombre):
+                otro = enlace.destino if enlace.origen == nombre else enlace.origen
+                if otro in resueltos and otro in self.routers_por_nombre:
+                    self.colorear_enlace_routers(enlace.origen, enlace.destino, accessible_routers)
+                    tiempos["conexiones"] = time.perf_counter() - inicio
+            hosts = hosts_por_router.get(nombre, [])
+            if not vivo:
+                self.suprimir_dependientes(nombre, hosts)
+                avanzar(len(hosts))
+            elif hosts:
+                ramas.append(asyncio.ensure_future(sondear_rama(router, hosts)))
+            avanzar(1)
+
+        print("Verificando routers y, a medida que responden, los dispositivos que dependen de ellos...")
+        try:
+            await self.motor.barrer_escalonado(self.routers, self.comandos, router_terminado,
+                                               al_recolectar=self.recoleccion_terminada)
+            tiempos["routers"] = time.perf_counter() - inicio
+            await asyncio.gather(*ramas)
+        except BaseException:
+            # Cancelado o plazo agotado: detener también las ramas ya lanzadas
+            for rama in ramas:
+                rama.cancel()
+            barrido.cancelar()
+            raise
+        for pc in sin_gateway:
+            self.colorear_lineas_pc(pc, None, False)
+        avanzar(len(sin_gateway))
+        tiempos["pcs"] = tiempos["total"] = time.perf_counter() - inicio
+        self.tiempos_fases = tiempos
+        return accessible_routers
+
+    async def sondear_dependientes(self, router, hosts, barrido, semaforo):
+        """
+        Sondea las PCs/VM de un router accesible: ping desde el router (VM y modo
+        "gateway", en una sola sesión) y el resto con el barrido local agrupado.
+        """
+        nombre = router["nombre"]
+        plan, ips_locales = self.plan_sondeo_pcs(hosts, {nombre})
+
+        async def ping_desde_gateway():
+            if not plan:
+                return {}
+            async with semaforo:
+                return await self.motor.ping_desde_router(router, plan[0][1])
+
+        pings, sondeos = await asyncio.gather(ping_desde_gateway(), barrido.sondear(ips_locales))
+        for pc in hosts:
+            estado = self.estado_pc(pc, nombre, pings, sondeos)
+            self.colorear_lineas_pc(pc, nombre, estado)
+
+    def suprimir_dependientes(self, router_nombre, hosts):
+        """
+        Marca inaccesibles, sin sondearlas, las PCs/VM que dependen de un router caído.
+        """
+        for pc in hosts:
+            self.colorear_lineas_pc(pc, None, False)
+            self._registrar(pc, False, metodo=f"sin acceso por {router_nombre}")
+        if hosts:
+            print(f"{len(hosts)} dispositivos que dependen de {router_nombre} marcados inaccesibles sin sondearlos.")
+
+    def recoleccion_terminada(self, router, resultados):
+        """
+        Se llama cuando termina la recolección completa de comandos de un router.
+        """
+        tiempos = getattr(resultados, "tiempos", {})
+        if tiempos:
+            detalle = ", ".join(f"{cmd_key}: {seg:.2f}s" for cmd_key, seg in tiempos.items())
+            print(f"Tiempos de comandos en {router.get('nombre')}: {detalle}")
+            if self.historial is not None:
+                self.historial.registrar_lote(
+                    (f"{router.get('nombre')}/{cmd_key}", CLASE_COMANDO, None, seg * 1000)
+                    for cmd_key, seg in tiempos.items()
+                )
+        datos = self.motor.datos.get(router["ip"])
+        if datos is not None:
+            nat = sum(datos.resumen_nat().values())
+            print(f"{router.get('nombre')}: {len(datos.interfaces_activas())}/{len(datos.interfaces)} interfaces up, "
+                  f"{len(datos.rutas)} rutas, {len(datos.acls)} reglas ACL, {nat} traducciones NAT, "
+                  f"{len(datos.pools_dhcp)} pools DHCP")
+            self.recolorear_enlaces_router(router.get("nombre"))
+
+    def marcar_router(self, nombre, accesible, accessible_routers):
+        """
+        Registra si el router está accesible y colorea las líneas hacia sus dispositivos.
+        """
+        router = self.topologia.dispositivo(nombre)
+        if router is not None:
+            metodo = f"tcp/{self.motor.pool.puerto_de(self.routers_por_nombre[nombre])}"
+            self._registrar(router, accesible, self.motor.rtt_tcp.get(router.ip) if accesible else None, metodo)
+        if accesible:
+            accessible_routers.add(nombre)
+            # Marcar líneas conectadas en verde (switches) o en rojo
+            connected_devices = self.topologia.conectados.get(nombre, [])
+            for device_nombre in connected_devices:
+                device = self.topologia.dispositivo(device_nombre)
+                if device:
+                    if device.tipo == "switch":
+                        line_color = "green"
+                    elif device.tipo == "pc" or device.tipo == "vm":
+                        # Conexión a PC o VM: se deja como está hasta que llegue su ping,
+                        # para que no parpadee a rojo y vuelva a verde en cada monitoreo
+                        continue
+                    else:
+                        # Otros tipos de dispositivos, por defecto negro
+                        line_color = "red"
+                    line_name = self.topologia.linea(nombre, device_nombre)
+                    self._color(line_name, line_color)
+                    print(f"Marca la línea {line_name} en {line_color} porque {nombre} está accesible.")
+        else:
+            accessible_routers.discard(nombre)
+            # Marcar líneas conectadas en rojo
+            connected_devices = self.topologia.conectados.get(nombre, [])
+            for device_nombre in connected_devices:
+                line_name = self.topologia.linea(nombre, device_nombre)
+                self._color(line_name, "red")
+                print(f"Marca la línea {line_name} en rojo porque {nombre} está inaccesible.")
+
+    def estado_interfaces_enlace(self, enlace):
+        """
+        Estado de la interfaz del enlace en cada extremo según los últimos show recolectados
+        (show ip interface brief / show ip route, sin sondeos adicionales):
+        { router: True (up/up) / False (caída) / None (sin datos o sin red en el enlace) }.
+        """
+        estados = {}
+        for nombre in (enlace.origen, enlace.destino):
+            router = self.routers_por_nombre.get(nombre)
+            datos = self.motor.datos.get(router["ip"]) if router is not None and enlace.red else None
+            estados[nombre] = datos.estado_red(enlace.red) if datos is not None else None
+        return estados
+
+    def colorear_enlace_routers(self, src, dst, accessible_routers):
+        """
+        Marca la línea entre dos routers en rojo si alguno no es accesible o si la interfaz
+        de la red del enlace está caída en alguno de los dos extremos, y en verde en otro caso.
+        Si no hay datos recolectados de las interfaces, basta con que ambos sean accesibles.
+        """
+        line_name = self.topologia.linea(src, dst)
+        if src not in accessible_routers or dst not in accessible_routers:
+            color, motivo = "red", "al menos uno de los routers no es accesible"
+        else:
+            enlace = self.topologia.enlace(src, dst)
+            estados = self.estado_interfaces_enlace(enlace)
+            caidos = [nombre for nombre, estado in estados.items() if estado is False]
+            if caidos:
+                color, motivo = "red", f"la interfaz de {' y '.join(caidos)} en {enlace.red} no está up/up"
+            elif all(estados.values()):
+                color, motivo = "green", f"las interfaces en {enlace.red} están up/up en ambos routers"
+            else:
+                # Sin datos de interfaces de algún extremo se asume activa si ambos son accesibles
+                color, motivo = "green", "ambos routers son accesibles"
+        self._color(line_name, color)
+        print(f"Marca la línea {line_name} en {color} porque {motivo}.")
+
+    def recolorear_enlaces_router(self, nombre, accessible_routers=None):
+        """
+        Vuelve a evaluar las líneas del router hacia otros routers. Sin accessible_routers
+        se usa el último estado registrado de cada extremo (así se aplican los datos de
+        una recolección que termina en segundo plano, después de colorear las líneas).
+        """
+        for enlace in self.topologia.enlaces_de(nombre):
+            if (self.topologia.dispositivo(enlace.origen).tipo == "router"
+                    and self.topologia.dispositivo(enlace.destino).tipo == "router"):
+                accesibles = accessible_routers
+                if accesibles is None:
+                    accesibles = {n for n in (enlace.origen, enlace.destino)
+                                  if n in self.dispositivos and self.dispositivos[n].alcanzable}
+                self.colorear_enlace_routers(enlace.origen, enlace.destino, accesibles)
+
+    def plan_sondeo_pcs(self, pcs, accessible_routers):
+        """
+        Reparte las PCs/VM con router accesible entre pings desde su gateway
+        (agrupadas para usar una sesión por router) y sondeos locales.
+        Devuelve (plan, ips_locales); plan es una lista de (router, [ips]).
+        """
+        ips_por_gateway = {}
+        ips_locales = []
+        for pc in pcs:
+            gateway = self.find_connected_router(pc.nombre, accessible_routers)
+            if gateway is None:
+                continue
+            if pc.tipo == "vm" or self.origen_sondeo_pcs == "gateway":
+                ips_por_gateway.setdefault(gateway, []).append(pc.ip)
+            else:
+                ips_locales.append(pc.ip)
+        plan = [(self.routers_por_nombre[nombre], ips) for nombre, ips in ips_por_gateway.items()]
+        return plan, ips_locales
+
+    def estado_pc(self, pc, connected_router, pings, sondeos):
+        """
+        Decide si la PC/VM respondió, según el ping desde su gateway o el sondeo local.
+        """
+        ping = pings.get(pc.ip)
+        if ping is not None:
+            gateway_ip = self.routers_por_nombre.get(connected_router, {}).get("ip")
+            if ping.rtt_avg is not None:
+                metricas.observar(PING, ping.rtt_avg / 1000, gateway_ip, pc.nombre)
+            else:
+                metricas.error(PING, gateway_ip, pc.nombre)
+            if ping.tasa > 0:
+                print(f"Ping desde {connected_router} hacia {pc.nombre}: {ping.tasa}%, rtt min/avg/max = {ping.rtt_min}/{ping.rtt_avg}/{ping.rtt_max} ms.")
+            self._registrar(pc, ping.tasa > 0, ping.rtt_avg, f"ping desde {connected_router}")
+            return ping.tasa > 0
+        sondeo = sondeos.get(pc.ip)
+        if sondeo and sondeo.alcanzable:
+            metricas.observar(PING, sondeo.rtt, detalle=pc.nombre)
+            print(f"PC {pc.nombre} responde ({sondeo.metodo}, {sondeo.rtt * 1000:.1f} ms).")
+            self._registrar(pc, True, round(sondeo.rtt * 1000, 3), sondeo.metodo)
+            return True
+        if sondeo is not None:
+            metricas.error(PING, detalle=pc.nombre)
+        self._registrar(pc, False, None, sondeo.metodo if sondeo else None)
+        return False
+
+    def colorear_lineas_pc(self, pc, connected_router, estado):
+        """
+        Colorea las líneas que llevan a una PC o VM según su estado.
+        Si no hay router accesible, marca en rojo la línea desde su switch.
+        """
+        pc_nombre = pc.nombre
+        if connected_router is None:
+            # No hay un router accesible conectado a esta PC o VM
+            self._registrar(pc, False, metodo="sin gateway")
+            switch_connected = pc.switch
+            line_name = self.topologia.linea(switch_connected, pc_nombre) if switch_connected else None
+
+            if line_name is not None:
+                self._color(line_name, "red")
+                print(f"Marca la línea {line_name} en rojo porque no hay router accesible para {pc_nombre}.")
+            return
+
+        color = "green" if estado else "red"
+
+        # Caso especial: VM Ubuntu (detrás de un switch)
+        if pc.tipo == "vm":
+            # Actualizar líneas de conexión
+            switch_connected = pc.switch
+            line_name_vm = self.topologia.linea(switch_connected, pc_nombre)
+            line_name_switch = self.topologia.linea(connected_router, switch_connected)
+
+            if line_name_vm is not None:
+                self._color(line_name_vm, color)
+                print(f"Marca la línea {line_name_vm} en {color} porque {pc_nombre} está {'alcanzable' if estado else 'inaccesible'}.")
+            else:
+                print(f"Línea {switch_connected}-{pc_nombre} no encontrada en la topología.")
+
+            if line_name_switch is not None:
+                self._color(line_name_switch, color)
+                print(f"Marca la línea {line_name_switch} en {color} porque el ping hacia {pc_nombre} {'fue exitoso' if estado else 'falló'}.")
+            else:
+                print(f"Línea {connected_router}-{switch_connected} no encontrada en la topología.")
+        else:
+            line_name = self.topologia.linea(connected_router, pc_nombre)
+
+            if line_name is not None:
+                self._color(line_name, color)
+                print(f"Marca la línea {line_name} en {color} porque {pc_nombre} está {'alcanzable' if estado else 'inaccesible'}.")
+            else:
+                print(f"Línea {connected_router}-{pc_nombre} no encontrada en la topología.")
+
+    # --- Monitoreo continuo (para PlanificadorMonitoreo) ---
+
+    async def sondear_lote(self, claves):
+        """
+        Sondea un lote de dispositivos del planificador y devuelve { nombre: True/False }.
+        Los routers se comprueban con el sondeo escalonado (connect TCP y, si toca,
+        recolección en segundo plano); las PCs/VM igual que en monitorear_por_dependencias.
+        """
+        claves = set(claves)
+        resultados = {}
+
+        lote_routers = [self.routers_por_nombre[clave] for clave in claves if clave in self.routers_por_nombre]
+        estados = await asyncio.gather(*(
+            self.motor.sondear_escalonado(router, self.comandos, self.recoleccion_terminada)
+            for router in lote_routers
+        ))
+        # Las PCs/VM del lote cuyo router acaba de caer no se sondean
+        accesibles = set(self.accesibles_continuo)
+        for router, estado in zip(lote_routers, estados):
+            resultados[router["nombre"]] = estado
+            device = self.topologia.dispositivo(router["nombre"])
+            self._registrar(device, estado, self.motor.rtt_tcp.get(router["ip"]) if estado else None,
+                            f"tcp/{self.motor.pool.puerto_de(router)}")
+            if estado:
+                accesibles.add(router["nombre"])
+            else:
+                accesibles.discard(router["nombre"])
+
+        pcs = [pc for pc in (self.topologia.dispositivo(clave) for clave in claves) if pc and pc.tipo in ["pc", "vm"]]
+        plan, ips_locales = self.plan_sondeo_pcs(pcs, accesibles)
+        pings, sondeos = await asyncio.gather(self.motor.ping_desde_routers(plan), self.barrido.barrer(ips_locales))
+        for pc in pcs:
+            connected_router = self.find_connected_router(pc.nombre, accesibles)
+            resultados[pc.nombre] = connected_router is not None and self.estado_pc(pc, connected_router, pings, sondeos)
+        return resultados
+
+    def aplicar_resultado(self, nombre, estado, anterior):
+        """
+        Aplica a la topología el resultado de un sondeo del planificador (solo si cambió).
+        Devuelve los dispositivos que conviene volver a sondear ya (los que cuelgan
+        de un router que cambió de estado).
+        """
+        device = self.topologia.dispositivo(nombre)
+        if estado == anterior or device is None:
+            # Sin cambios no se repinta nada, pero la muestra sí va al historial
+            self.guardar_historial([nombre])
+            return []
+        adelantar = []
+        if device.tipo == "router":
+            self.marcar_router(nombre, estado, self.accesibles_continuo)
+            self.recolorear_enlaces_router(nombre, self.accesibles_continuo)
+            adelantar = self.topologia.dispositivos_detras(nombre)
+        elif device.tipo in ["pc", "vm"]:
+            connected_router = self.find_connected_router(nombre, self.accesibles_continuo)
+            self.colorear_lineas_pc(device, connected_router, estado)
+        self.guardar_historial([nombre])
+        return adelantar
+
+    def claves_continuo(self):
+        """
+        Dispositivos que sigue el monitoreo continuo: routers, PCs y VM.
+        """
+        return [router["nombre"] for router in self.routers] + [device.nombre for device in self.topologia.hosts()]
+
+    # --- Resultados ---
+
+    def instantanea(self):
+        """
+        Registros (diccionarios) con el último estado de cada dispositivo y cada línea,
+        listos para serializar.
+        """
+        instante = time.time()
+        registros = []
+        for resultado in self.dispositivos.values():
+            registros.append({"ts": instante, "clase": "dispositivo", **resultado._asdict()})
+        for linea, color in self.colores.items():
+            enlace = self.topologia.enlace_de_linea(linea)
+            registros.append({
+                "ts": instante, "clase": "enlace", "linea": linea,
+                "origen": enlace.origen if enlace else None, "destino": enlace.destino if enlace else None,
+                "estado": "up" if color == "green" else "down", "color": color,
+            })
+        return registros
@@ -0,0 +1,238 @@
+import asyncio
+import re
+import time
+from collections import namedtuple
+
+from cache_ttl import CacheTTL
+from metricas import CONEXION, metricas
+from parsers_ios import DatosRouter
+from recolectores import RecolectorTelnet
+from sesiones_telnet import pool_telnet
+
+# Resultado de un ping lanzado desde un router: tasa de éxito en % y RTT en ms (None si no hubo respuesta)
+ResultadoPing = namedtuple("ResultadoPing", "ip tasa recibidos enviados rtt_min rtt_avg rtt_max")
+
+PATRON_PING = re.compile(
+    r"Success rate is (\d+) percent \((\d+)/(\d+)\)"
+    r"(?:, round-trip min/avg/max = (\d+)/(\d+)/(\d+) ms)?"
+)
+
+
+def interpretar_ping(ip, salida):
+    """
+    Extrae la tasa de éxito y el RTT mínimo/medio/máximo de la salida de 'ping' de IOS.
+    """
+    m = PATRON_PING.search(salida)
+    if not m:
+        return ResultadoPing(ip, 0, 0, 0, None, None, None)
+    tasa, recibidos, enviados = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    rtt = [int(v) if v is not None else None for v in m.group(4, 5, 6)]
+    return ResultadoPing(ip, tasa, recibidos, enviados, *rtt)
+
+# ==================
+#   Motor de sondeo asíncrono
+# ==================
+
+class MotorSondeo:
+    """
+    Sondea muchos routers desde un único hilo usando asyncio.
+    Cada router se conecta, se autentica y ejecuta sus comandos sin bloquear a los demás;
+    limite_concurrencia acota cuántos routers se atienden a la vez.
+
+    El sondeo escalonado separa dos niveles: un connect TCP al puerto Telnet (o SSH) decide
+    si el router está activo en cada ciclo, y la recolección completa de comandos solo se lanza
+    (en segundo plano) cuando el router cambia de estado, cuando su última recolección
+    tiene más de intervalo_coleccion segundos o cuando se fuerza.
+
+    Las recolecciones se guardan en una caché acotada (max_cache routers) cuyas entradas
+    caducan a los ttl_cache segundos; la ventana del router la usa para abrirse al instante.
+
+    pool es PoolSesionesTelnet o PoolConexionesSSH (misma interfaz); recolector es el
+    backend de la recolección completa (RecolectorTelnet con ese pool por defecto, o
+    RecolectorSNMP); los pings desde los routers siempre van por el pool.
+    """
+
+    def __init__(self, pool=pool_telnet, limite_concurrencia=100, timeout_tcp=2,
+                 intervalo_coleccion=300, limite_coleccion=20, ttl_cache=900, max_cache=2000,
+                 recolector=None):
+        self.pool = pool
+        self.recolector = recolector if recolector is not None else RecolectorTelnet(pool)
+        self.limite_concurrencia = limite_concurrencia
+        self.timeout_tcp = timeout_tcp
+        self.intervalo_coleccion = intervalo_coleccion
+        self.limite_coleccion = limite_coleccion
+        self.colecciones = CacheTTL(ttl_cache, max_cache)  # { ip: resultados } de la última recolección completa
+        self.datos = CacheTTL(ttl_cache, max_cache)        # { ip: DatosRouter } interpretado de esa misma recolección
+        self._estado_tcp = {}     # { ip: True/False } del último connect
+        self.rtt_tcp = {}         # { ip: ms } que tardó el último connect con éxito
+        self._recolectando = {}   # { ip: asyncio.Task }
+        self._semaforo_coleccion = None
+
+    async def comprobar_tcp(self, ip, puerto=23):
+        """
+        Nivel rápido: el router está activo si acepta la conexión TCP a su puerto Telnet (o SSH).
+        """
+        inicio = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, puerto), self.timeout_tcp)
+        except (OSError, asyncio.TimeoutError):
+            self.rtt_tcp.pop(ip, None)
+            metricas.error(CONEXION, ip, "sondeo")
+            return False
+        duracion = time.perf_counter() - inicio
+        metricas.observar(CONEXION, duracion, ip, "sondeo")
+        self.rtt_tcp[ip] = round(duracion * 1000, 3)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass  # El router cerró antes (RST): el sondeo ya cuenta como activo
+        return True
+
+    def necesita_coleccion(self, router, vivo):
+        """
+        Indica si toca la recolección completa: cambio de estado o recolección caducada.
+        """
+        ip = router["ip"]
+        if not vivo or ip in self._recolectando:
+            return False
+        if self._estado_tcp.get(ip) is not True:
+            return True
+        edad = self.colecciones.edad(ip)
+        return edad is None or edad > self.intervalo_coleccion
+
+    async def recolectar(self, router, comandos):
+        """
+        Recolección completa de comandos de un router; guarda el resultado en colecciones
+        y su versión interpretada en datos.
+        Devuelve los resultados (diccionario vacío si falló).
+        """
+        if self._semaforo_coleccion is None:
+            self._semaforo_coleccion = asyncio.Semaphore(self.limite_coleccion)
+        async with self._semaforo_coleccion:
+            try:
+                resultados = await self.recolector.recolectar(router, comandos)
+            except Exception as e:
+                print(f"Error al recolectar datos de {router.get('nombre', router['ip'])}: {e}")
+                return {}
+        self.guardar_coleccion(router["ip"], resultados)
+        return resultados
+
+    def guardar_coleccion(self, ip, resultados):
+        """
+        Guarda una recolección completa (del monitoreo o de la ventana del router) en la caché.
+        """
+        self.colecciones.poner(ip, resultados)
+        self.datos.poner(ip, DatosRouter(resultados))
+
+    def _recolectar_en_segundo_plano(self, router, comandos, al_recolectar):
+        async def _tarea():
+            try:
+                resultados = await self.recolectar(router, comandos)
+                if resultados and al_recolectar is not None:
+                    al_recolectar(router, resultados)
+            except Exception as e:
+                print(f"Error al procesar la recolección de {router.get('nombre', router['ip'])}: {e}")
+            finally:
+                self._recolectando.pop(router["ip"], None)
+
+        self._recolectando[router["ip"]] = asyncio.ensure_future(_tarea())
+
+    async def esperar_recolecciones(self, timeout=None):
+        """
+        Espera a que terminen las recolecciones en segundo plano en curso (o a que venza timeout).
+        Devuelve cuántas quedan pendientes.
+        """
+        pendientes = list(self._recolectando.values())
+        if pendientes:
+            await asyncio.wait(pendientes, timeout=timeout)
+        return len(self._recolectando)
+
+    def cancelar_recolecciones(self):
+        """
+        Cancela las recolecciones en segundo plano en curso (sus sesiones Telnet se cierran).
+        Devuelve cuántas canceló (las que ya habían terminado no cuentan).
+        """
+        pendientes = [tarea for tarea in self._recolectando.values() if not tarea.done()]
+        for tarea in pendientes:
+            tarea.cancel()
+        return len(pendientes)
+
+    def esperar_recolecciones_bloqueante(self, timeout=None):
+        """
+        Versión síncrona de esperar_recolecciones para usar fuera del bucle de fondo.
+        """
+        return self.pool.bucle.ejecutar(self.esperar_recolecciones(timeout))
+
+    def cancelar_recolecciones_bloqueante(self):
+        """
+        Versión síncrona de cancelar_recolecciones para usar fuera del bucle de fondo.
+        """
+        async def _cancelar():
+            return self.cancelar_recolecciones()
+
+        return self.pool.bucle.ejecutar(_cancelar())
+
+    async def sondear_escalonado(self, router, comandos, al_recolectar=None, forzar=False):
+        """
+        Nivel rápido (TCP) para un router y, si toca, la recolección completa en segundo plano.
+        al_recolectar(router, resultados) se llama cuando termina esa recolección.
+        Devuelve True si el router está activo.
+        """
+        vivo = await self.comprobar_tcp(router["ip"], self.pool.puerto_de(router))
+        if (forzar and vivo and router["ip"] not in self._recolectando) or self.necesita_coleccion(router, vivo):
+            self._recolectar_en_segundo_plano(router, comandos, al_recolectar)
+        self._estado_tcp[router["ip"]] = vivo
+        return vivo
+
+    async def barrer_escalonado(self, routers, comandos, callback, al_recolectar=None, forzar=False):
+        """
+        Barrido escalonado: callback(router, vivo) se llama con el resultado del connect TCP
+        de cada router, sin esperar a las recolecciones completas que se lancen.
+        """
+        semaforo = asyncio.Semaphore(self.limite_concurrencia)
+
+        async def _por_router(router):
+            async with semaforo:
+                vivo = await self.sondear_escalonado(router, comandos, al_recolectar, forzar)
+            try:
+                callback(router, vivo)
+            except Exception as e:
+                print(f"Error al procesar el resultado de {router.get('nombre', router['ip'])}: {e}")
+
+        await asyncio.gather(*(_por_router(router) for router in routers))
+        # Aprovechar cada barrido para soltar las recolecciones caducadas
+        self.colecciones.purgar()
+        self.datos.purgar()
+
+    async def ping_desde_router(self, router, ips, repeticiones=2, timeout=1):
+        """
+        Hace ping a varias IPs desde el router usando una sola sesión del pool.
+        Devuelve { ip: ResultadoPing }, o un diccionario vacío si no se pudo entrar al router.
+        """
+        comandos = {ip: f"ping {ip} repeat {repeticiones} timeout {timeout}" for ip in ips}
+        try:
+            salidas = await self.pool.ejecutar_asincrono(
+                router["ip"], router["username"], router["password"], comandos,
+                puerto=self.pool.puerto_de(router),
+            )
+        except Exception as e:
+            print(f"Error al hacer ping desde {router.get('nombre', router['ip'])}: {e}")
+            return {}
+        return {ip: interpretar_ping(ip, salidas.get(ip, "")) for ip in ips}
+
+    async def ping_desde_routers(self, plan, repeticiones=2, timeout=1):
+        """
+        Ejecuta a la vez los pings de cada router. plan es una lista de (router, [ips]).
+        Devuelve { ip: ResultadoPing } con todas las IPs que se pudieron sondear.
+        """
+        semaforo = asyncio.Semaphore(self.limite_concurrencia)
+
+        async def _por_router(router, ips):
+            async with semaforo:
+                return await self.ping_desde_router(router, ips, repeticiones, timeout)
+
+        resultados = {}
+        for parcial in await asyncio.gather(*(_por_router(router, ips) for router, ips in plan if ips)):
+            resultados.update(parcial)
+        return resultados
@@ -0,0 +1,265 @@
+import ipaddress
+import re
+from collections import Counter, namedtuple
+
+# ==================
+#   Registros
+# ==================
+
+# show ip interface brief
+Interfaz = namedtuple("Interfaz", "nombre ip ok metodo estado protocolo")
+
+# show ip route: longitud es la longitud del prefijo; ad/metrica y siguiente_salto
+# son None en las rutas conectadas
+Ruta = namedtuple("Ruta", "codigo prefijo longitud ad metrica siguiente_salto interfaz")
+
+# show access-lists
+ReglaACL = namedtuple("ReglaACL", "lista tipo secuencia accion regla coincidencias")
+
+# show ip nat translations ("---" se guarda como None)
+TraduccionNAT = namedtuple("TraduccionNAT", "protocolo global_interna local_interna local_externa global_externa")
+
+# show ip dhcp pool
+PoolDHCP = namedtuple("PoolDHCP", "nombre total arrendadas rango_inicio rango_fin")
+
+# ==================
+#   Expresiones precompiladas
+# ==================
+
+PATRON_INTERFAZ = re.compile(
+    r"^(\S+)\s+(\S+)\s+(YES|NO)\s+(\S+)\s+(up|down|administratively down|deleted)\s+(up|down)\s*$",
+    re.MULTILINE,
+)
+
+# "O IA     10.1.0.0/24 [110/2] via 172.16.1.2, 00:01:02, Serial0/0/0"
+# "C        192.168.1.0/24 is directly connected, GigabitEthernet0/0"
+PATRON_RUTA = re.compile(
+    r"^([A-Za-z*+%]{1,2}[*]?(?: ?(?:IA|N1|N2|E1|E2|EX|L1|L2|ia|su))?)\s+"
+    r"(\d+\.\d+\.\d+\.\d+)(?:/(\d+))?\s*"
+    r"(?:\[(\d+)/(\d+)\]\s+via\s+(\d+\.\d+\.\d+\.\d+)(?:,\s*[\w:.]+)?(?:,\s*(\S+))?"
+    r"|is directly connected,\s*(\S+))?\s*$"
+)
+# Siguiente salto adicional (ECMP) o prefijo partido en dos líneas
+PATRON_RUTA_CONTINUACION = re.compile(
+    r"^\s+\[(\d+)/(\d+)\]\s+via\s+(\d+\.\d+\.\d+\.\d+)(?:,\s*[\w:.]+)?(?:,\s*(\S+))?\s*$"
+)
+# "     10.0.0.0/24 is subnetted, 2 subnets": máscara de las entradas sin /longitud que siguen
+PATRON_SUBRED = re.compile(r"^\s+(\d+\.\d+\.\d+\.\d+)/(\d+) is (?:variably )?subnetted")
+
+PATRON_ACL_CABECERA = re.compile(r"^(Standard|Extended|Reflexive) IP access list (\S+)", re.MULTILINE)
+PATRON_ACL_REGLA = re.compile(r"^\s+(?:(\d+)\s+)?(permit|deny|remark|evaluate)\b(.*?)(?:\s+\((\d+) match(?:es)?\))?\s*$")
+
+# Protocolo y las cuatro direcciones (IP, IP:puerto o "---"): así no cuentan como traducción
+# la cabecera ni el pie ("Total number of translations: N")
+_DIRECCION_NAT = r"(\d+\.\d+\.\d+\.\d+(?::\d+)?|---)"
+PATRON_NAT = re.compile(
+    r"^(tcp|udp|icmp|---)\s+" + r"\s+".join([_DIRECCION_NAT] * 4) + r"\s*$",
+    re.MULTILINE,
+)
+
+PATRON_DHCP_POOL = re.compile(r"^Pool (\S+) :", re.MULTILINE)
+PATRON_DHCP_TOTAL = re.compile(r"Total addresses\s*:\s*(\d+)")
+PATRON_DHCP_ARRENDADAS = re.compile(r"Leased addresses\s*:\s*(\d+)")
+PATRON_DHCP_RANGO = re.compile(r"(\d+\.\d+\.\d+\.\d+)\s+-\s+(\d+\.\d+\.\d+\.\d+)")
+
+# ==================
+#   Parsers
+# ==================
+
+def interpretar_interfaces(texto):
+    """
+    show ip interface brief -> [Interfaz]
+    """
+    return [Interfaz(*m.groups()) for m in PATRON_INTERFAZ.finditer(texto)]
+
+
+def _longitud_clasica(prefijo):
+    """
+    Longitud de la máscara con clase (A/B/C) de una dirección.
+    """
+    primer_octeto = int(prefijo.split(".", 1)[0])
+    if primer_octeto < 128:
+        return 8
+    if primer_octeto < 192:
+        return 16
+    if primer_octeto < 224:
+        return 24
+    return 32
+
+
+def _red_clasica(prefijo):
+    """
+    Red con clase a la que pertenece la dirección (los octetos que fija su máscara).
+    """
+    octetos = _longitud_clasica(prefijo) // 8
+    return tuple(prefijo.split(".")[:octetos])
+
+
+def interpretar_rutas(texto):
+    """
+    show ip route -> [Ruta]. Las rutas con varios siguientes saltos dan un registro por salto.
+    Las entradas sin /longitud (formato con clase) toman la de su cabecera "is subnetted"
+    o, fuera de ella, la máscara con clase.
+    """
+    rutas = []
+    subred = None    # (red con clase, longitud) de la última cabecera "is subnetted"
+    anterior = None  # (codigo, prefijo, longitud) de la última ruta, para las continuaciones
+    for linea in texto.splitlines():
+        m = PATRON_RUTA.match(linea)
+        if m:
+            codigo, prefijo, longitud, ad, metrica, salto, interfaz, conectada = m.groups()
+            if longitud is not None:
+                longitud = int(longitud)
+            elif subred is not None and _red_clasica(prefijo) == subred[0]:
+                longitud = subred[1]
+            else:
+                longitud = _longitud_clasica(prefijo)
+            anterior = (codigo.strip(), prefijo, longitud)
+            if ad is not None:
+                rutas.append(Ruta(*anterior, int(ad), int(metrica), salto, interfaz))
+            elif conectada is not None:
+                rutas.append(Ruta(*anterior, None, None, None, conectada))
+            # Si no hay ni "via" ni "connected", el resto llega en la línea siguiente
+            continue
+        m = PATRON_RUTA_CONTINUACION.match(linea)
+        if m and anterior is not None:
+            ad, metrica, salto, interfaz = m.groups()
+            rutas.append(Ruta(*anterior, int(ad), int(metrica), salto, interfaz))
+            continue
+        m = PATRON_SUBRED.match(linea)
+        if m:
+            subred = (_red_clasica(m.group(1)), int(m.group(2)))
+            anterior = None
+    return rutas
+
+
+def interpretar_acls(texto):
+    """
+    show access-lists -> [ReglaACL]
+    """
+    reglas = []
+    lista = tipo = None
+    for linea in texto.splitlines():
+        m = PATRON_ACL_CABECERA.match(linea)
+        if m:
+            tipo, lista = m.groups()
+            continue
+        m = PATRON_ACL_REGLA.match(linea)
+        if m and lista is not None:
+            secuencia, accion, regla, coincidencias = m.groups()
+            reglas.append(ReglaACL(
+                lista, tipo,
+                int(secuencia) if secuencia else None,
+                accion, regla.strip(),
+                int(coincidencias) if coincidencias else 0,
+            ))
+    return reglas
+
+
+def _campo_nat(valor):
+    return None if valor == "---" else valor
+
+
+def iterar_traducciones_nat(fuente):
+    """
+    show ip nat translations -> iterador de TraduccionNAT.
+    fuente puede ser el texto completo (se recorre con finditer, sin partirlo en líneas)
+    o cualquier iterable de líneas (un fichero, un stream); así tablas de 100k+
+    traducciones se procesan sin copias intermedias.
+    """
+    if isinstance(fuente, str):
+        coincidencias = PATRON_NAT.finditer(fuente)
+    else:
+        coincidencias = (m for m in (PATRON_NAT.match(linea) for linea in fuente) if m)
+    for m in coincidencias:
+        protocolo, gi, li, lo, go = m.groups()
+        yield TraduccionNAT(protocolo, _campo_nat(gi), _campo_nat(li), _campo_nat(lo), _campo_nat(go))
+
+
+def resumir_nat(fuente):
+    """
+    Cuenta las traducciones NAT por protocolo recorriendo la tabla en streaming.
+    """
+    return Counter(t.protocolo for t in iterar_traducciones_nat(fuente))
+
+
+def interpretar_pools_dhcp(texto):
+    """
+    show ip dhcp pool -> [PoolDHCP]
+    """
+    pools = []
+    cabeceras = list(PATRON_DHCP_POOL.finditer(texto))
+    for i, cabecera in enumerate(cabeceras):
+        fin = cabeceras[i + 1].start() if i + 1 < len(cabeceras) else len(texto)
+        bloque = texto[cabecera.end():fin]
+        total = PATRON_DHCP_TOTAL.search(bloque)
+        arrendadas = PATRON_DHCP_ARRENDADAS.search(bloque)
+        rango = PATRON_DHCP_RANGO.search(bloque)
+        pools.append(PoolDHCP(
+            cabecera.group(1),
+            int(total.group(1)) if total else None,
+            int(arrendadas.group(1)) if arrendadas else None,
+            rango.group(1) if rango else None,
+            rango.group(2) if rango else None,
+        ))
+    return pools
+
+# ==================
+#   Datos de un router
+# ==================
+
+class DatosRouter:
+    """
+    Vista estructurada de los resultados recogidos de un router
+    ({ "Interface": ..., "Ip route": ..., ... } como en comandos_show).
+    La tabla NAT no se materializa: traducciones_nat() la recorre bajo demanda.
+    """
+    __slots__ = ("interfaces", "rutas", "acls", "pools_dhcp", "_texto_nat")
+
+    def __init__(self, resultados):
+        self.interfaces = interpretar_interfaces(resultados.get("Interface", ""))
+        self.rutas = interpretar_rutas(resultados.get("Ip route", ""))
+        self.acls = interpretar_acls(resultados.get("ACL", ""))
+        self.pools_dhcp = interpretar_pools_dhcp(resultados.get("DHCP", ""))
+        self._texto_nat = resultados.get("NAT", "")
+
+    def traducciones_nat(self):
+        return iterar_traducciones_nat(self._texto_nat)
+
+    def resumen_nat(self):
+        return resumir_nat(self._texto_nat)
+
+    def interfaces_activas(self):
+        """
+        Interfaces en estado up/up.
+        """
+        return [i for i in self.interfaces if i.estado == "up" and i.protocolo == "up"]
+
+    def estado_red(self, red):
+        """
+        Estado del enlace de la red indicada ("180.16.2.0/24") visto desde este router:
+        True si la interfaz con IP en esa red está up/up, False si está caída y None si
+        no se sabe (ninguna interfaz en la red o red no válida). Cuando show ip interface
+        brief no trae la interfaz, una ruta conectada a la red cuenta como interfaz activa.
+        """
+        try:
+            red = ipaddress.ip_network(red, strict=False)
+        except ValueError:
+            return None
+        estado = None
+        for interfaz in self.interfaces:
+            try:
+                en_red = ipaddress.ip_address(interfaz.ip) in red
+            except ValueError:
+                continue  # "unassigned"
+            if en_red:
+                if interfaz.estado == "up" and interfaz.protocolo == "up":
+                    return True
+                estado = False
+        if estado is None and any(
+            ruta.interfaz is not None and ruta.siguiente_salto is None and ruta.codigo.startswith("C")
+            and ipaddress.ip_network(f"{ruta.prefijo}/{ruta.longitud}", strict=False) == red
+            for ruta in self.rutas
+        ):
+            return True
+        return estado
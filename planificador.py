@@ -0,0 +1,224 @@
+import asyncio
+import heapq
+import math
+import random
+from collections import deque
+
+from sesiones_telnet import bucle_telnet
+
+# ==================
+#   Limitador de tasa
+# ==================
+
+class LimitadorTasa:
+    """
+    Cubeta de fichas: como mucho `tasa` sondeos por segundo, con ráfagas de hasta `rafaga`.
+    """
+
+    def __init__(self, tasa, rafaga=None):
+        self.tasa = tasa
+        self.rafaga = rafaga if rafaga is not None else max(1.0, tasa)
+        self._fichas = self.rafaga
+        self._ultimo = None
+
+    async def tomar(self, n=1):
+        """
+        Espera hasta que haya n fichas disponibles y las consume.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            ahora = loop.time()
+            if self._ultimo is not None:
+                self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self._fichas >= n:
+                self._fichas -= n
+                return
+            await asyncio.sleep((n - self._fichas) / self.tasa)
+
+# ==================
+#   Planificador de monitoreo continuo
+# ==================
+
+class EstadoPlanificado:
+    """
+    Estado de planificación de un dispositivo.
+    """
+    __slots__ = ("intervalo", "proximo", "version", "estado", "cambios")
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.proximo = 0.0
+        self.version = 0
+        self.estado = None        # Último resultado (True/False), None si aún no se sondeó
+        self.cambios = deque()    # Instantes de los últimos cambios de estado
+
+
+class PlanificadorMonitoreo:
+    """
+    Vuelve a sondear cada dispositivo según su propio intervalo, en segundo plano.
+
+    - Los dispositivos estables y activos alargan su intervalo (x factor_espera)
+      hasta intervalo_max.
+    - Los caídos, los que acaban de cambiar y los inestables (cambios_inestable
+      cambios dentro de ventana_inestable segundos) vuelven a intervalo_min.
+    - Cada intervalo lleva un jitter de ±jitter para que los sondeos no coincidan.
+    - tasa_max limita los sondeos por segundo de todo el planificador.
+
+    sondear_lote(claves) es una corrutina que devuelve { clave: True/False };
+    al_resultado(clave, estado, anterior) se llama en el bucle de fondo con cada resultado.
+    """
+
+    def __init__(self, sondear_lote, al_resultado, intervalo_min=5.0, intervalo_max=300.0,
+                 factor_espera=2.0, jitter=0.2, tasa_max=20.0, ventana_inestable=300.0,
+                 cambios_inestable=3, bucle=bucle_telnet):
+        self.sondear_lote = sondear_lote
+        self.al_resultado = al_resultado
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.factor_espera = factor_espera
+        self.jitter = jitter
+        self.ventana_inestable = ventana_inestable
+        self.cambios_inestable = cambios_inestable
+        self.bucle = bucle
+        self.limitador = LimitadorTasa(tasa_max)
+        self.max_lote = max(1, math.ceil(tasa_max))
+        self._estados = {}      # { clave: EstadoPlanificado }
+        self._cola = []         # heap de (proximo, version, clave)
+        self._en_curso = set()
+        self._despertar = None
+        self._tarea = None
+
+    # --- API para cualquier hilo ---
+
+    def agregar(self, claves):
+        """
+        Añade dispositivos al planificador; su primer sondeo se reparte en intervalo_min.
+        """
+        self._en_bucle(self._agregar, list(claves))
+
+    def adelantar(self, claves):
+        """
+        Fuerza un sondeo inmediato (por ejemplo, de los dispositivos detrás de un router que cambió).
+        """
+        self._en_bucle(self._adelantar, list(claves))
+
+    def iniciar(self):
+        """
+        Arranca el planificador en el bucle de fondo.
+        """
+        self._en_bucle(self._iniciar)
+
+    def detener(self):
+        """
+        Detiene el planificador; los sondeos en curso terminan pero no se reprograman.
+        """
+        self._en_bucle(self._detener)
+
+    @property
+    def activo(self):
+        return self._tarea is not None
+
+    def _en_bucle(self, funcion, *args):
+        self.bucle.loop().call_soon_threadsafe(funcion, *args)
+
+    # --- Dentro del bucle de fondo ---
+
+    def _programar(self, clave, estado, retraso):
+        estado.version += 1
+        estado.proximo = asyncio.get_running_loop().time() + retraso
+        heapq.heappush(self._cola, (estado.proximo, estado.version, clave))
+        if self._despertar is not None:
+            self._despertar.set()
+
+    def _agregar(self, claves):
+        for clave in claves:
+            if clave not in self._estados:
+                estado = EstadoPlanificado(self.intervalo_min)
+                self._estados[clave] = estado
+                self._programar(clave, estado, random.uniform(0, self.intervalo_min))
+
+    def _adelantar(self, claves):
+        for clave in claves:
+            estado = self._estados.get(clave)
+            if estado is not None and clave not in self._en_curso:
+                self._programar(clave, estado, 0)
+
+    def _iniciar(self):
+        if self._tarea is None:
+            self._despertar = asyncio.Event()
+            self._tarea = asyncio.ensure_future(self._ejecutar())
+            # Reprogramar lo que quedó sin cola al detenerse
+            for clave, estado in self._estados.items():
+                if clave not in self._en_curso:
+                    self._programar(clave, estado, random.uniform(0, self.intervalo_min))
+
+    def _detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            self._tarea = None
+
+    async def _ejecutar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._despertar.clear()
+            ahora = loop.time()
+            if not self._cola or self._cola[0][0] > ahora:
+                espera = self._cola[0][0] - ahora if self._cola else None
+                try:
+                    await asyncio.wait_for(self._despertar.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            lote = []
+            while self._cola and self._cola[0][0] <= ahora and len(lote) < self.max_lote:
+                proximo, version, clave = heapq.heappop(self._cola)
+                estado = self._estados.get(clave)
+                if estado is None or estado.version != version or clave in self._en_curso:
+                    continue  # Entrada obsoleta o ya en curso (se reprograma al terminar)
+                lote.append(clave)
+            if not lote:
+                continue
+            await self.limitador.tomar(len(lote))
+            self._en_curso.update(lote)
+            asyncio.ensure_future(self._sondear(lote))
+
+    async def _sondear(self, lote):
+        try:
+            resultados = await self.sondear_lote(lote)
+        except Exception as e:
+            print(f"Error en el sondeo continuo: {e}")
+            resultados = {}
+        finally:
+            self._en_curso.difference_update(lote)
+        if self._tarea is None:
+            return
+        ahora = asyncio.get_running_loop().time()
+        for clave in lote:
+            estado = self._estados.get(clave)
+            if estado is None:
+                continue
+            if clave not in resultados:
+                # Sin resultado: reintentar pronto sin tocar el intervalo
+                self._programar(clave, estado, self.intervalo_min)
+                continue
+            nuevo = resultados[clave]
+            anterior = estado.estado
+            cambio = anterior is not None and nuevo != anterior
+            if cambio:
+                estado.cambios.append(ahora)
+            while estado.cambios and ahora - estado.cambios[0] > self.ventana_inestable:
+                estado.cambios.popleft()
+            inestable = len(estado.cambios) >= self.cambios_inestable
+
+            if not nuevo or cambio or inestable:
+                estado.intervalo = self.intervalo_min
+            else:
+                estado.intervalo = min(estado.intervalo * self.factor_espera, self.intervalo_max)
+            estado.estado = nuevo
+            self._programar(clave, estado, estado.intervalo * random.uniform(1 - self.jitter, 1 + self.jitter))
+            try:
+                self.al_resultado(clave, nuevo, anterior)
+            except Exception as e:
+                print(f"Error al procesar el sondeo de {clave}: {e}")
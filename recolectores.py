@@ -0,0 +1,273 @@
+import asyncio
+import time
+
+from cliente_snmp import ClienteSNMP, oid
+from sesiones_ssh import pool_ssh
+from sesiones_telnet import ResultadosTelnet, pool_telnet
+
+# ==================
+#   Recolección por Telnet
+# ==================
+
+class RecolectorTelnet:
+    """
+    Recolección completa por Telnet: entra en el router con una sesión del pool y
+    ejecuta los comandos show. Es la que usa MotorSondeo por defecto.
+    Con el pool SSH (PoolConexionesSSH) los mismos comandos van por SSH, cada uno en
+    su canal.
+    """
+
+    def __init__(self, pool=pool_telnet):
+        self.pool = pool
+        self.nombre = pool.nombre
+
+    async def recolectar(self, router, comandos):
+        """
+        Devuelve { clave: salida } (ResultadosTelnet, con el tiempo de cada comando).
+        """
+        return await self.pool.ejecutar_asincrono(
+            router["ip"], router["username"], router["password"], comandos,
+            puerto=self.pool.puerto_de(router),
+        )
+
+    def cerrar(self):
+        pass
+
+# ==================
+#   Recolección por SNMP
+# ==================
+
+SYS_UPTIME = oid("1.3.6.1.2.1.1.3.0")
+IF_NUMBER = oid("1.3.6.1.2.1.2.1.0")
+
+# ifTable
+IF_DESCR = oid("1.3.6.1.2.1.2.2.1.2")
+IF_ADMIN_STATUS = oid("1.3.6.1.2.1.2.2.1.7")
+IF_OPER_STATUS = oid("1.3.6.1.2.1.2.2.1.8")
+# ipAddrTable (índice: la IP)
+IP_AD_ENT_IF_INDEX = oid("1.3.6.1.2.1.4.20.1.2")
+# ipRouteTable (índice: la red de destino)
+IP_ROUTE_IF_INDEX = oid("1.3.6.1.2.1.4.21.1.2")
+IP_ROUTE_METRIC1 = oid("1.3.6.1.2.1.4.21.1.3")
+IP_ROUTE_NEXT_HOP = oid("1.3.6.1.2.1.4.21.1.7")
+IP_ROUTE_TYPE = oid("1.3.6.1.2.1.4.21.1.8")
+IP_ROUTE_PROTO = oid("1.3.6.1.2.1.4.21.1.9")
+IP_ROUTE_AGE = oid("1.3.6.1.2.1.4.21.1.10")
+IP_ROUTE_MASK = oid("1.3.6.1.2.1.4.21.1.11")
+
+# Columnas de ipRouteTable que se recorren una vez se sabe cuántas rutas hay (por IP_ROUTE_MASK)
+COLUMNAS_RUTAS = (IP_ROUTE_IF_INDEX, IP_ROUTE_METRIC1, IP_ROUTE_NEXT_HOP, IP_ROUTE_TYPE, IP_ROUTE_PROTO,
+                  IP_ROUTE_AGE)
+
+RUTA_DIRECTA = 3  # ipRouteType direct(3)
+PROTO_LOCAL = 2   # ipRouteProto local(2)
+
+# ipRouteProto -> (código de IOS, distancia administrativa por defecto)
+CODIGOS_RUTA = {
+    3: ("S", 1),     # netmgmt (estática)
+    8: ("R", 120),
+    9: ("i", 115),
+    11: ("I", 100),
+    13: ("O", 110),
+    14: ("B", 20),
+    16: ("D", 90),
+}
+
+
+def _texto(valor):
+    if isinstance(valor, bytes):
+        return valor.decode("utf-8", "replace")
+    return str(valor)
+
+
+def _ip(indice):
+    return ".".join(str(n) for n in indice)
+
+
+def _longitud_mascara(mascara):
+    return sum(bin(int(octeto)).count("1") for octeto in mascara.split("."))
+
+
+def _edad(segundos):
+    return f"{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}"
+
+
+def texto_interfaces(columnas):
+    """
+    ifTable + ipAddrTable -> texto con el formato de 'show ip interface brief'.
+    """
+    nombres = {indice: _texto(valor).replace(" ", "") for indice, valor in columnas[IF_DESCR]}
+    admin = dict(columnas[IF_ADMIN_STATUS])
+    oper = dict(columnas[IF_OPER_STATUS])
+    ips = {}
+    for indice, if_index in columnas[IP_AD_ENT_IF_INDEX]:
+        ips.setdefault((if_index,), _ip(indice))
+    filas = ["Interface              IP-Address      OK? Method Status                Protocol"]
+    for indice, nombre in nombres.items():
+        ip = ips.get(indice)
+        activa = oper.get(indice) == 1
+        estado = "administratively down" if admin.get(indice) == 2 else ("up" if activa else "down")
+        filas.append(f"{nombre:<22} {ip or 'unassigned':<15} {'YES' if ip else 'NO':<3} "
+                     f"{'SNMP' if ip else 'unset':<6} {estado:<21} {'up' if activa else 'down'}")
+    return "\n".join(filas) + "\n"
+
+
+def texto_rutas(columnas):
+    """
+    ipRouteTable -> texto con el formato de 'show ip route' (las rutas de protocolos
+    sin código de IOS conocido se omiten).
+    """
+    nombres = {indice: _texto(valor).replace(" ", "") for indice, valor in columnas[IF_DESCR]}
+    campos = {c: dict(columnas[c]) for c in (IP_ROUTE_IF_INDEX, IP_ROUTE_METRIC1, IP_ROUTE_NEXT_HOP,
+                                             IP_ROUTE_TYPE, IP_ROUTE_PROTO, IP_ROUTE_AGE)}
+    filas = []
+    por_defecto = None
+    for indice, mascara in columnas[IP_ROUTE_MASK]:
+        destino = _ip(indice)
+        prefijo = f"{destino}/{_longitud_mascara(mascara)}"
+        interfaz = nombres.get((campos[IP_ROUTE_IF_INDEX].get(indice),), "")
+        proto = campos[IP_ROUTE_PROTO].get(indice)
+        if campos[IP_ROUTE_TYPE].get(indice) == RUTA_DIRECTA or proto == PROTO_LOCAL:
+            filas.append(f"C        {prefijo} is directly connected, {interfaz}")
+            continue
+        if proto not in CODIGOS_RUTA:
+            continue
+        codigo, ad = CODIGOS_RUTA[proto]
+        salto = campos[IP_ROUTE_NEXT_HOP].get(indice, "0.0.0.0")
+        if prefijo == "0.0.0.0/0":
+            codigo += "*"
+            por_defecto = salto
+        metrica = max(0, campos[IP_ROUTE_METRIC1].get(indice, 0))
+        edad = _edad(max(0, campos[IP_ROUTE_AGE].get(indice, 0)))
+        filas.append(f"{codigo:<9}{prefijo} [{ad}/{metrica}] via {salto}, {edad}, {interfaz}".rstrip(", "))
+    cabecera = [
+        "Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP",
+        "       D - EIGRP, O - OSPF, i - IS-IS, * - candidate default",
+        "",
+        f"Gateway of last resort is {por_defecto} to network 0.0.0.0" if por_defecto
+        else "Gateway of last resort is not set",
+        "",
+    ]
+    return "\n".join(cabecera + filas) + "\n"
+
+
+TEXTO_SNMP = {
+    "Interface": texto_interfaces,
+    "Ip route": texto_rutas,
+}
+
+
+class RecolectorSNMP:
+    """
+    Recolección por SNMP v2c: en lugar de entrar en el router y leer los show, pide
+    sysUpTime y recorre con GETBULK ifTable, ipAddrTable e ipRouteTable, y devuelve
+    "Interface" e "Ip route" con el mismo formato de texto que IOS, así DatosRouter,
+    la caché y la ventana del router no cambian.
+
+    Las columnas se recorren cada una por separado y todas a la vez, en dos viajes:
+    el primero trae sysUpTime, ifNumber y las máscaras de las rutas (con eso se sabe
+    cuántas filas tiene cada tabla) y el segundo el resto de columnas pidiendo justo
+    esas filas, sin traer de más de la columna siguiente.
+
+    Los demás comandos (ACL, NAT, DHCP, running-config) no tienen equivalente en estas
+    tablas: no se devuelven y la ventana del router los pide por Telnet al abrirse.
+    Todas las peticiones comparten el socket UDP del ClienteSNMP.
+    Cada router puede llevar su "puerto_snmp" y su "comunidad".
+    """
+
+    nombre = "SNMP"
+    COMANDOS = tuple(TEXTO_SNMP)
+
+    def __init__(self, cliente=None, comunidad="public", puerto=161, max_repeticiones=64):
+        self.cliente = cliente if cliente is not None else ClienteSNMP(comunidad)
+        self.comunidad = comunidad
+        self.puerto = puerto
+        self.max_repeticiones = max_repeticiones
+
+    async def _recorrer(self, ip, columnas, puerto, comunidad, filas=None, repeticiones=None):
+        """
+        Recorre cada columna por separado, todas a la vez. filas: las que se sabe que
+        tienen; repeticiones: las que se piden por petición si no se sabe.
+        """
+        repeticiones = min(filas or repeticiones or self.max_repeticiones, self.max_repeticiones)
+        recorridos = await asyncio.gather(*(
+            self.cliente.recorrer_columnas(ip, [columna], puerto, comunidad, repeticiones, filas)
+            for columna in columnas
+        ))
+        tablas = {}
+        for recorrido in recorridos:
+            tablas.update(recorrido)
+        return tablas
+
+    async def recolectar(self, router, comandos):
+        """
+        Devuelve { clave: salida } de las claves de comandos que se pueden obtener por
+        SNMP (ResultadosTelnet con .tiempos y, en .uptime, los segundos desde el arranque).
+        """
+        ip = router["ip"]
+        puerto = router.get("puerto_snmp") or self.puerto
+        comunidad = router.get("comunidad") or self.comunidad
+        claves = [clave for clave in self.COMANDOS if clave in comandos]
+        interfaces = "Interface" in claves
+        rutas = "Ip route" in claves
+
+        async def sin_rutas():
+            return {IP_ROUTE_MASK: []}
+
+        inicio = time.perf_counter()
+        try:
+            variables, tablas = await asyncio.gather(
+                self.cliente.get(ip, [SYS_UPTIME, IF_NUMBER], puerto, comunidad),
+                self._recorrer(ip, [IP_ROUTE_MASK], puerto, comunidad) if rutas else sin_rutas(),
+            )
+            n_interfaces = variables.get(IF_NUMBER)
+            columnas_if = (IF_DESCR, IF_ADMIN_STATUS, IF_OPER_STATUS) if interfaces else (IF_DESCR,)
+            segunda = await asyncio.gather(
+                self._recorrer(ip, columnas_if, puerto, comunidad, n_interfaces),
+                # Direcciones IP: normalmente no más que interfaces; con una fila de más
+                # la respuesta ya trae el final de la columna
+                self._recorrer(ip, [IP_AD_ENT_IF_INDEX] if interfaces else [], puerto, comunidad,
+                               repeticiones=n_interfaces + 1 if n_interfaces else None),
+                self._recorrer(ip, COLUMNAS_RUTAS if tablas[IP_ROUTE_MASK] else [], puerto, comunidad,
+                               len(tablas[IP_ROUTE_MASK])),
+            )
+        except asyncio.TimeoutError:
+            raise Exception(f"El agente SNMP de {ip}:{puerto} no respondió.")
+        segundos = time.perf_counter() - inicio
+        for parte in segunda:
+            tablas.update(parte)
+        for columna in COLUMNAS_RUTAS:
+            tablas.setdefault(columna, [])
+
+        resultados = ResultadosTelnet()
+        for clave in claves:
+            resultados[clave] = TEXTO_SNMP[clave](tablas)
+            resultados.tiempos[clave] = segundos
+        uptime = variables.get(SYS_UPTIME)
+        resultados.uptime = uptime / 100 if uptime is not None else None
+        return resultados
+
+    def cerrar(self):
+        self.cliente.cerrar()
+
+
+def pool_de_backend(backend="telnet"):
+    """
+    Pool con que se entra en los routers (pings, ventana del router y, salvo con SNMP,
+    la recolección): el SSH con el backend "ssh" y el Telnet con los demás.
+    """
+    if backend == "ssh":
+        return pool_ssh
+    return pool_telnet
+
+
+def crear_recolector(backend="telnet", pool=None, comunidad="public", puerto_snmp=161):
+    """
+    Recolector para el nombre de backend de la configuración o de la línea de órdenes
+    (sin pool, el de pool_de_backend).
+    """
+    if backend in ("telnet", "ssh"):
+        return RecolectorTelnet(pool if pool is not None else pool_de_backend(backend))
+    if backend == "snmp":
+        return RecolectorSNMP(comunidad=comunidad, puerto=puerto_snmp)
+    raise ValueError(f"Backend de recolección desconocido: {backend}")
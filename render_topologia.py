@@ -0,0 +1,407 @@
+import math
+
+# ==================
+#   Índice espacial
+# ==================
+
+class IndiceEspacial:
+    """
+    Rejilla uniforme sobre las coordenadas de la topología: { (columna, fila): [indices] }.
+    Consultar un rectángulo solo recorre las celdas que lo cubren.
+    """
+
+    def __init__(self, tamano_celda):
+        self.tamano_celda = tamano_celda
+        self._celdas = {}
+
+    def _celda(self, x, y):
+        return int(math.floor(x / self.tamano_celda)), int(math.floor(y / self.tamano_celda))
+
+    def insertar(self, indice, x, y):
+        self._celdas.setdefault(self._celda(x, y), []).append(indice)
+
+    def consultar(self, x1, y1, x2, y2):
+        """
+        Índices de los puntos que caen dentro del rectángulo (x1, y1)-(x2, y2).
+        """
+        c1, f1 = self._celda(x1, y1)
+        c2, f2 = self._celda(x2, y2)
+        if (c2 - c1 + 1) * (f2 - f1 + 1) > len(self._celdas):
+            # Vista muy alejada: sale más barato recorrer solo las celdas ocupadas
+            celdas = (v for (c, f), v in self._celdas.items() if c1 <= c <= c2 and f1 <= f <= f2)
+        else:
+            celdas = (self._celdas.get((c, f), ()) for c in range(c1, c2 + 1) for f in range(f1, f2 + 1))
+        for indices in celdas:
+            yield from indices
+
+# ==================
+#   Dibujado incremental de la topología
+# ==================
+
+PADDING_TEXTO = 3       # Margen del fondo blanco alrededor de las etiquetas
+DESPLAZAMIENTO_NOMBRE = 30  # Píxeles bajo el icono donde va el nombre del dispositivo
+UMBRAL_ARRASTRE = 4     # Píxeles que hay que mover el ratón para que un clic pase a ser arrastre
+
+
+class RenderTopologia:
+    """
+    Dibuja la topología en un tk.Canvas creando cada elemento una sola vez.
+    Al redimensionar solo se recalculan las coordenadas (agrupando los eventos
+    <Configure> seguidos), así que los ids de las líneas no cambian y los cambios
+    de color nunca compiten con una reconstrucción del canvas.
+
+    Admite zoom (rueda del ratón, centrado en el cursor) y desplazamiento (arrastrando).
+    Solo se recolocan los elementos visibles: los dispositivos se buscan en un
+    IndiceEspacial y lo que queda fuera de la vista se oculta; las etiquetas se
+    ocultan también cuando la escala es menor que escala_min_etiquetas.
+
+    imagenes es { tipo: PhotoImage } ("router", "switch", "pc", "vm");
+    lineas_dict y line_colors son los diccionarios de la GUI: el primero se rellena
+    con { nombre de línea: id } y del segundo se toma el color inicial.
+    """
+
+    def __init__(self, lienzo, topologia, imagenes, lineas_dict, line_colors, fuente,
+                 margen=0.8, espera_ms=50, zoom_min=0.2, zoom_max=20.0, escala_min_etiquetas=0.5):
+        self.lienzo = lienzo
+        self.topologia = topologia
+        self.imagenes = imagenes
+        self.lineas_dict = lineas_dict
+        self.line_colors = line_colors
+        self.fuente = fuente
+        self.margen = margen
+        self.espera_ms = espera_ms
+        self.zoom_min = zoom_min
+        self.zoom_max = zoom_max
+        self.escala_min_etiquetas = escala_min_etiquetas
+
+        self.escala = 1.0        # Escala total (ajuste a la ventana x zoom)
+        self.zoom = 1.0
+        self.desplazamiento = (0.0, 0.0)  # Desplazamiento del usuario, en píxeles
+        self._escala_ajuste = 1.0
+        self._origen = (0.0, 0.0)         # pantalla = orig * escala + origen
+        self._tamano = (0, 0)
+        self._limites = self.calcular_limites()
+        min_x, min_y, max_x, max_y = self._limites
+        self._media_icono = max(max(img.width(), img.height()) for img in imagenes.values()) / 2
+
+        # Celdas de unas pocas veces la separación media entre dispositivos
+        area = max((max_x - min_x) * (max_y - min_y), 1.0)
+        self.indice = IndiceEspacial(max(2 * math.sqrt(area / max(len(topologia), 1)), 1.0))
+        self._dispositivos = list(topologia)
+        for device in self._dispositivos:
+            self.indice.insertar(device.indice, device.orig_x, device.orig_y)
+
+        self._items_dispositivos = []  # [(id_imagen, etiqueta)] por indice de dispositivo
+        self._items_enlaces = []       # [(id_linea, etiqueta o None)] en el orden de topologia.enlaces
+        self._visibles = set()         # Índices de dispositivos mostrados
+        self._enlaces_visibles = set() # Posiciones en topologia.enlaces de las líneas mostradas
+        self._con_etiquetas = False    # Si las etiquetas se están mostrando
+        self._pendiente = None         # after() del reescalado agrupado
+        self._arrastre = None          # (x, y, movido) mientras se arrastra con el botón 1
+        self._tooltip = None           # (id_texto, id_fondo) del tooltip
+        self._tooltip_de = None
+
+    def imagen(self, device):
+        return self.imagenes.get(device.tipo, self.imagenes["router"])
+
+    def calcular_limites(self):
+        """
+        Bounding box (min_x, min_y, max_x, max_y) de la topología, contando el tamaño de los iconos.
+        """
+        min_x = min_y = float("inf")
+        max_x = max_y = float("-inf")
+        for device in self.topologia:
+            img = self.imagen(device)
+            w_img, h_img = img.width(), img.height()
+            min_x = min(min_x, device.orig_x - w_img // 2)
+            max_x = max(max_x, device.orig_x + w_img // 2)
+            min_y = min(min_y, device.orig_y - h_img // 2)
+            max_y = max(max_y, device.orig_y + h_img // 2)
+        return min_x, min_y, max_x, max_y
+
+    # --- Creación (una sola vez) ---
+
+    def _crear_etiqueta(self, texto):
+        """
+        Crea un texto con fondo blanco, oculto. Devuelve (id_texto, id_fondo, ancho, alto);
+        el tamaño se mide una vez y sirve para recolocar el fondo sin volver a pedir el bbox.
+        """
+        text_id = self.lienzo.create_text(0, 0, text=texto, font=self.fuente, fill="black", tags=f"text_{texto}")
+        x1, y1, x2, y2 = self.lienzo.bbox(text_id)
+        rect_id = self.lienzo.create_rectangle(x1 - PADDING_TEXTO, y1 - PADDING_TEXTO,
+                                               x2 + PADDING_TEXTO, y2 + PADDING_TEXTO,
+                                               fill="white", outline="", state="hidden")
+        self.lienzo.itemconfig(text_id, state="hidden")
+        self.lienzo.tag_lower(rect_id, text_id)
+        return text_id, rect_id, x2 - x1, y2 - y1
+
+    def construir(self, ancho, alto):
+        """
+        Crea líneas, iconos y etiquetas (ocultos) y muestra los visibles para un canvas de ancho x alto.
+        """
+        self.lienzo.delete("all")
+        self.lineas_dict.clear()
+        self._items_enlaces = []
+        for enlace in self.topologia.enlaces:
+            color = self.line_colors.get(enlace.linea, "black")
+            lid = self.lienzo.create_line(0, 0, 0, 0, fill=color, width=5, state="hidden")
+            self.lineas_dict[enlace.linea] = lid
+            self._items_enlaces.append((lid, self._crear_etiqueta(enlace.red) if enlace.red else None))
+
+        self._items_dispositivos = []
+        for device in self._dispositivos:
+            img_id = self.lienzo.create_image(0, 0, image=self.imagen(device), anchor="center",
+                                              tags=device.nombre, state="hidden")
+            self._items_dispositivos.append((img_id, self._crear_etiqueta(device.nombre)))
+
+        self._visibles = set()
+        self._enlaces_visibles = set()
+        self._con_etiquetas = False
+        self._tooltip = None
+        print(f"Topología dibujada: {len(self.topologia)} dispositivos, {len(self._items_enlaces)} enlaces.")
+        self.reescalar(ancho, alto)
+
+    # --- Vista: escala, zoom y desplazamiento ---
+
+    def programar_reescalado(self, ancho, alto):
+        """
+        Agrupa los <Configure> seguidos: solo se reescala cuando el tamaño deja
+        de cambiar durante espera_ms.
+        """
+        if self._pendiente is not None:
+            self.lienzo.after_cancel(self._pendiente)
+        self._pendiente = self.lienzo.after(self.espera_ms, self._reescalar_pendiente, ancho, alto)
+
+    def _reescalar_pendiente(self, ancho, alto):
+        self._pendiente = None
+        self.reescalar(ancho, alto)
+
+    def reescalar(self, ancho, alto):
+        """
+        Ajusta la topología al tamaño del canvas (conservando zoom y desplazamiento).
+        """
+        if (ancho, alto) == self._tamano or not self._items_dispositivos:
+            return
+        min_x, min_y, max_x, max_y = self._limites
+        topo_width = max_x - min_x
+        topo_height = max_y - min_y
+        if topo_width <= 0 or topo_height <= 0:
+            return
+        self._tamano = (ancho, alto)
+        self._escala_ajuste = min((ancho * self.margen) / topo_width, (alto * self.margen) / topo_height)
+        self._aplicar_vista()
+
+    def a_pantalla(self, x, y):
+        return x * self.escala + self._origen[0], y * self.escala + self._origen[1]
+
+    def a_topologia(self, x, y):
+        return (x - self._origen[0]) / self.escala, (y - self._origen[1]) / self.escala
+
+    def hacer_zoom(self, x, y, factor):
+        """
+        Multiplica el zoom por factor manteniendo fijo el punto (x, y) del canvas.
+        """
+        zoom = min(max(self.zoom * factor, self.zoom_min), self.zoom_max)
+        if zoom == self.zoom:
+            return
+        tx, ty = self.a_topologia(x, y)
+        self.zoom = zoom
+        self._calcular_origen()
+        # Corregir el desplazamiento para que (tx, ty) siga bajo el cursor
+        nx, ny = self.a_pantalla(tx, ty)
+        dx, dy = self.desplazamiento
+        self.desplazamiento = (dx + x - nx, dy + y - ny)
+        self._aplicar_vista()
+
+    def desplazar(self, dx, dy):
+        self.desplazamiento = (self.desplazamiento[0] + dx, self.desplazamiento[1] + dy)
+        self._aplicar_vista()
+
+    def restablecer_vista(self):
+        """
+        Vuelve a la vista ajustada a la ventana, sin zoom ni desplazamiento.
+        """
+        self.zoom = 1.0
+        self.desplazamiento = (0.0, 0.0)
+        self._aplicar_vista()
+
+    def _calcular_origen(self):
+        ancho, alto = self._tamano
+        min_x, min_y, max_x, max_y = self._limites
+        self.escala = self._escala_ajuste * self.zoom
+        cx_topo = (min_x + max_x) / 2
+        cy_topo = (min_y + max_y) / 2
+        self._origen = (ancho // 2 - cx_topo * self.escala + self.desplazamiento[0],
+                        alto // 2 - cy_topo * self.escala + self.desplazamiento[1])
+
+    def _mostrar_etiqueta(self, etiqueta, x, y, ya_visible):
+        text_id, rect_id, w, h = etiqueta
+        self.lienzo.coords(text_id, x, y)
+        self.lienzo.coords(rect_id,
+                           x - w / 2 - PADDING_TEXTO, y - h / 2 - PADDING_TEXTO,
+                           x + w / 2 + PADDING_TEXTO, y + h / 2 + PADDING_TEXTO)
+        if not ya_visible:
+            self.lienzo.itemconfig(text_id, state="normal")
+            self.lienzo.itemconfig(rect_id, state="normal")
+
+    def _ocultar_etiqueta(self, etiqueta):
+        self.lienzo.itemconfig(etiqueta[0], state="hidden")
+        self.lienzo.itemconfig(etiqueta[1], state="hidden")
+
+    def _aplicar_vista(self):
+        """
+        Recoloca lo visible y oculta lo que salió de la vista.
+        """
+        if not self._tamano[0]:
+            return
+        self._calcular_origen()
+        escala = self.escala
+        ox, oy = self._origen
+        for device in self._dispositivos:
+            device.actual_x = device.orig_x * escala + ox
+            device.actual_y = device.orig_y * escala + oy
+
+        ancho, alto = self._tamano
+        borde = self._media_icono + DESPLAZAMIENTO_NOMBRE
+        x1, y1 = self.a_topologia(-borde, -borde)
+        x2, y2 = self.a_topologia(ancho + borde, alto + borde)
+        visibles = set(self.indice.consultar(x1, y1, x2, y2))
+        con_etiquetas = escala >= self.escala_min_etiquetas
+
+        for i in self._visibles - visibles:
+            img_id, etiqueta = self._items_dispositivos[i]
+            self.lienzo.itemconfig(img_id, state="hidden")
+            if self._con_etiquetas:
+                self._ocultar_etiqueta(etiqueta)
+        for i in visibles:
+            device = self._dispositivos[i]
+            img_id, etiqueta = self._items_dispositivos[i]
+            ya_visible = i in self._visibles
+            self.lienzo.coords(img_id, device.actual_x, device.actual_y)
+            if not ya_visible:
+                self.lienzo.itemconfig(img_id, state="normal")
+            if con_etiquetas:
+                self._mostrar_etiqueta(etiqueta, device.actual_x, device.actual_y + DESPLAZAMIENTO_NOMBRE,
+                                       ya_visible and self._con_etiquetas)
+            elif self._con_etiquetas and ya_visible:
+                self._ocultar_etiqueta(etiqueta)
+
+        # Las líneas se descartan por su bounding box en pantalla (pueden cruzar la vista
+        # aunque ninguno de sus extremos esté dentro)
+        dispositivos = self.topologia.dispositivos
+        enlaces_visibles = set()
+        for n, (enlace, (lid, etiqueta)) in enumerate(zip(self.topologia.enlaces, self._items_enlaces)):
+            r1 = dispositivos[enlace.origen]
+            r2 = dispositivos[enlace.destino]
+            if (max(r1.actual_x, r2.actual_x) < 0 or min(r1.actual_x, r2.actual_x) > ancho
+                    or max(r1.actual_y, r2.actual_y) < 0 or min(r1.actual_y, r2.actual_y) > alto):
+                if n in self._enlaces_visibles:
+                    self.lienzo.itemconfig(lid, state="hidden")
+                    if etiqueta is not None and self._con_etiquetas:
+                        self._ocultar_etiqueta(etiqueta)
+                continue
+            enlaces_visibles.add(n)
+            ya_visible = n in self._enlaces_visibles
+            self.lienzo.coords(lid, r1.actual_x, r1.actual_y, r2.actual_x, r2.actual_y)
+            if not ya_visible:
+                self.lienzo.itemconfig(lid, state="normal")
+            if etiqueta is not None:
+                if con_etiquetas:
+                    self._mostrar_etiqueta(etiqueta, (r1.actual_x + r2.actual_x) / 2, (r1.actual_y + r2.actual_y) / 2,
+                                           ya_visible and self._con_etiquetas)
+                elif self._con_etiquetas and ya_visible:
+                    self._ocultar_etiqueta(etiqueta)
+
+        self._visibles = visibles
+        self._enlaces_visibles = enlaces_visibles
+        self._con_etiquetas = con_etiquetas
+        self.ocultar_tooltip()
+
+    # --- Consultas ---
+
+    def dispositivo_en(self, x, y):
+        """
+        Dispositivo cuyo icono contiene el punto (x, y) del canvas, o None.
+        Solo examina los dispositivos de las celdas cercanas.
+        """
+        if not self._tamano[0]:
+            return None
+        radio = self._media_icono / self.escala
+        tx, ty = self.a_topologia(x, y)
+        encontrado = None
+        for i in self.indice.consultar(tx - radio, ty - radio, tx + radio, ty + radio):
+            device = self._dispositivos[i]
+            img = self.imagen(device)
+            if (abs(x - device.actual_x) <= img.width() // 2 and abs(y - device.actual_y) <= img.height() // 2
+                    and (encontrado is None or i > encontrado.indice)):
+                encontrado = device  # El dibujado después queda encima
+        return encontrado
+
+    # --- Tooltip ---
+
+    def mostrar_tooltip(self, device, x, y):
+        if self._tooltip_de is device:
+            return
+        texto = f"{device.nombre}\n{device.ip}\n{device.tipo.capitalize()}"
+        if self._tooltip is None:
+            text_id = self.lienzo.create_text(0, 0, text="", anchor="nw", fill="white")
+            rect_id = self.lienzo.create_rectangle(0, 0, 0, 0, fill="#333333", outline="")
+            self.lienzo.tag_lower(rect_id, text_id)
+            self._tooltip = (text_id, rect_id)
+        text_id, rect_id = self._tooltip
+        self.lienzo.itemconfig(text_id, text=texto, state="normal")
+        self.lienzo.coords(text_id, x + 12, y + 12)
+        x1, y1, x2, y2 = self.lienzo.bbox(text_id)
+        self.lienzo.coords(rect_id, x1 - PADDING_TEXTO, y1 - PADDING_TEXTO, x2 + PADDING_TEXTO, y2 + PADDING_TEXTO)
+        self.lienzo.itemconfig(rect_id, state="normal")
+        self.lienzo.tag_raise(rect_id)
+        self.lienzo.tag_raise(text_id)
+        self._tooltip_de = device
+
+    def ocultar_tooltip(self):
+        if self._tooltip is not None and self._tooltip_de is not None:
+            for item in self._tooltip:
+                self.lienzo.itemconfig(item, state="hidden")
+        self._tooltip_de = None
+
+    # --- Eventos del ratón ---
+
+    def enlazar_eventos(self, al_clic):
+        """
+        Rueda: zoom; arrastrar con el botón 1: desplazar; clic sin arrastre: al_clic(event);
+        pasar por encima de un dispositivo: tooltip.
+        """
+        self.lienzo.bind("<ButtonPress-1>", self._al_pulsar)
+        self.lienzo.bind("<B1-Motion>", self._al_arrastrar)
+        self.lienzo.bind("<ButtonRelease-1>", lambda event: self._al_soltar(event, al_clic))
+        self.lienzo.bind("<Motion>", self._al_mover)
+        self.lienzo.bind("<MouseWheel>", self._al_rueda)
+        self.lienzo.bind("<Button-4>", lambda event: self.hacer_zoom(event.x, event.y, 1.2))
+        self.lienzo.bind("<Button-5>", lambda event: self.hacer_zoom(event.x, event.y, 1 / 1.2))
+
+    def _al_pulsar(self, event):
+        self._arrastre = (event.x, event.y, False)
+
+    def _al_arrastrar(self, event):
+        if self._arrastre is None:
+            return
+        x, y, movido = self._arrastre
+        if not movido and abs(event.x - x) + abs(event.y - y) < UMBRAL_ARRASTRE:
+            return
+        self._arrastre = (event.x, event.y, True)
+        self.desplazar(event.x - x, event.y - y)
+
+    def _al_soltar(self, event, al_clic):
+        arrastre, self._arrastre = self._arrastre, None
+        if arrastre is None or not arrastre[2]:
+            al_clic(event)
+
+    def _al_mover(self, event):
+        device = self.dispositivo_en(event.x, event.y)
+        if device is None:
+            self.ocultar_tooltip()
+        else:
+            self.mostrar_tooltip(device, event.x, event.y)
+
+    def _al_rueda(self, event):
+        self.hacer_zoom(event.x, event.y, 1.2 if event.delta > 0 else 1 / 1.2)
@@ -0,0 +1,319 @@
+import asyncio
+import socket
+import time
+
+from metricas import COMANDO, CONEXION, LOGIN, metricas, nombre_comando
+from sesiones_telnet import ResultadosTelnet, bucle_telnet
+
+PUERTO_SSH = 22
+
+# Bytes que se leen de un canal de una vez
+TAMANO_LECTURA = 65536
+
+
+def _asyncssh():
+    try:
+        import asyncssh
+    except ImportError:
+        raise RuntimeError("Para usar SSH hace falta asyncssh (pip install asyncssh).")
+    return asyncssh
+
+
+def _texto(datos):
+    return datos.decode("utf-8", "replace").replace("\r\n", "\n").replace("\r", "")
+
+# ==================
+#   Conexiones SSH
+# ==================
+
+class ConexionSSH:
+    """
+    Conexión SSH autenticada contra un router. Cada comando se ejecuta en su propio
+    canal exec (sin prompt, eco ni paginación: la salida termina cuando el router
+    cierra el canal), así varios comandos pueden ir a la vez por la misma conexión.
+    """
+
+    def __init__(self, ip, username, password, puerto=PUERTO_SSH, timeout=10, timeout_comando=30,
+                 conocidos=None):
+        self.ip = ip
+        self.username = username
+        self.password = password
+        self.puerto = puerto
+        self.timeout = timeout
+        self.timeout_comando = timeout_comando
+        self.conocidos = conocidos
+        self.conexion = None
+        self.en_curso = 0  # Canales abiertos ahora mismo
+        self.ultimo_uso = 0.0
+
+    async def abrir(self):
+        """
+        Conecta por TCP y negocia la conexión SSH con usuario y contraseña
+        (password o keyboard-interactive, sin claves ni agente del equipo local).
+        """
+        asyncssh = _asyncssh()
+        loop = asyncio.get_running_loop()
+        familia, tipo, proto, _, direccion = (await loop.getaddrinfo(self.ip, self.puerto,
+                                                                     type=socket.SOCK_STREAM))[0]
+        sock = socket.socket(familia, tipo, proto)
+        sock.setblocking(False)
+        try:
+            with metricas.medir(CONEXION, self.ip, "ssh"):
+                await asyncio.wait_for(loop.sock_connect(sock, direccion), self.timeout)
+        except BaseException:
+            sock.close()
+            raise
+        inicio = time.perf_counter()
+        try:
+            self.conexion = await asyncio.wait_for(asyncssh.connect(
+                self.ip, self.puerto, sock=sock, username=self.username, password=self.password,
+                known_hosts=self.conocidos, client_keys=None, agent_path=None,
+                preferred_auth=("password", "keyboard-interactive"),
+            ), self.timeout)
+        except BaseException:
+            metricas.error(LOGIN, self.ip)
+            sock.close()
+            raise
+        metricas.observar(LOGIN, time.perf_counter() - inicio, self.ip)
+        self.ultimo_uso = time.monotonic()
+
+    def cerrada(self):
+        return self.conexion is None or self.conexion.is_closed()
+
+    async def ejecutar_en_fragmentos(self, cmd, al_texto):
+        """
+        Ejecuta un comando en un canal nuevo y entrega su salida a al_texto(texto) por
+        líneas completas a medida que llega. Devuelve (completo, segundos); completo es
+        False si venció timeout_comando (el canal se cierra y la conexión sigue sirviendo).
+        """
+        asyncssh = _asyncssh()
+        self.en_curso += 1
+        self.ultimo_uso = time.monotonic()
+        inicio = time.perf_counter()
+        limite = time.monotonic() + self.timeout_comando
+        pendiente = b""
+        completo = False
+        try:
+            proceso = await asyncio.wait_for(
+                self.conexion.create_process(cmd, encoding=None, stderr=asyncssh.STDOUT), self.timeout)
+            try:
+                while True:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    try:
+                        datos = await asyncio.wait_for(proceso.stdout.read(TAMANO_LECTURA), restante)
+                    except asyncio.TimeoutError:
+                        break
+                    if not datos:
+                        completo = True
+                        break
+                    pendiente += datos
+                    # Hasta el último salto de línea: así no se parte una línea (ni un carácter UTF-8)
+                    corte = pendiente.rfind(b"\n") + 1
+                    if corte:
+                        al_texto(_texto(pendiente[:corte]))
+                        pendiente = pendiente[corte:]
+            finally:
+                proceso.close()
+            if pendiente:
+                al_texto(_texto(pendiente))
+        except BaseException:
+            metricas.error(COMANDO, self.ip, nombre_comando(cmd))
+            raise
+        finally:
+            self.en_curso -= 1
+            self.ultimo_uso = time.monotonic()
+        duracion = time.perf_counter() - inicio
+        if completo:
+            metricas.observar(COMANDO, duracion, self.ip, nombre_comando(cmd))
+        else:
+            metricas.error(COMANDO, self.ip, nombre_comando(cmd))
+        return completo, duracion
+
+    async def cerrar(self):
+        """
+        Cierra la conexión (y los canales que queden) ignorando errores.
+        """
+        if self.conexion is None:
+            return
+        conexion, self.conexion = self.conexion, None
+        try:
+            conexion.close()
+            await asyncio.wait_for(conexion.wait_closed(), 5)
+        except Exception:
+            pass
+
+# ==================
+#   Pool de conexiones
+# ==================
+
+class PoolConexionesSSH:
+    """
+    Alternativa a PoolSesionesTelnet con la misma interfaz: mantiene una sola conexión
+    SSH autenticada por router y ejecuta cada comando en su propio canal exec sobre
+    ella, así los comandos de una recolección van a la vez con un solo login y una
+    sola línea VTY por router, y sin enviar la contraseña en claro.
+
+    - max_canales: canales simultáneos por router (los demás comandos esperan turno;
+      con 1 los comandos van de uno en uno sobre la misma conexión).
+    - max_inactividad: segundos tras los cuales una conexión sin canales se descarta
+      (debe ser menor que el exec-timeout del router).
+    - timeout / timeout_comando: segundos para conectar (y abrir cada canal) y para cada comando.
+    - conocidos: fichero known_hosts con las claves de los routers; sin él (None) no se
+      comprueba la clave del router.
+
+    El puerto de cada router es su "puerto_ssh" (22 si no lo indica).
+    Necesita asyncssh, que solo se importa al abrir la primera conexión.
+    """
+
+    nombre = "SSH"
+
+    def __init__(self, max_canales=6, max_inactividad=240, espera_cupo=30, timeout=10, timeout_comando=30,
+                 conocidos=None, bucle=bucle_telnet):
+        self.max_canales = max_canales
+        self.max_inactividad = max_inactividad
+        self.espera_cupo = espera_cupo
+        self.timeout = timeout
+        self.timeout_comando = timeout_comando
+        self.conocidos = conocidos
+        self.bucle = bucle
+        self._conexiones = {}  # { (ip, puerto, username): ConexionSSH }
+        self._abriendo = {}    # { (ip, puerto, username): asyncio.Task } del login en curso
+        self._cupos = {}       # { (ip, puerto, username): asyncio.Semaphore } de canales
+
+    def puerto_de(self, router):
+        return router.get("puerto_ssh") or PUERTO_SSH
+
+    def _cupo(self, clave):
+        cupo = self._cupos.get(clave)
+        if cupo is None:
+            cupo = asyncio.Semaphore(self.max_canales)
+            self._cupos[clave] = cupo
+        return cupo
+
+    async def _conexion(self, ip, username, password, puerto):
+        """
+        Devuelve la conexión del router, abriéndola si no hay o si se cayó o caducó.
+        Las peticiones que llegan mientras se abre esperan a ese mismo login (y, si
+        falla, fallan con él en lugar de intentar otro).
+        """
+        clave = (ip, puerto, username)
+        conexion = self._conexiones.get(clave)
+        if conexion is not None and (conexion.cerrada() or (
+                not conexion.en_curso and time.monotonic() - conexion.ultimo_uso > self.max_inactividad)):
+            del self._conexiones[clave]
+            await conexion.cerrar()
+            conexion = self._conexiones.get(clave)
+        if conexion is not None:
+            return conexion
+        tarea = self._abriendo.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(self._abrir(clave, ip, username, password, puerto))
+            self._abriendo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._fin_apertura(clave, t))
+        return await asyncio.shield(tarea)
+
+    async def _abrir(self, clave, ip, username, password, puerto):
+        conexion = ConexionSSH(ip, username, password, puerto, self.timeout, self.timeout_comando, self.conocidos)
+        await conexion.abrir()
+        self._conexiones[clave] = conexion
+        return conexion
+
+    def _fin_apertura(self, clave, tarea):
+        self._abriendo.pop(clave, None)
+        if not tarea.cancelled():
+            tarea.exception()  # Ya la recibieron quienes esperaban; así no se avisa de que nadie la leyó
+
+    async def _descartar(self, clave, conexion):
+        if self._conexiones.get(clave) is conexion:
+            del self._conexiones[clave]
+        await conexion.cerrar()
+
+    async def ejecutar_en_fragmentos_asincrono(self, ip, username, password, cmd, al_texto, puerto=PUERTO_SSH):
+        """
+        Ejecuta un comando en un canal de la conexión del router entregando la salida a
+        al_texto(texto) a medida que llega. Devuelve (completo, segundos).
+        Si la conexión reutilizada se cayó antes de entregar nada, se reintenta una vez con una nueva.
+        """
+        asyncssh = _asyncssh()
+        clave = (ip, puerto, username)
+        entregado = False
+
+        def _al_texto(texto):
+            nonlocal entregado
+            entregado = True
+            al_texto(texto)
+
+        cupo = self._cupo(clave)
+        try:
+            await asyncio.wait_for(cupo.acquire(), self.espera_cupo)
+        except asyncio.TimeoutError:
+            raise Exception(f"No hay canales SSH disponibles para {ip}.")
+        try:
+            for intento in range(2):
+                conexion = await self._conexion(ip, username, password, puerto)
+                try:
+                    return await conexion.ejecutar_en_fragmentos(cmd, _al_texto)
+                except (OSError, asyncssh.Error):
+                    await self._descartar(clave, conexion)
+                    if intento == 1 or entregado:
+                        raise
+                    print(f"Conexión SSH a {ip} caída, se reconectará.")
+        finally:
+            cupo.release()
+
+    async def ejecutar_asincrono(self, ip, username, password, comandos, canalizado=True, puerto=PUERTO_SSH):
+        """
+        Ejecuta los comandos { clave: comando } y devuelve { clave: salida }
+        (ResultadosTelnet, con el tiempo de cada comando en .tiempos).
+        Con canalizado=True cada comando va en su canal y todos a la vez (hasta
+        max_canales); si no, de uno en uno. Un comando que vence queda con la salida
+        que llegó hasta entonces.
+        La conexión se abre antes de repartir los comandos: si el router no deja entrar,
+        falla una vez en lugar de un intento de login por comando.
+        """
+        await self._conexion(ip, username, password, puerto)
+
+        async def _uno(cmd):
+            partes = []
+            completo, segundos = await self.ejecutar_en_fragmentos_asincrono(
+                ip, username, password, cmd, partes.append, puerto)
+            return "".join(partes), segundos
+
+        if canalizado:
+            salidas = await asyncio.gather(*(_uno(cmd) for cmd in comandos.values()))
+        else:
+            salidas = [await _uno(cmd) for cmd in comandos.values()]
+        resultados = ResultadosTelnet()
+        for cmd_key, (salida, segundos) in zip(comandos, salidas):
+            resultados[cmd_key] = salida
+            resultados.tiempos[cmd_key] = segundos
+        return resultados
+
+    async def cerrar_todo_asincrono(self):
+        """
+        Cierra todas las conexiones del pool.
+        """
+        conexiones = list(self._conexiones.values())
+        self._conexiones.clear()
+        for conexion in conexiones:
+            await conexion.cerrar()
+
+    def ejecutar(self, ip, username, password, comandos, canalizado=True, puerto=PUERTO_SSH):
+        """
+        Versión síncrona de ejecutar_asincrono para los hilos de la GUI.
+        """
+        return self.bucle.ejecutar(self.ejecutar_asincrono(ip, username, password, comandos, canalizado, puerto))
+
+    def cerrar_todo(self):
+        """
+        Versión síncrona de cerrar_todo_asincrono.
+        """
+        if not self._conexiones:
+            return
+        self.bucle.ejecutar(self.cerrar_todo_asincrono(), timeout=10)
+
+
+# Pool compartido cuando los routers se consultan por SSH
+pool_ssh = PoolConexionesSSH()
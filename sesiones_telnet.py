@@ -0,0 +1,481 @@
+import asyncio
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from cliente_telnet import ClienteTelnet
+from metricas import COMANDO, CONEXION, LOGIN, metricas, nombre_comando
+
+# ==================
+#   Bucle asyncio de fondo
+# ==================
+
+class BucleFondo:
+    """
+    Bucle asyncio persistente que corre en un hilo daemon.
+    Todas las sesiones Telnet viven en este bucle, así el pool sobrevive entre
+    monitoreos y los hilos de la GUI pueden usarlo de forma síncrona.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._hilo = None
+
+    def loop(self):
+        """
+        Devuelve el bucle, arrancándolo la primera vez.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._hilo = threading.Thread(target=self._loop.run_forever, name="bucle-telnet", daemon=True)
+                self._hilo.start()
+            return self._loop
+
+    def ejecutar(self, coro, timeout=None):
+        """
+        Ejecuta la corrutina en el bucle de fondo y espera su resultado desde otro hilo.
+        """
+        loop = self.loop()
+        if threading.current_thread() is self._hilo:
+            coro.close()
+            raise RuntimeError("No se puede esperar de forma síncrona desde el propio bucle de fondo.")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+bucle_telnet = BucleFondo()
+
+# Prompt de IOS al final de la salida: "R1>", "R1#" o "R1(config)#"
+PROMPT_GENERICO = re.compile(rb"[\r\n]([\w.\-/]+)(?:\([\w.\-]*\))?[>#] ?$")
+
+# Marcador de paginación y los retrocesos con que IOS lo borra tras pulsar espacio
+MARCA_MAS = re.compile(rb" ?--More-- ?")
+BORRADO_MAS = re.compile(rb"\x08+ *\x08*")
+
+
+def compilar_prompt(hostname, siguiente=None):
+    """
+    Regex del prompt de un router concreto, aprendida en el login.
+    Sin siguiente, el prompt debe ser lo último recibido; con siguiente (modo canalizado),
+    debe ir seguido del eco de ese comando.
+    """
+    fin = rb" ?$" if siguiente is None else rb"(?= ?" + re.escape(siguiente) + rb")"
+    return re.compile(rb"[\r\n]" + re.escape(hostname) + rb"(?:\([\w.\-]*\))?[>#]" + fin)
+
+# ==================
+#   Sesiones Telnet
+# ==================
+
+class ResultadosTelnet(dict):
+    """
+    Diccionario { clave: salida } que además guarda en .tiempos { clave: segundos }
+    lo que tardó cada comando.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tiempos = {}
+
+
+class SesionTelnet:
+    """
+    Sesión Telnet autenticada contra un router.
+    Se abre una sola vez y se reutiliza para varios comandos.
+    """
+
+    def __init__(self, ip, username, password, puerto=23, timeout=10, timeout_comando=30):
+        self.ip = ip
+        self.username = username
+        self.password = password
+        self.puerto = puerto
+        self.timeout = timeout
+        self.timeout_comando = timeout_comando
+        self.cliente = None
+        self.hostname = None
+        self.hostname_bytes = None
+        self.prompt = PROMPT_GENERICO
+        self.desincronizada = False  # Quedó salida pendiente de un comando que venció
+        self.reutilizada = False     # Salió de las libres del pool (no se acaba de abrir)
+        self.ultimo_uso = 0.0
+
+    async def abrir(self):
+        """
+        Abre la conexión, realiza el login (Username/Password), aprende el prompt
+        del router y desactiva la paginación para la sesión.
+        """
+        cliente = ClienteTelnet()
+        with metricas.medir(CONEXION, self.ip, "telnet"):
+            await cliente.conectar(self.ip, self.puerto, timeout=self.timeout)
+        inicio = time.perf_counter()
+        try:
+            # Si el router acepta la conexión pero no pide usuario, se falla ya, no tras los tres pasos
+            index, obj, output = await cliente.esperar([b"Username:"], timeout=5)
+            if index == -1:
+                raise Exception("El router no pidió el usuario (Username:).")
+            cliente.escribir(self.username.encode("utf-8") + b"\n")
+            index, obj, output = await cliente.esperar([b"Password:"], timeout=5)
+            if index == -1:
+                raise Exception("El router no pidió la contraseña (Password:).")
+            cliente.escribir(self.password.encode("utf-8") + b"\n")
+
+            index, obj, output = await cliente.esperar([PROMPT_GENERICO, b"% Login invalid"], timeout=5)
+            if index == 1:
+                raise Exception("Usuario o contraseña incorrectos.")
+            if index == -1:
+                raise Exception("No se encontró el prompt del router.")
+            self.hostname = obj.group(1).decode("utf-8", "replace")
+            self.hostname_bytes = obj.group(1)
+            self.prompt = compilar_prompt(self.hostname_bytes)
+
+            # Sin paginación cada comando termina en el prompt, sin --More--
+            cliente.escribir(b"terminal length 0\n")
+            index, obj, output = await cliente.esperar([self.prompt], timeout=5)
+            if index == -1:
+                raise Exception("El router no respondió a 'terminal length 0'.")
+        except BaseException:
+            metricas.error(LOGIN, self.ip)
+            await cliente.cerrar()
+            raise
+        metricas.observar(LOGIN, time.perf_counter() - inicio, self.ip)
+        self.cliente = cliente
+        self.ultimo_uso = time.monotonic()
+
+    async def esta_viva(self):
+        """
+        Comprueba que la sesión sigue abierta enviando una línea vacía y esperando el prompt.
+        """
+        if self.cliente is None or self.cliente.eof or self.desincronizada:
+            return False
+        try:
+            self.cliente.leer_disponible()  # Descartar salida pendiente
+            self.cliente.escribir(b"\n")
+            index, obj, output = await self.cliente.esperar([self.prompt], timeout=2)
+            return index != -1
+        except (EOFError, OSError):
+            return False
+
+    async def ejecutar(self, cmd):
+        """
+        Envía un comando y devuelve (salida, segundos) en cuanto vuelve el prompt.
+        """
+        inicio = time.perf_counter()
+        self.cliente.escribir(cmd.encode("utf-8") + b"\n")
+        datos, completo = await leer_comando_telnet(self.cliente, self.prompt, self.timeout_comando)
+        duracion = time.perf_counter() - inicio
+        if not completo:
+            # El resto de la salida llegaría mezclado con el siguiente comando
+            self.desincronizada = True
+            metricas.error(COMANDO, self.ip, nombre_comando(cmd))
+        else:
+            metricas.observar(COMANDO, duracion, self.ip, nombre_comando(cmd))
+        self.ultimo_uso = time.monotonic()
+        return limpiar_salida(datos, cmd), duracion
+
+    async def ejecutar_en_fragmentos(self, cmd, al_texto):
+        """
+        Envía un comando y entrega su salida limpia a al_texto(texto) por líneas completas
+        a medida que llega, sin esperar al prompt. Devuelve (completo, segundos).
+        """
+        inicio = time.perf_counter()
+        eco = []  # Texto recibido hasta completar la primera línea (el eco del comando)
+        con_eco = True
+
+        def al_fragmento(datos):
+            nonlocal con_eco
+            texto = BORRADO_MAS.sub(b"", datos).decode("utf-8", "replace").replace("\r\n", "\n").replace("\r", "")
+            if con_eco:
+                eco.append(texto)
+                if "\n" not in texto:
+                    return
+                con_eco = False
+                linea, salto, resto = "".join(eco).partition("\n")
+                texto = resto if linea.strip() == cmd.strip() else linea + salto + resto
+            if texto:
+                al_texto(texto)
+
+        self.cliente.escribir(cmd.encode("utf-8") + b"\n")
+        completo = await leer_comando_en_fragmentos(self.cliente, self.prompt, self.timeout_comando, al_fragmento)
+        duracion = time.perf_counter() - inicio
+        if completo:
+            metricas.observar(COMANDO, duracion, self.ip, nombre_comando(cmd))
+        else:
+            metricas.error(COMANDO, self.ip, nombre_comando(cmd))
+            self.desincronizada = True
+        self.ultimo_uso = time.monotonic()
+        return completo, duracion
+
+    async def ejecutar_lote(self, comandos):
+        """
+        Modo canalizado: envía todos los comandos { clave: comando } de una vez y separa
+        la salida de cada uno por el prompt seguido del eco del comando siguiente.
+        Devuelve ResultadosTelnet; el tiempo de cada comando es lo que tardó en llegar
+        su salida desde el final de la anterior.
+        Requiere la paginación desactivada (un --More-- se comería los comandos en cola).
+        """
+        pendientes = list(comandos.items())
+        resultados = ResultadosTelnet()
+        limite = time.monotonic() + self.timeout_comando * len(pendientes)
+        anterior = time.perf_counter()
+        self.cliente.escribir(b"".join(cmd.encode("utf-8") + b"\n" for cmd_key, cmd in pendientes))
+        for i, (cmd_key, cmd) in enumerate(pendientes):
+            siguiente = pendientes[i + 1][1].encode("utf-8") if i + 1 < len(pendientes) else None
+            fin = compilar_prompt(self.hostname_bytes, siguiente) if self.hostname_bytes else self.prompt
+            restante = max(limite - time.monotonic(), 0)
+            datos, completo = await leer_comando_telnet(self.cliente, fin, restante)
+            ahora = time.perf_counter()
+            resultados[cmd_key] = limpiar_salida(datos, cmd)
+            resultados.tiempos[cmd_key] = ahora - anterior
+            anterior = ahora
+            if completo:
+                metricas.observar(COMANDO, resultados.tiempos[cmd_key], self.ip, nombre_comando(cmd))
+            else:
+                metricas.error(COMANDO, self.ip, nombre_comando(cmd))
+                self.desincronizada = True
+                for cmd_key_restante, cmd_restante in pendientes[i + 1:]:
+                    resultados[cmd_key_restante] = ""
+                break
+        self.ultimo_uso = time.monotonic()
+        return resultados
+
+    async def cerrar(self):
+        """
+        Cierra la sesión ignorando errores (la conexión puede estar ya caída).
+        """
+        if self.cliente is None:
+            return
+        try:
+            self.cliente.escribir(b"exit\n")
+        except Exception:
+            pass
+        await self.cliente.cerrar()
+        self.cliente = None
+
+
+async def leer_comando_telnet(cliente, prompt, timeout):
+    """
+    Lee la salida de un comando hasta que vuelve el prompt.
+    Si el router sigue paginando, responde a cada --More-- sobre la marcha.
+    Devuelve (datos, completo); completo es False si venció el timeout.
+    """
+    partes = []
+    limite = time.monotonic() + timeout
+    while True:
+        restante = max(limite - time.monotonic(), 0)
+        index, obj, datos = await cliente.esperar([prompt, MARCA_MAS], timeout=restante)
+        if index == -1:
+            partes.append(datos)
+            return b"".join(partes), False
+        partes.append(datos[:obj.start()])
+        if index == 0:
+            return b"".join(partes), True
+        cliente.escribir(b" ")  # Enviar espacio para continuar
+
+
+async def leer_comando_en_fragmentos(cliente, prompt, timeout, al_fragmento, intervalo=0.1):
+    """
+    Como leer_comando_telnet, pero en lugar de acumular la salida la entrega a
+    al_fragmento(datos) cada intervalo segundos, solo hasta el último salto de línea:
+    desde ahí vuelve al buffer por si es el comienzo del prompt.
+    Devuelve True si llegó el prompt y False si venció el timeout.
+    """
+    limite = time.monotonic() + timeout
+    while True:
+        restante = max(limite - time.monotonic(), 0)
+        index, obj, datos = await cliente.esperar([prompt, MARCA_MAS], timeout=min(intervalo, restante))
+        if index == -1:
+            # El último salto de línea se queda en el buffer: el prompt se busca como "\nR1#"
+            corte = datos.rfind(b"\n")
+            if corte > 0:
+                al_fragmento(datos[:corte])
+            cliente.devolver(datos[max(corte, 0):])
+            if time.monotonic() >= limite:
+                return False
+            continue
+        if obj.start():
+            al_fragmento(datos[:obj.start()])
+        if index == 0:
+            return True
+        cliente.escribir(b" ")  # Enviar espacio para continuar
+
+
+def limpiar_salida(datos, cmd):
+    """
+    Decodifica la salida, quita los restos de paginación y el eco del comando.
+    """
+    texto = BORRADO_MAS.sub(b"", datos).decode("utf-8", "replace")
+    texto = texto.replace("\r\n", "\n").replace("\r", "")
+    primera, salto, resto = texto.partition("\n")
+    if primera.strip() == cmd.strip():
+        texto = resto
+    return texto
+
+# ==================
+#   Pool de sesiones
+# ==================
+
+class PoolSesionesTelnet:
+    """
+    Mantiene sesiones Telnet autenticadas por router para no repetir el login en cada
+    monitoreo, ping o ventana emergente.
+
+    - max_por_router: sesiones simultáneas permitidas por router (no agotar las líneas VTY).
+    - max_inactividad: segundos tras los cuales una sesión libre se descarta
+      (debe ser menor que el exec-timeout del router).
+    - verificar_tras: segundos de inactividad a partir de los cuales se comprueba
+      la sesión antes de reutilizarla.
+    - timeout / timeout_comando: segundos para conectar y para cada comando de las
+      sesiones nuevas (un comando que vence se da por incompleto).
+
+    Las sesiones viven en el bucle de fondo: las corrutinas (*_asincrono) se usan desde
+    el motor de sondeo y los métodos síncronos desde los hilos de la GUI.
+    El puerto de cada router es su "puerto" (23 si no lo indica).
+    """
+
+    nombre = "Telnet"
+
+    def __init__(self, max_por_router=2, max_inactividad=240, verificar_tras=5, espera_cupo=30,
+                 timeout=10, timeout_comando=30, bucle=bucle_telnet):
+        self.max_por_router = max_por_router
+        self.max_inactividad = max_inactividad
+        self.verificar_tras = verificar_tras
+        self.espera_cupo = espera_cupo
+        self.timeout = timeout
+        self.timeout_comando = timeout_comando
+        self.bucle = bucle
+        self._libres = {}  # { (ip, puerto, username): [SesionTelnet, ...] }
+        self._cupos = {}   # { (ip, puerto, username): asyncio.Semaphore }
+
+    def puerto_de(self, router):
+        return router.get("puerto", 23)
+
+    def _cupo(self, clave):
+        cupo = self._cupos.get(clave)
+        if cupo is None:
+            cupo = asyncio.Semaphore(self.max_por_router)
+            self._cupos[clave] = cupo
+        return cupo
+
+    async def _tomar_libre(self, clave):
+        """
+        Saca una sesión libre utilizable, descartando las caducadas o caídas.
+        """
+        libres = self._libres.get(clave)
+        while libres:
+            sesion = libres.pop()
+            inactiva = time.monotonic() - sesion.ultimo_uso
+            if inactiva > self.max_inactividad:
+                await sesion.cerrar()
+                continue
+            if inactiva > self.verificar_tras and not await sesion.esta_viva():
+                print(f"Sesión Telnet a {sesion.ip} caducada, se reconectará.")
+                await sesion.cerrar()
+                continue
+            return sesion
+        return None
+
+    @asynccontextmanager
+    async def sesion(self, ip, username, password, puerto=23):
+        """
+        Presta una sesión autenticada para el router indicado (con reutilizada=True si
+        ya estaba abierta en el pool).
+        Si ocurre un error durante su uso, la sesión se cierra en lugar de devolverse al pool.
+        """
+        clave = (ip, puerto, username)
+        cupo = self._cupo(clave)
+        try:
+            await asyncio.wait_for(cupo.acquire(), self.espera_cupo)
+        except asyncio.TimeoutError:
+            raise Exception(f"No hay sesiones Telnet disponibles para {ip}.")
+        try:
+            sesion = await self._tomar_libre(clave)
+            if sesion is not None:
+                sesion.reutilizada = True
+            else:
+                sesion = SesionTelnet(ip, username, password, puerto, self.timeout, self.timeout_comando)
+                await sesion.abrir()
+            try:
+                yield sesion
+            except BaseException:
+                await sesion.cerrar()
+                raise
+            if sesion.desincronizada:
+                await sesion.cerrar()
+            else:
+                self._libres.setdefault(clave, []).append(sesion)
+        finally:
+            cupo.release()
+
+    async def ejecutar_asincrono(self, ip, username, password, comandos, canalizado=True, puerto=23):
+        """
+        Ejecuta los comandos { clave: comando } en una sesión del pool y devuelve
+        { clave: salida } (ResultadosTelnet, con el tiempo de cada comando en .tiempos).
+        Con canalizado=True el lote se envía de una vez (ver SesionTelnet.ejecutar_lote).
+        Si la sesión reutilizada se cayó, se reintenta una vez con una nueva (una sesión
+        nueva que falla no se reintenta: el router caído o colgado no cuesta dos timeouts).
+        """
+        for intento in range(2):
+            reutilizada = False
+            try:
+                async with self.sesion(ip, username, password, puerto) as sesion:
+                    reutilizada = sesion.reutilizada
+                    if canalizado and len(comandos) > 1:
+                        return await sesion.ejecutar_lote(comandos)
+                    resultados = ResultadosTelnet()
+                    for cmd_key, cmd in comandos.items():
+                        resultados[cmd_key], resultados.tiempos[cmd_key] = await sesion.ejecutar(cmd)
+                    return resultados
+            except (EOFError, OSError):
+                if intento == 1 or not reutilizada:
+                    raise
+
+    async def ejecutar_en_fragmentos_asincrono(self, ip, username, password, cmd, al_texto, puerto=23):
+        """
+        Ejecuta un comando en una sesión del pool entregando la salida a al_texto(texto)
+        a medida que llega (ver SesionTelnet.ejecutar_en_fragmentos). Devuelve (completo, segundos).
+        Si la sesión reutilizada se cayó antes de entregar nada, se reintenta una vez con una nueva.
+        """
+        entregado = False
+
+        def _al_texto(texto):
+            nonlocal entregado
+            entregado = True
+            al_texto(texto)
+
+        for intento in range(2):
+            reutilizada = False
+            try:
+                async with self.sesion(ip, username, password, puerto) as sesion:
+                    reutilizada = sesion.reutilizada
+                    return await sesion.ejecutar_en_fragmentos(cmd, _al_texto)
+            except (EOFError, OSError):
+                if intento == 1 or entregado or not reutilizada:
+                    raise
+
+    async def cerrar_todo_asincrono(self):
+        """
+        Cierra todas las sesiones libres del pool.
+        """
+        libres = [s for sesiones in self._libres.values() for s in sesiones]
+        self._libres.clear()
+        for sesion in libres:
+            await sesion.cerrar()
+
+    def ejecutar(self, ip, username, password, comandos, canalizado=True, puerto=23):
+        """
+        Versión síncrona de ejecutar_asincrono para los hilos de la GUI.
+        """
+        return self.bucle.ejecutar(self.ejecutar_asincrono(ip, username, password, comandos, canalizado, puerto))
+
+    def cerrar_todo(self):
+        """
+        Versión síncrona de cerrar_todo_asincrono.
+        """
+        if not self._libres:
+            return
+        self.bucle.ejecutar(self.cerrar_todo_asincrono(), timeout=10)
+
+
+# Pool compartido por el monitoreo, el ping a la VM y la ventana emergente
+pool_telnet = PoolSesionesTelnet()
@@ -0,0 +1,681 @@
+"""
+Routers Cisco IOS simulados para probar y medir el monitoreo sin equipos reales.
+
+Cada router escucha en su propia IP de loopback (127.1.0.1, 127.1.0.2, ...) y en el
+mismo puerto, así el motor de sondeo los distingue por IP como a routers reales.
+El servidor imita lo que usa el monitoreo: login Username/Password, paginación
+--More-- hasta 'terminal length 0', eco de comandos, los show que se recolectan
+y ping. Se puede ajustar la latencia de cada comando, el tamaño de las salidas y
+simular routers caídos (puerto cerrado), lentos o colgados (aceptan la conexión
+pero no responden).
+
+Con --snmp cada router tiene además un agente SNMP v2c (GET, GETNEXT y GETBULK)
+en ese puerto UDP con las mismas interfaces y rutas que muestran sus show, y con
+--ssh un servidor SSH (necesita asyncssh) que responde a los mismos comandos en
+canales exec, varios a la vez por conexión.
+
+    python simulador_ios.py --routers 100 --puerto 2323 --lentos 0.05 --caidos 0.05
+    python simulador_ios.py --routers 100 --puerto 2323 --snmp 1161
+    python simulador_ios.py --routers 100 --puerto 2323 --ssh 2222
+"""
+import argparse
+import asyncio
+import bisect
+import functools
+import ipaddress
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from cliente_snmp import (
+    END_OF_MIB_VIEW, GAUGE32, GET_BULK_REQUEST, GET_NEXT_REQUEST, GET_REQUEST, IP_ADDRESS, NO_SUCH_OBJECT,
+    RESPONSE, TIMETICKS, Tipado, codificar_mensaje, codificar_varbind, decodificar_mensaje, oid,
+)
+
+# Estados de un router simulado
+ACTIVO = "activo"
+LENTO = "lento"
+COLGADO = "colgado"
+CAIDO = "caido"
+
+# latencia en segundos por comando (y por paso del login); lineas escala el tamaño de las salidas
+PerfilRouter = namedtuple("PerfilRouter", "nombre ip estado latencia lineas username password")
+
+LINEAS_POR_PAGINA = 24
+IAC = 255
+WILL = 251
+ECHO = 1
+SUPPRESS_GO_AHEAD = 3
+
+# ==================
+#   Datos de un router simulado
+# ==================
+
+# activa es False en las interfaces en "administratively down"
+InterfazSimulada = namedtuple("InterfazSimulada", "nombre ip activa")
+
+# interfaz es el índice en interfaces_simuladas (None si la ruta no tiene interfaz de salida);
+# edad en segundos
+RutaSimulada = namedtuple("RutaSimulada", "codigo red longitud ad metrica salto edad interfaz")
+
+
+def interfaces_simuladas(perfil):
+    return [
+        InterfazSimulada(f"GigabitEthernet0/{i}", f"10.{i // 256}.{i % 256}.1", i % 7 != 0)
+        for i in range(max(2, perfil.lineas // 10))
+    ]
+
+
+def rutas_simuladas(perfil):
+    n_interfaces = max(2, perfil.lineas // 10)
+    rutas = [RutaSimulada("S*", "0.0.0.0", 0, 1, 0, "10.0.0.254", 0, None)]
+    for i in range(perfil.lineas):
+        red = f"10.{i // 256}.{i % 256}.0"
+        if i % 3 == 0:
+            rutas.append(RutaSimulada("C", red, 24, None, None, None, None, i % n_interfaces))
+        else:
+            rutas.append(RutaSimulada("O", red, 24, 110, i % 50 + 2, f"10.0.{i % 256}.2", (i % 60) * 60 + 12,
+                                      i % n_interfaces))
+    return rutas
+
+# ==================
+#   Salidas de IOS
+# ==================
+
+def salida_interfaces(perfil):
+    filas = ["Interface              IP-Address      OK? Method Status                Protocol"]
+    for interfaz in interfaces_simuladas(perfil):
+        estado = "up                    up" if interfaz.activa else "administratively down down"
+        filas.append(f"{interfaz.nombre:<22} {interfaz.ip:<15} YES NVRAM  {estado}")
+    return filas
+
+
+def salida_rutas(perfil):
+    interfaces = interfaces_simuladas(perfil)
+    rutas = rutas_simuladas(perfil)
+    filas = [
+        "Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP",
+        "       O - OSPF, IA - OSPF inter area, * - candidate default",
+        "",
+        "Gateway of last resort is 10.0.0.254 to network 0.0.0.0",
+        "",
+        "S*    0.0.0.0/0 [1/0] via 10.0.0.254",
+        "      10.0.0.0/8 is variably subnetted, %d subnets, 2 masks" % len(rutas),
+    ]
+    for ruta in rutas[1:]:
+        interfaz = interfaces[ruta.interfaz].nombre
+        if ruta.codigo == "C":
+            filas.append(f"C        {ruta.red}/{ruta.longitud} is directly connected, {interfaz}")
+        else:
+            edad = f"{ruta.edad // 3600:02d}:{ruta.edad // 60 % 60:02d}:{ruta.edad % 60:02d}"
+            filas.append(f"{ruta.codigo:<9}{ruta.red}/{ruta.longitud} [{ruta.ad}/{ruta.metrica}] "
+                         f"via {ruta.salto}, {edad}, {interfaz}")
+    return filas
+
+
+def salida_acls(perfil):
+    filas = ["Extended IP access list 100"]
+    for i in range(perfil.lineas):
+        accion = "permit" if i % 4 else "deny"
+        filas.append(f"    {(i + 1) * 10} {accion} tcp any host 10.{i // 256}.{i % 256}.10 eq {1024 + i} ({i * 3} matches)")
+    return filas
+
+
+def salida_nat(perfil):
+    filas = ["Pro Inside global         Inside local          Outside local         Outside global"]
+    for i in range(perfil.lineas):
+        filas.append(f"tcp 200.1.1.1:{1024 + i:<9} 192.168.{i // 256}.{i % 256}:{40000 + i % 20000:<5} "
+                     f"8.8.8.8:443           8.8.8.8:443")
+    return filas
+
+
+def salida_dhcp(perfil):
+    filas = []
+    for i in range(max(1, perfil.lineas // 50)):
+        filas += [
+            f"Pool LAN{i} :",
+            " Utilization mark (high/low)    : 100 / 0",
+            " Subnet size (first/next)       : 0 / 0",
+            f" Total addresses                : 254",
+            f" Leased addresses               : {i % 254}",
+            " Pending event                  : none",
+            " 1 subnet is currently in the pool :",
+            " Current index        IP address range                    Leased addresses",
+            f" 192.168.{i}.{i % 254 + 1:<12} 192.168.{i}.1     - 192.168.{i}.254    {i % 254}",
+        ]
+    return filas
+
+
+def salida_running_config(perfil):
+    filas = ["Building configuration...", "", "Current configuration : 4096 bytes", "!",
+             f"hostname {perfil.nombre}", "!"]
+    for i in range(max(2, perfil.lineas // 10)):
+        filas += [f"interface GigabitEthernet0/{i}", f" ip address 10.{i // 256}.{i % 256}.1 255.255.255.0", "!"]
+    filas += ["line vty 0 4", " login local", " transport input telnet", "!", "end"]
+    return filas
+
+
+def salida_ping(comando):
+    partes = comando.split()
+    destino = partes[1] if len(partes) > 1 else "0.0.0.0"
+    repeticiones = int(partes[partes.index("repeat") + 1]) if "repeat" in partes else 5
+    return [
+        "Type escape sequence to abort.",
+        f"Sending {repeticiones}, 100-byte ICMP Echos to {destino}, timeout is 2 seconds:",
+        "!" * repeticiones,
+        f"Success rate is 100 percent ({repeticiones}/{repeticiones}), round-trip min/avg/max = 1/1/2 ms",
+    ]
+
+
+SALIDAS_SHOW = {
+    "show ip interface brief": salida_interfaces,
+    "show ip route": salida_rutas,
+    "show access-lists": salida_acls,
+    "show ip nat translations": salida_nat,
+    "show ip dhcp pool": salida_dhcp,
+    "show running-config": salida_running_config,
+}
+
+
+def salida_comando(perfil, comando):
+    """
+    Líneas de la salida de un comando (show, ping o uno desconocido), igual por Telnet y SSH.
+    """
+    if comando.startswith("ping "):
+        return salida_ping(comando)
+    if comando in SALIDAS_SHOW:
+        return SALIDAS_SHOW[comando](perfil)
+    if comando:
+        return ["% Invalid input detected at '^' marker."]
+    return []
+
+# ==================
+#   Sesión Telnet simulada
+# ==================
+
+class SesionSimulada:
+    """
+    Atiende una conexión Telnet de un router simulado.
+    """
+
+    def __init__(self, perfil, reader, writer):
+        self.perfil = perfil
+        self.reader = reader
+        self.writer = writer
+        self.prompt = f"{perfil.nombre}#".encode()
+        self.paginacion = True
+
+    async def leer_linea(self):
+        """
+        Lee una línea descartando las respuestas a las negociaciones Telnet (IAC x y).
+        """
+        linea = bytearray()
+        while True:
+            byte = await self.reader.read(1)
+            if not byte:
+                raise EOFError
+            if byte[0] == IAC:
+                await self.reader.readexactly(2)
+                continue
+            if byte == b"\n":
+                return linea.rstrip(b"\r").decode("utf-8", "replace")
+            linea += byte
+
+    async def esperar(self):
+        if self.perfil.latencia:
+            await asyncio.sleep(self.perfil.latencia)
+
+    async def atender(self):
+        try:
+            if self.perfil.estado == COLGADO:
+                await self.reader.read()  # Acepta la conexión y no responde nunca
+                return
+            self.writer.write(bytes((IAC, WILL, ECHO, IAC, WILL, SUPPRESS_GO_AHEAD)))
+            self.writer.write(b"\r\n\r\nUser Access Verification\r\n\r\nUsername: ")
+            usuario = await self.leer_linea()
+            self.writer.write(usuario.encode() + b"\r\nPassword: ")
+            clave = await self.leer_linea()
+            await self.esperar()
+            if usuario != self.perfil.username or clave != self.perfil.password:
+                self.writer.write(b"\r\n% Login invalid\r\n\r\n")
+                return
+            self.writer.write(b"\r\n" + self.prompt)
+            while True:
+                comando = (await self.leer_linea()).strip()
+                if comando in ("exit", "logout", "quit"):
+                    return
+                await self.esperar()
+                await self.responder(comando)
+                await self.writer.drain()
+        except (EOFError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writer.close()
+
+    async def responder(self, comando):
+        self.writer.write(comando.encode() + b"\r\n")
+        if comando == "terminal length 0":
+            self.paginacion = False
+            filas = []
+        else:
+            filas = salida_comando(self.perfil, comando)
+
+        if not self.paginacion:
+            if filas:
+                self.writer.write(("\r\n".join(filas) + "\r\n").encode())
+        else:
+            for i in range(0, len(filas), LINEAS_POR_PAGINA):
+                self.writer.write(("\r\n".join(filas[i:i + LINEAS_POR_PAGINA]) + "\r\n").encode())
+                if i + LINEAS_POR_PAGINA < len(filas):
+                    self.writer.write(b" --More-- ")
+                    await self.writer.drain()
+                    tecla = await self.reader.read(1)
+                    # IOS borra el marcador con retrocesos antes de seguir
+                    self.writer.write(b"\x08" * 10 + b" " * 10 + b"\x08" * 10)
+                    if tecla != b" ":
+                        break
+        self.writer.write(b"\r\n" + self.prompt)
+
+# ==================
+#   Servidor SSH simulado
+# ==================
+
+def _asyncssh():
+    try:
+        import asyncssh
+    except ImportError:
+        raise RuntimeError("Para simular SSH hace falta asyncssh (pip install asyncssh).")
+    return asyncssh
+
+
+@functools.lru_cache(maxsize=None)
+def clase_servidor_ssh():
+    """
+    Subclase de asyncssh.SSHServer para los routers simulados; se crea al primer uso
+    porque asyncssh es opcional.
+    """
+    asyncssh = _asyncssh()
+
+    class ServidorSSHSimulado(asyncssh.SSHServer):
+        """
+        Login por contraseña de un router simulado (con la latencia de su perfil).
+        """
+
+        def __init__(self, perfil):
+            self.perfil = perfil
+
+        def begin_auth(self, username):
+            return True
+
+        def password_auth_supported(self):
+            return True
+
+        async def validate_password(self, username, password):
+            if self.perfil.latencia:
+                await asyncio.sleep(self.perfil.latencia)
+            return username == self.perfil.username and password == self.perfil.password
+
+    return ServidorSSHSimulado
+
+
+async def atender_canal_ssh(perfil, proceso):
+    """
+    Atiende un canal exec: escribe la salida del comando y cierra el canal, sin prompt
+    ni paginación, como IOS.
+    """
+    comando = (proceso.command or "").strip()
+    if perfil.latencia:
+        await asyncio.sleep(perfil.latencia)
+    filas = salida_comando(perfil, comando)
+    try:
+        if filas:
+            proceso.stdout.write("\r\n".join(filas) + "\r\n")
+        proceso.exit(0)
+    except (BrokenPipeError, ConnectionError):
+        pass  # El cliente cerró el canal antes (comando vencido)
+
+# ==================
+#   Agente SNMP simulado
+# ==================
+
+SYS_DESCR = oid("1.3.6.1.2.1.1.1.0")
+SYS_UPTIME = oid("1.3.6.1.2.1.1.3.0")
+SYS_NAME = oid("1.3.6.1.2.1.1.5.0")
+IF_NUMBER = oid("1.3.6.1.2.1.2.1.0")
+IF_ENTRY = oid("1.3.6.1.2.1.2.2.1")
+IP_ADDR_ENTRY = oid("1.3.6.1.2.1.4.20.1")
+IP_ROUTE_ENTRY = oid("1.3.6.1.2.1.4.21.1")
+
+# ipRouteProto de cada código de ruta
+PROTOCOLOS_RUTA = {"C": 2, "S": 3, "S*": 3, "O": 13}
+
+# Tamaño máximo de una respuesta, como el de un agente real (lo que cabe en un datagrama de Ethernet)
+TAMANO_MAXIMO_SNMP = 1472
+
+
+def _ip_oid(ip):
+    return tuple(int(octeto) for octeto in ip.split("."))
+
+
+def _mascara(longitud):
+    return str(ipaddress.IPv4Network(f"0.0.0.0/{longitud}").netmask)
+
+
+def mib_simulada(perfil):
+    """
+    Variables del agente de un router ordenadas por OID: system, ifTable, ipAddrTable e
+    ipRouteTable, con las mismas interfaces y rutas que salida_interfaces/salida_rutas.
+    sysUpTime lo calcula el agente al responder.
+    """
+    variables = {
+        SYS_DESCR: "Cisco IOS Software (simulado)",
+        SYS_UPTIME: Tipado(TIMETICKS, 0),
+        SYS_NAME: perfil.nombre,
+    }
+    interfaces = interfaces_simuladas(perfil)
+    variables[IF_NUMBER] = len(interfaces)
+    for i, interfaz in enumerate(interfaces):
+        indice = i + 1
+        estado = 1 if interfaz.activa else 2
+        for columna, valor in ((1, indice), (2, interfaz.nombre), (3, 6), (5, Tipado(GAUGE32, 1000000000)),
+                               (7, estado), (8, estado)):
+            variables[IF_ENTRY + (columna, indice)] = valor
+        ip = _ip_oid(interfaz.ip)
+        for columna, valor in ((1, Tipado(IP_ADDRESS, interfaz.ip)), (2, indice),
+                               (3, Tipado(IP_ADDRESS, _mascara(24)))):
+            variables[IP_ADDR_ENTRY + (columna, *ip)] = valor
+    for ruta in rutas_simuladas(perfil):
+        red = _ip_oid(ruta.red)
+        directa = ruta.codigo == "C"
+        for columna, valor in (
+            (1, Tipado(IP_ADDRESS, ruta.red)),
+            (2, ruta.interfaz + 1 if ruta.interfaz is not None else 0),
+            (3, ruta.metrica if ruta.metrica is not None else 0),
+            (7, Tipado(IP_ADDRESS, ruta.salto or interfaces[ruta.interfaz].ip)),
+            (8, 3 if directa else 4),
+            (9, PROTOCOLOS_RUTA[ruta.codigo]),
+            (10, ruta.edad or 0),
+            (11, Tipado(IP_ADDRESS, _mascara(ruta.longitud))),
+        ):
+            variables[IP_ROUTE_ENTRY + (columna, *red)] = valor
+    return sorted(variables.items())
+
+
+class AgenteSNMPSimulado(asyncio.DatagramProtocol):
+    """
+    Agente SNMP v2c de un router simulado (GET, GETNEXT y GETBULK sobre mib_simulada).
+    Los routers colgados no responden y los lentos responden tras su latencia; las
+    peticiones con otra comunidad se descartan, como en un agente real.
+    """
+
+    def __init__(self, perfil, comunidad="public"):
+        self.perfil = perfil
+        self.comunidad = comunidad.encode()
+        variables = mib_simulada(perfil)
+        self.oids = [o for o, _ in variables]
+        # Cada variable ya codificada: la MIB no cambia (salvo sysUpTime) y así responder
+        # no cuesta más que copiar bytes, también con miles de routers en un proceso
+        self.codificadas = {o: codificar_varbind(o, v) for o, v in variables}
+        self.inicio = time.monotonic()
+        self.transporte = None
+
+    def connection_made(self, transporte):
+        self.transporte = transporte
+
+    def _variable(self, o):
+        if o == SYS_UPTIME:
+            return codificar_varbind(o, Tipado(TIMETICKS, int((time.monotonic() - self.inicio) * 100)))
+        return self.codificadas[o]
+
+    def _siguiente(self, o):
+        """
+        (OID siguiente, varbind codificado, fin de la MIB)
+        """
+        i = bisect.bisect_right(self.oids, o)
+        if i == len(self.oids):
+            return o, codificar_varbind(o, Tipado(END_OF_MIB_VIEW, None)), True
+        return self.oids[i], self._variable(self.oids[i]), False
+
+    def responder(self, mensaje):
+        """
+        Varbinds codificados de la respuesta a una petición (None si el PDU no se atiende).
+        """
+        oids = [o for o, _ in mensaje.varbinds]
+        if mensaje.pdu == GET_REQUEST:
+            return [self._variable(o) if o in self.codificadas else codificar_varbind(o, Tipado(NO_SUCH_OBJECT, None))
+                    for o in oids]
+        if mensaje.pdu == GET_NEXT_REQUEST:
+            return [self._siguiente(o)[1] for o in oids]
+        if mensaje.pdu != GET_BULK_REQUEST:
+            return None
+        no_repetidas, repeticiones = max(0, mensaje.error_status), max(0, mensaje.error_index)
+        varbinds = [self._siguiente(o)[1] for o in oids[:no_repetidas]]
+        ultimos = oids[no_repetidas:]
+        # Filas intercaladas hasta llenar el datagrama, como hace un agente real
+        tamano = 60 + sum(len(vb) for vb in varbinds)
+        for _ in range(repeticiones if ultimos else 0):
+            fila = [self._siguiente(o) for o in ultimos]
+            tamano += sum(len(vb) for _, vb, _ in fila)
+            if tamano > TAMANO_MAXIMO_SNMP and len(varbinds) > no_repetidas:
+                break
+            varbinds.extend(vb for _, vb, _ in fila)
+            ultimos = [o for o, _, _ in fila]
+            if all(fin for _, _, fin in fila):
+                break
+        return varbinds
+
+    def datagram_received(self, datos, origen):
+        if self.perfil.estado == COLGADO:
+            return
+        try:
+            mensaje = decodificar_mensaje(datos)
+        except ValueError:
+            return
+        if mensaje.comunidad != self.comunidad:
+            return
+        varbinds = self.responder(mensaje)
+        if varbinds is None:
+            return
+        respuesta = codificar_mensaje(self.comunidad, RESPONSE, mensaje.request_id, varbinds)
+        if self.perfil.latencia:
+            asyncio.get_running_loop().call_later(self.perfil.latencia, self._enviar, respuesta, origen)
+        else:
+            self._enviar(respuesta, origen)
+
+    def _enviar(self, respuesta, origen):
+        if self.transporte is not None and not self.transporte.is_closing():
+            self.transporte.sendto(respuesta, origen)
+
+# ==================
+#   Conjunto de routers simulados
+# ==================
+
+def perfiles_simulados(cantidad, ip_base="127.1.0.1", latencia=0.0, lineas=40,
+                       lentos=0.0, caidos=0.0, colgados=0.0, factor_lento=20, semilla=0,
+                       username="cisco", password="cisco"):
+    """
+    Perfiles de cantidad routers con IPs consecutivas desde ip_base. Las fracciones
+    lentos/caidos/colgados se reparten con una semilla fija para que el simulador y
+    el benchmark generen la misma asignación.
+    """
+    azar = random.Random(semilla)
+    inicio = ipaddress.IPv4Address(ip_base)
+    perfiles = []
+    for i in range(cantidad):
+        x = azar.random()
+        if x < caidos:
+            estado = CAIDO
+        elif x < caidos + colgados:
+            estado = COLGADO
+        elif x < caidos + colgados + lentos:
+            estado = LENTO
+        else:
+            estado = ACTIVO
+        perfiles.append(PerfilRouter(
+            f"R{i + 1}", str(inicio + i), estado,
+            latencia * factor_lento if estado == LENTO else latencia, lineas, username, password,
+        ))
+    return perfiles
+
+
+def topologia_simulada(perfiles, puerto, pcs_por_router=1, ip_pcs="127.2.0.1", puerto_snmp=None,
+                       puerto_ssh=None):
+    """
+    Topología (en el formato de topologia_desde_dict) con los routers en cadena (cada enlace
+    en la red /24 de una de sus interfaces simuladas) y pcs_por_router PCs colgando de cada
+    uno. Las PCs usan IPs de loopback, que responden a ping.
+    """
+    dispositivos = []
+    enlaces = []
+    base_pcs = ipaddress.IPv4Address(ip_pcs)
+    n = 0
+    for i, perfil in enumerate(perfiles):
+        dispositivos.append({"nombre": perfil.nombre, "tipo": "router", "ip": perfil.ip, "puerto": puerto,
+                             "x": i * 100, "y": 0, "username": perfil.username, "password": perfil.password})
+        if puerto_snmp is not None:
+            dispositivos[-1]["puerto_snmp"] = puerto_snmp
+        if puerto_ssh is not None:
+            dispositivos[-1]["puerto_ssh"] = puerto_ssh
+        if i:
+            # La red de una interfaz simulada (la misma en los dos routers): así el estado del
+            # enlace sale de show ip interface brief, y los de interfaces caídas quedan en rojo
+            interfaces = interfaces_simuladas(perfil)
+            ip = interfaces[i % len(interfaces)].ip
+            enlaces.append([perfiles[i - 1].nombre, perfil.nombre, f"{ip.rsplit('.', 1)[0]}.0/24"])
+        for _ in range(pcs_por_router):
+            n += 1
+            dispositivos.append({"nombre": f"PC{n}", "tipo": "pc", "ip": str(base_pcs + n - 1),
+                                 "x": i * 100, "y": 100})
+            enlaces.append([perfil.nombre, f"PC{n}", ""])
+    return {"dispositivos": dispositivos, "enlaces": enlaces}
+
+
+class SimuladorIOS:
+    """
+    Levanta un servidor Telnet por router (salvo los caídos) en su IP y el puerto indicado
+    y, con puerto_snmp, también su agente SNMP en ese puerto UDP y, con puerto_ssh, su
+    servidor SSH en ese puerto (todos con la misma clave de host, generada al iniciar).
+    Se usa con await iniciar()/detener() dentro de un bucle asyncio o con
+    iniciar_en_hilo()/detener_hilo() desde código síncrono.
+    """
+
+    def __init__(self, perfiles, puerto=2323, puerto_snmp=None, comunidad="public", puerto_ssh=None):
+        self.perfiles = perfiles
+        self.puerto = puerto
+        self.puerto_snmp = puerto_snmp
+        self.comunidad = comunidad
+        self.puerto_ssh = puerto_ssh
+        self._servidores = []
+        self._agentes = []  # Transportes UDP de los agentes SNMP
+        self._loop = None
+        self._hilo = None
+
+    async def iniciar(self):
+        if self.puerto_ssh is not None:
+            asyncssh = _asyncssh()
+            clave_host = asyncssh.generate_private_key("ssh-ed25519")
+            servidor_ssh = clase_servidor_ssh()
+        for perfil in self.perfiles:
+            if perfil.estado == CAIDO:
+                continue
+            servidor = await asyncio.start_server(
+                lambda r, w, perfil=perfil: SesionSimulada(perfil, r, w).atender(),
+                perfil.ip, self.puerto, reuse_address=True,
+            )
+            self._servidores.append(servidor)
+            if self.puerto_ssh is not None:
+                if perfil.estado == COLGADO:
+                    # Acepta la conexión y no responde nunca, ni siquiera el saludo SSH
+                    servidor = await asyncio.start_server(
+                        lambda r, w, perfil=perfil: SesionSimulada(perfil, r, w).atender(),
+                        perfil.ip, self.puerto_ssh, reuse_address=True,
+                    )
+                else:
+                    servidor = await asyncssh.create_server(
+                        lambda perfil=perfil: servidor_ssh(perfil), perfil.ip, self.puerto_ssh,
+                        server_host_keys=[clave_host], process_factory=functools.partial(atender_canal_ssh, perfil),
+                        reuse_address=True,
+                    )
+                self._servidores.append(servidor)
+            if self.puerto_snmp is not None:
+                transporte, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                    lambda perfil=perfil: AgenteSNMPSimulado(perfil, self.comunidad),
+                    local_addr=(perfil.ip, self.puerto_snmp),
+                )
+                self._agentes.append(transporte)
+
+    async def detener(self):
+        for transporte in self._agentes:
+            transporte.close()
+        self._agentes.clear()
+        for servidor in self._servidores:
+            servidor.close()
+        for servidor in self._servidores:
+            await servidor.wait_closed()
+        self._servidores.clear()
+
+    def iniciar_en_hilo(self):
+        """
+        Arranca los servidores en un bucle propio (hilo daemon) y vuelve cuando ya escuchan.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name="simulador-ios", daemon=True)
+        self._hilo.start()
+        asyncio.run_coroutine_threadsafe(self.iniciar(), self._loop).result()
+
+    def detener_hilo(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.detener(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join(5)
+        self._loop = None
+
+
+def argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Routers Cisco IOS simulados (Telnet, SNMP y SSH).")
+    parser.add_argument("--routers", type=int, default=10, help="Cantidad de routers.")
+    parser.add_argument("--ip-base", default="127.1.0.1", help="IP del primer router (las demás son consecutivas).")
+    parser.add_argument("--puerto", type=int, default=2323, help="Puerto Telnet de todos los routers.")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por comando.")
+    parser.add_argument("--lineas", type=int, default=40, help="Tamaño de las salidas (rutas, ACL, NAT...).")
+    parser.add_argument("--lentos", type=float, default=0.0, help="Fracción de routers lentos.")
+    parser.add_argument("--caidos", type=float, default=0.0, help="Fracción de routers caídos (puerto cerrado).")
+    parser.add_argument("--colgados", type=float, default=0.0, help="Fracción de routers que no responden.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla para repartir los estados.")
+    parser.add_argument("--snmp", type=int, metavar="PUERTO",
+                        help="Puerto UDP del agente SNMP de cada router (sin él, solo Telnet).")
+    parser.add_argument("--comunidad", default="public", help="Comunidad SNMP de los agentes.")
+    parser.add_argument("--ssh", type=int, metavar="PUERTO",
+                        help="Puerto del servidor SSH de cada router (necesita asyncssh).")
+    return parser.parse_args(argv)
+
+
+def perfiles_de_argumentos(args):
+    return perfiles_simulados(args.routers, args.ip_base, args.latencia, args.lineas,
+                              args.lentos, args.caidos, args.colgados, semilla=args.semilla)
+
+
+async def _servir(simulador):
+    await simulador.iniciar()
+    snmp = f", SNMP en el {simulador.puerto_snmp}/udp" if simulador.puerto_snmp is not None else ""
+    ssh = f", SSH en el {simulador.puerto_ssh}" if simulador.puerto_ssh is not None else ""
+    print(f"Simulando {len(simulador.perfiles)} routers en el puerto {simulador.puerto}{snmp}{ssh} "
+          f"(Ctrl+C para terminar).", flush=True)
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    args = argumentos(argv)
+    simulador = SimuladorIOS(perfiles_de_argumentos(args), args.puerto, args.snmp, args.comunidad, args.ssh)
+    try:
+        asyncio.run(_servir(simulador))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import json
+import os
+
+# ==================
+#   Registros de la topología
+# ==================
+
+TIPOS_HOST = ("pc", "vm")
+
+
+class Dispositivo:
+    """
+    Nodo de la topología. orig_x/orig_y son las coordenadas del fichero;
+    actual_x/actual_y las de pantalla, que calcula el dibujado.
+    gateway es el router del que depende (None en routers y dispositivos sueltos)
+    y switch el switch por el que cuelga una PC/VM, si lo hay.
+    puerto es el puerto Telnet del router (23 salvo en laboratorios o simuladores) y
+    puerto_ssh el SSH (None: 22); puerto_snmp y comunidad, los de su agente SNMP
+    (None: los del recolector SNMP).
+    """
+    __slots__ = ("indice", "nombre", "tipo", "ip", "orig_x", "orig_y", "actual_x", "actual_y",
+                 "gateway", "switch", "username", "password", "puerto", "puerto_ssh", "puerto_snmp",
+                 "comunidad")
+
+    def __init__(self, indice, nombre, tipo, ip, orig_x, orig_y, username=None, password=None, puerto=23,
+                 puerto_snmp=None, comunidad=None, puerto_ssh=None):
+        self.indice = indice
+        self.nombre = nombre
+        self.tipo = tipo
+        self.ip = ip
+        self.orig_x = orig_x
+        self.orig_y = orig_y
+        self.actual_x = 0.0
+        self.actual_y = 0.0
+        self.gateway = None
+        self.switch = None
+        self.username = username
+        self.password = password
+        self.puerto = puerto
+        self.puerto_ssh = puerto_ssh
+        self.puerto_snmp = puerto_snmp
+        self.comunidad = comunidad
+
+    def __repr__(self):
+        return f"Dispositivo({self.nombre!r}, {self.tipo!r}, {self.ip!r})"
+
+
+class Enlace:
+    """
+    Conexión entre dos dispositivos; linea es el nombre de su línea en el canvas ("line_R1-R2").
+    """
+    __slots__ = ("origen", "destino", "red", "linea")
+
+    def __init__(self, origen, destino, red=""):
+        self.origen = origen
+        self.destino = destino
+        self.red = red
+        self.linea = f"line_{origen}-{destino}"
+
+    def __repr__(self):
+        return f"Enlace({self.origen!r}, {self.destino!r}, {self.red!r})"
+
+# ==================
+#   Modelo indexado
+# ==================
+
+class Topologia:
+    """
+    Topología con índices para que todas las búsquedas sean O(1):
+    nombre -> Dispositivo, adyacencia por dispositivo, dispositivos que dependen
+    de cada router/switch, gateway de cada PC/VM y par de dispositivos -> Enlace.
+    """
+
+    def __init__(self, dispositivos, enlaces):
+        self.dispositivos = {}    # { nombre: Dispositivo }, en el orden del fichero
+        self.enlaces = []         # [Enlace]
+        self.adyacencia = {}      # { nombre: [nombre vecino] }
+        self.conectados = {}      # { router/switch: [dispositivos que cuelgan de él] }
+        self._por_par = {}        # { (a, b): Enlace } en ambos sentidos
+        self._por_linea = {}      # { nombre de línea: Enlace }
+
+        for device in dispositivos:
+            if device.nombre in self.dispositivos:
+                raise ValueError(f"Dispositivo duplicado en la topología: {device.nombre}")
+            self.dispositivos[device.nombre] = device
+            self.adyacencia[device.nombre] = []
+
+        for enlace in enlaces:
+            for extremo in (enlace.origen, enlace.destino):
+                if extremo not in self.dispositivos:
+                    raise ValueError(f"El enlace {enlace.linea} usa un dispositivo desconocido: {extremo}")
+            self.enlaces.append(enlace)
+            self.adyacencia[enlace.origen].append(enlace.destino)
+            self.adyacencia[enlace.destino].append(enlace.origen)
+            self._por_par[(enlace.origen, enlace.destino)] = enlace
+            self._por_par[(enlace.destino, enlace.origen)] = enlace
+            self._por_linea[enlace.linea] = enlace
+
+        self._calcular_dependencias()
+
+    def _calcular_dependencias(self):
+        """
+        Deriva de los enlaces de qué router cuelga cada switch y de qué router
+        (directamente o por un switch) cuelga cada PC/VM.
+        Un gateway explícito en el fichero tiene prioridad.
+        """
+        for device in self.dispositivos.values():
+            if device.tipo != "switch":
+                continue
+            if device.gateway is None:
+                device.gateway = next(
+                    (v for v in self.adyacencia[device.nombre] if self.dispositivos[v].tipo == "router"), None
+                )
+            if device.gateway is not None:
+                self.conectados.setdefault(device.gateway, []).append(device.nombre)
+
+        for device in self.dispositivos.values():
+            if device.tipo not in TIPOS_HOST:
+                continue
+            for vecino in self.adyacencia[device.nombre]:
+                tipo_vecino = self.dispositivos[vecino].tipo
+                if tipo_vecino == "router" and device.gateway is None:
+                    device.gateway = vecino
+                elif tipo_vecino == "switch" and device.switch is None:
+                    device.switch = vecino
+            if device.switch is not None:
+                self.conectados.setdefault(device.switch, []).append(device.nombre)
+                if device.gateway is None:
+                    device.gateway = self.dispositivos[device.switch].gateway
+            elif device.gateway is not None:
+                self.conectados.setdefault(device.gateway, []).append(device.nombre)
+
+    # --- Consultas ---
+
+    def __len__(self):
+        return len(self.dispositivos)
+
+    def __iter__(self):
+        return iter(self.dispositivos.values())
+
+    def __contains__(self, nombre):
+        return nombre in self.dispositivos
+
+    def dispositivo(self, nombre):
+        return self.dispositivos.get(nombre)
+
+    def enlace(self, a, b):
+        """
+        Enlace entre dos dispositivos, en cualquier orden (None si no están conectados).
+        """
+        return self._por_par.get((a, b))
+
+    def linea(self, a, b):
+        """
+        Nombre de la línea del canvas entre dos dispositivos (None si no están conectados).
+        """
+        enlace = self._por_par.get((a, b))
+        return enlace.linea if enlace is not None else None
+
+    def enlace_de_linea(self, linea):
+        return self._por_linea.get(linea)
+
+    def dispositivos_de_tipo(self, *tipos):
+        return [device for device in self.dispositivos.values() if device.tipo in tipos]
+
+    def routers(self):
+        return self.dispositivos_de_tipo("router")
+
+    def hosts(self):
+        """
+        PCs y VM.
+        """
+        return self.dispositivos_de_tipo(*TIPOS_HOST)
+
+    def enlaces_entre_routers(self):
+        return [e for e in self.enlaces
+                if self.dispositivos[e.origen].tipo == "router" and self.dispositivos[e.destino].tipo == "router"]
+
+    def enlaces_de(self, nombre):
+        return [self._por_par[(nombre, vecino)] for vecino in self.adyacencia.get(nombre, ())]
+
+    def dispositivos_detras(self, router_nombre):
+        """
+        Dispositivos que dependen del router: los conectados directamente y los que cuelgan de sus switches.
+        """
+        detras = []
+        for nombre in self.conectados.get(router_nombre, ()):
+            detras.append(nombre)
+            detras.extend(self.conectados.get(nombre, ()))
+        return detras
+
+    def routers_sondeo(self, username="cisco", password="cisco"):
+        """
+        Routers en el formato que usan MotorSondeo y los pools Telnet y SSH.
+        """
+        return [
+            {"ip": r.ip, "puerto": r.puerto, "username": r.username or username, "password": r.password or password,
+             "nombre": r.nombre, "puerto_ssh": r.puerto_ssh, "puerto_snmp": r.puerto_snmp,
+             "comunidad": r.comunidad}
+            for r in self.routers()
+        ]
+
+# ==================
+#   Carga desde fichero
+# ==================
+
+def topologia_desde_dict(datos):
+    """
+    Construye la topología a partir de { "dispositivos": [...], "enlaces": [...] }.
+    Cada dispositivo: nombre, tipo, ip, x, y y, opcionalmente, username/password/gateway/puerto,
+    puerto_ssh y puerto_snmp/comunidad.
+    Cada enlace: [origen, destino, red] o { "origen", "destino", "red" }.
+    """
+    dispositivos = []
+    gateways = {}
+    for i, d in enumerate(datos.get("dispositivos", [])):
+        device = Dispositivo(
+            i, d["nombre"], d["tipo"], d.get("ip", ""), float(d.get("x", 0)), float(d.get("y", 0)),
+            d.get("username"), d.get("password"), int(d.get("puerto", 23)),
+            int(d["puerto_snmp"]) if d.get("puerto_snmp") else None, d.get("comunidad"),
+            int(d["puerto_ssh"]) if d.get("puerto_ssh") else None,
+        )
+        if d.get("gateway"):
+            gateways[device.nombre] = d["gateway"]
+        dispositivos.append(device)
+    for device in dispositivos:
+        device.gateway = gateways.get(device.nombre)
+
+    enlaces = []
+    for e in datos.get("enlaces", []):
+        if isinstance(e, dict):
+            enlaces.append(Enlace(e["origen"], e["destino"], e.get("red", "")))
+        else:
+            enlaces.append(Enlace(e[0], e[1], e[2] if len(e) > 2 else ""))
+    return Topologia(dispositivos, enlaces)
+
+
+def cargar_topologia(ruta):
+    """
+    Carga la topología de un fichero JSON o YAML (según la extensión).
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    with open(ruta, encoding="utf-8") as f:
+        if extension in (".yaml", ".yml"):
+            # PyYAML es opcional y se importa aquí para no retrasar el arranque con JSON
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("Para cargar topologías YAML hace falta PyYAML (pip install pyyaml).")
+            datos = yaml.safe_load(f)
+        else:
+            datos = json.load(f)
+    return topologia_desde_dict(datos or {})
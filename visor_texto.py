@@ -0,0 +1,310 @@
+import tkinter as tk
+
+# ==================
+#   Modelo: líneas de una salida
+# ==================
+
+class LineasTexto:
+    """
+    Salida de un comando guardada una sola vez como lista de líneas. Admite que llegue
+    por fragmentos: la última línea puede estar incompleta hasta el siguiente fragmento.
+    """
+
+    def __init__(self, texto=""):
+        self._lineas = []
+        self._parcial = ""
+        self.version = 0  # Cambia con cada modificación (para saber si hay que repintar)
+        if texto:
+            self.agregar(texto)
+
+    def agregar(self, texto):
+        """
+        Añade texto al final. Devuelve el índice de la primera línea que cambió.
+        """
+        primera = len(self._lineas)
+        partes = (self._parcial + texto).split("\n")
+        self._parcial = partes.pop()
+        self._lineas.extend(partes)
+        self.version += 1
+        return primera
+
+    def vaciar(self):
+        self._lineas = []
+        self._parcial = ""
+        self.version += 1
+
+    def __len__(self):
+        return len(self._lineas) + (1 if self._parcial else 0)
+
+    def linea(self, i):
+        return self._lineas[i] if i < len(self._lineas) else self._parcial
+
+    def texto(self):
+        return "\n".join(self._lineas + ([self._parcial] if self._parcial else []))
+
+# ==================
+#   Visor virtualizado
+# ==================
+
+class VisorTexto(tk.Frame):
+    """
+    Visor de solo lectura para salidas muy grandes: el tk.Text solo contiene las líneas
+    que caben en pantalla y se rellena de nuevo al desplazarse, así abrir o recorrer una
+    salida de varios MB no bloquea la interfaz ni duplica el texto en Tcl.
+
+    Incluye búsqueda incremental (Intro / Mayús+Intro para la siguiente / anterior) y un
+    filtro por líneas; el filtro recorre la salida por bloques desde el bucle de Tk.
+    """
+
+    BLOQUE_FILTRO = 20000   # Líneas que se filtran por cada vuelta del bucle de Tk
+    ESPERA_ENTRADA_MS = 150  # Pausa tras la última tecla antes de buscar o filtrar
+
+    def __init__(self, master, lineas, fuente=("Courier", 10), **kwargs):
+        super().__init__(master, **kwargs)
+        self.lineas = lineas
+        self.inicio = 0            # Primera posición visible dentro de la vista
+        self.filas = 30            # Líneas que caben en el widget
+        self.vista = None          # Índices de las líneas que pasan el filtro (None: todas)
+        self.filtro = ""
+        self.busqueda = ""
+        self.actual = None         # Línea de la coincidencia seleccionada
+        self._version_pintada = None
+        self._pendiente_pintar = None
+        self._espera_busqueda = None
+        self._espera_filtro = None
+        self._filtrando = None     # after del filtro por bloques en curso
+        self._filtrada_hasta = 0   # Líneas del modelo ya evaluadas por el filtro
+
+        barra = tk.Frame(self)
+        barra.pack(fill="x")
+        tk.Label(barra, text="Buscar:").pack(side="left", padx=(2, 0))
+        self.entrada_busqueda = tk.Entry(barra, width=24)
+        self.entrada_busqueda.pack(side="left", padx=2)
+        tk.Button(barra, text="▲", command=lambda: self.buscar(atras=True)).pack(side="left")
+        tk.Button(barra, text="▼", command=lambda: self.buscar()).pack(side="left")
+        tk.Label(barra, text="Filtrar:").pack(side="left", padx=(10, 0))
+        self.entrada_filtro = tk.Entry(barra, width=24)
+        self.entrada_filtro.pack(side="left", padx=2)
+        self.etiqueta_estado = tk.Label(barra, text="", anchor="e")
+        self.etiqueta_estado.pack(side="right", padx=4)
+
+        cuerpo = tk.Frame(self)
+        cuerpo.pack(fill="both", expand=True)
+        self.barra_v = tk.Scrollbar(cuerpo, orient="vertical", command=self._al_desplazar)
+        self.barra_v.pack(side="right", fill="y")
+        barra_h = tk.Scrollbar(cuerpo, orient="horizontal")
+        barra_h.pack(side="bottom", fill="x")
+        self.texto = tk.Text(cuerpo, wrap="none", font=fuente, xscrollcommand=barra_h.set)
+        self.texto.pack(side="left", fill="both", expand=True)
+        barra_h.configure(command=self.texto.xview)
+        self.texto.tag_configure("coincidencia", background="yellow")
+        self.texto.tag_configure("actual", background="orange")
+        self.texto.configure(state="disabled")
+
+        self.texto.bind("<Configure>", self._al_redimensionar)
+        self.texto.bind("<MouseWheel>", lambda e: self._mover(-3 if e.delta > 0 else 3))
+        self.texto.bind("<Button-4>", lambda e: self._mover(-3))
+        self.texto.bind("<Button-5>", lambda e: self._mover(3))
+        self.texto.bind("<Up>", lambda e: self._mover(-1))
+        self.texto.bind("<Down>", lambda e: self._mover(1))
+        self.texto.bind("<Prior>", lambda e: self._mover(-self.filas))
+        self.texto.bind("<Next>", lambda e: self._mover(self.filas))
+        self.texto.bind("<Control-Home>", lambda e: self._ir(0))
+        self.texto.bind("<Control-End>", lambda e: self._ir(self._total()))
+        self.entrada_busqueda.bind("<KeyRelease>", self._al_escribir_busqueda)
+        self.entrada_busqueda.bind("<Return>", lambda e: self.buscar())
+        self.entrada_busqueda.bind("<Shift-Return>", lambda e: self.buscar(atras=True))
+        self.entrada_filtro.bind("<KeyRelease>", self._al_escribir_filtro)
+
+        self.actualizar()
+
+    # --- Vista ---
+
+    def _total(self):
+        return len(self.vista) if self.vista is not None else len(self.lineas)
+
+    def _indice(self, posicion):
+        return self.vista[posicion] if self.vista is not None else posicion
+
+    def _al_redimensionar(self, event):
+        alto_linea = max(1, self.texto.tk.call("font", "metrics", self.texto.cget("font"), "-linespace"))
+        filas = max(1, event.height // alto_linea)
+        if filas != self.filas:
+            self.filas = filas
+            self._pintar()
+
+    def _mover(self, delta):
+        self._ir(self.inicio + delta)
+        return "break"
+
+    def _ir(self, posicion):
+        posicion = max(0, min(posicion, self._total() - self.filas))
+        if posicion != self.inicio:
+            self.inicio = posicion
+            self._pintar()
+        return "break"
+
+    def _al_desplazar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self._ir(int(float(cantidad) * self._total()))
+        elif accion == "scroll":
+            paso = self.filas if unidad == "pages" else 1
+            self._ir(self.inicio + int(cantidad) * paso)
+
+    def actualizar(self):
+        """
+        Avisa de que el modelo cambió (por ejemplo, llegó otro fragmento). El repintado se
+        agrupa: varios avisos seguidos pintan una sola vez.
+        """
+        if self._pendiente_pintar is None:
+            self._pendiente_pintar = self.after_idle(self._pintar_si_cambio)
+
+    def _pintar_si_cambio(self):
+        self._pendiente_pintar = None
+        if self.vista is not None and self._filtrando is None:
+            if len(self.lineas) < self._filtrada_hasta:
+                # El modelo se vació (nueva consulta): filtrar de nuevo desde el principio
+                self._aplicar_filtro()
+                return
+            # Líneas nuevas que llegaron con el filtro puesto; la última evaluada pudo
+            # estar incompleta, así que se vuelve a evaluar
+            desde = max(0, self._filtrada_hasta - 1)
+            while self.vista and self.vista[-1] >= desde:
+                self.vista.pop()
+            linea = self.lineas.linea
+            self.vista.extend(i for i in range(desde, len(self.lineas)) if self.filtro in linea(i).lower())
+            self._filtrada_hasta = len(self.lineas)
+        if self.lineas.version != self._version_pintada:
+            self._pintar()
+
+    def _pintar(self):
+        """
+        Vuelve a llenar el tk.Text solo con las líneas visibles.
+        """
+        self._version_pintada = self.lineas.version
+        total = self._total()
+        self.inicio = max(0, min(self.inicio, total - self.filas))
+        fin = min(total, self.inicio + self.filas)
+        visibles = [self.lineas.linea(self._indice(p)) for p in range(self.inicio, fin)]
+
+        self.texto.configure(state="normal")
+        self.texto.delete("1.0", "end")
+        self.texto.insert("1.0", "\n".join(visibles))
+        if self.busqueda:
+            for fila, linea in enumerate(visibles, start=1):
+                minuscula = linea.lower()
+                columna = minuscula.find(self.busqueda)
+                etiqueta = "actual" if self._indice(self.inicio + fila - 1) == self.actual else "coincidencia"
+                while columna != -1:
+                    self.texto.tag_add(etiqueta, f"{fila}.{columna}", f"{fila}.{columna + len(self.busqueda)}")
+                    columna = minuscula.find(self.busqueda, columna + 1)
+        self.texto.configure(state="disabled")
+
+        if total:
+            self.barra_v.set(self.inicio / total, fin / total)
+        else:
+            self.barra_v.set(0, 1)
+        texto_estado = f"{len(self.lineas)} líneas"
+        if self.vista is not None:
+            texto_estado = f"{len(self.vista)} de {texto_estado}" + (" (filtrando...)" if self._filtrando else "")
+        self.etiqueta_estado.configure(text=texto_estado)
+
+    # --- Búsqueda ---
+
+    def _al_escribir_busqueda(self, event):
+        if event.keysym in ("Return", "Shift_L", "Shift_R"):
+            return
+        if self._espera_busqueda is not None:
+            self.after_cancel(self._espera_busqueda)
+        self._espera_busqueda = self.after(self.ESPERA_ENTRADA_MS, self._buscar_desde_inicio_visible)
+
+    def _buscar_desde_inicio_visible(self):
+        self._espera_busqueda = None
+        self.busqueda = self.entrada_busqueda.get().lower()
+        self.actual = None
+        if self.busqueda:
+            self._buscar_desde(self.inicio, atras=False)
+        else:
+            self._pintar()
+
+    def buscar(self, atras=False):
+        """
+        Salta a la siguiente (o anterior) línea que contiene el texto buscado.
+        """
+        self.busqueda = self.entrada_busqueda.get().lower()
+        if not self.busqueda:
+            return "break"
+        posicion_actual = self._posicion_de(self.actual) if self.actual is not None else None
+        if posicion_actual is None:
+            desde = self.inicio
+        else:
+            desde = posicion_actual - 1 if atras else posicion_actual + 1
+        self._buscar_desde(desde, atras)
+        return "break"
+
+    def _posicion_de(self, indice):
+        if self.vista is None:
+            return indice
+        # La vista filtrada está ordenada: búsqueda binaria
+        bajo, alto = 0, len(self.vista)
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self.vista[medio] < indice:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo if bajo < len(self.vista) and self.vista[bajo] == indice else None
+
+    def _buscar_desde(self, desde, atras):
+        total = self._total()
+        if not total:
+            return
+        orden = range(desde, -1, -1) if atras else range(desde, total)
+        vuelta = range(total - 1, desde, -1) if atras else range(0, min(desde, total))
+        for rango in (orden, vuelta):  # Al llegar al final se sigue desde el otro extremo
+            for posicion in rango:
+                if self.busqueda in self.lineas.linea(self._indice(posicion)).lower():
+                    self.actual = self._indice(posicion)
+                    if not self.inicio <= posicion < self.inicio + self.filas:
+                        self.inicio = posicion - self.filas // 3
+                    self._pintar()
+                    return
+        self.actual = None
+        self._pintar()
+        self.etiqueta_estado.configure(text=f"'{self.busqueda}' no encontrado")
+
+    # --- Filtro ---
+
+    def _al_escribir_filtro(self, event):
+        if self._espera_filtro is not None:
+            self.after_cancel(self._espera_filtro)
+        self._espera_filtro = self.after(self.ESPERA_ENTRADA_MS, self._aplicar_filtro)
+
+    def _aplicar_filtro(self):
+        self._espera_filtro = None
+        if self._filtrando is not None:
+            self.after_cancel(self._filtrando)
+            self._filtrando = None
+        self.filtro = self.entrada_filtro.get().lower()
+        self.inicio = 0
+        if not self.filtro:
+            self.vista = None
+            self._pintar()
+            return
+        self.vista = []
+        self._filtrada_hasta = 0
+        self._filtrar_bloque(0)
+
+    def _filtrar_bloque(self, desde):
+        """
+        Filtra BLOQUE_FILTRO líneas y cede el control al bucle de Tk antes de seguir.
+        """
+        hasta = min(desde + self.BLOQUE_FILTRO, len(self.lineas))
+        linea = self.lineas.linea
+        self.vista.extend(i for i in range(desde, hasta) if self.filtro in linea(i).lower())
+        self._filtrada_hasta = hasta
+        if hasta < len(self.lineas):
+            self._filtrando = self.after(1, self._filtrar_bloque, hasta)
+        else:
+            self._filtrando = None
+        self._pintar()